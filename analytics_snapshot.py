@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Analytics snapshot for Automotive Service Scheduling System
+Copies the live database to a read-only snapshot file with the SQLite online
+backup API, a batch of pages per step with a pause in between, so heavy
+admin and reporting queries can run on the copy instead of competing with
+bookings. The app refreshes the snapshot itself when ANALYTICS_SNAPSHOT is
+set; this script does the same from cron or as a long-running loop.
+
+Usage:
+    python analytics_snapshot.py [--database PATH] [--snapshot PATH] [--every SECONDS]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from urllib.parse import quote
+
+DATABASE = os.environ.get('DATABASE_PATH', 'automotive_service.db')
+SNAPSHOT_PATH = os.environ.get('ANALYTICS_SNAPSHOT', '')
+SNAPSHOT_MAX_AGE = float(os.environ.get('SNAPSHOT_MAX_AGE', 300))  # seconds
+SNAPSHOT_PAGES_PER_STEP = int(os.environ.get('SNAPSHOT_PAGES_PER_STEP', 1024))
+SNAPSHOT_STEP_PAUSE = float(os.environ.get('SNAPSHOT_STEP_PAUSE', 0.005))  # seconds between steps
+
+def take_snapshot(database, snapshot_path, pages=SNAPSHOT_PAGES_PER_STEP, pause=SNAPSHOT_STEP_PAUSE):
+    """Copy database to snapshot_path; returns the number of pages copied
+
+    The copy is written to a temporary file and moved into place, so readers
+    always see a complete snapshot. Its modification time is set to when the
+    copy started, which is how current its data is at least.
+    """
+    started = time.time()
+    temp_path = f'{snapshot_path}.{os.getpid()}.tmp'
+    copied = []
+
+    def step_done(status, remaining, total):
+        copied[:] = [total]
+        if remaining and pause:
+            time.sleep(pause)
+
+    source = sqlite3.connect(database)
+    try:
+        source.execute('PRAGMA busy_timeout = 5000')
+        target = sqlite3.connect(temp_path)
+        try:
+            source.backup(target, pages=pages, progress=step_done)
+            # Readers open the snapshot as immutable, which needs a rollback journal
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+        os.utime(temp_path, (started, started))
+        os.replace(temp_path, snapshot_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        source.close()
+    return copied[0] if copied else 0
+
+def snapshot_age(snapshot_path):
+    """Seconds since the snapshot was taken, or None if there is none"""
+    try:
+        return max(0.0, time.time() - os.stat(snapshot_path).st_mtime)
+    except OSError:
+        return None
+
+def open_snapshot(snapshot_path, factory=sqlite3.Connection):
+    """Read-only connection to the snapshot
+
+    The file is replaced, never modified, so it is opened as immutable:
+    no locks and no change detection.
+    """
+    return sqlite3.connect(f'file:{quote(os.path.abspath(snapshot_path))}?immutable=1',
+                           uri=True, factory=factory, check_same_thread=False)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Copy the live database to a read-only analytics snapshot.')
+    parser.add_argument('--database', default=DATABASE, help=f'live database (default: {DATABASE})')
+    parser.add_argument('--snapshot', default=SNAPSHOT_PATH or 'analytics_snapshot.db',
+                        help='snapshot file (default: $ANALYTICS_SNAPSHOT or analytics_snapshot.db)')
+    parser.add_argument('--every', type=float, help='keep running, taking a snapshot every SECONDS')
+    parser.add_argument('--pages', type=int, default=SNAPSHOT_PAGES_PER_STEP,
+                        help=f'pages copied per backup step (default: {SNAPSHOT_PAGES_PER_STEP})')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        print(f"Error: Database '{args.database}' not found.")
+        sys.exit(1)
+
+    while True:
+        started = time.perf_counter()
+        try:
+            pages = take_snapshot(args.database, args.snapshot, args.pages)
+        except sqlite3.Error as e:
+            print(f"Snapshot failed: {e}")
+            if not args.every:
+                sys.exit(1)
+        else:
+            print(f"Snapshot {args.snapshot} written: {pages:,} pages in {time.perf_counter() - started:.2f}s")
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()
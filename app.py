@@ -1,4 +1,7 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+import time
+_load_started = time.perf_counter()
+
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, session, jsonify, g, has_app_context, has_request_context, stream_with_context, before_render_template, template_rendered
 # Flask-Admin import commented out temporarily due to installation issues
 # from flask_admin import Admin, BaseView, expose
 # from flask_admin.contrib.sqla import ModelView
@@ -8,32 +11,1154 @@ import os
 from functools import wraps
 import hashlib
 import json
+import base64
+import bisect
+import csv
+import io
+import random
+import re
+import threading
+import importlib.util
+import logging
+from logging.handlers import RotatingFileHandler
+from contextlib import contextmanager
+from collections import OrderedDict, namedtuple
+from types import MappingProxyType
+
+from migrations import LATEST_VERSION, current_version, migrate
+from appointment_events import BOOKING_ACTIVITY_CONSUMER, EVENT_BATCH_SIZE, consume, get_cursor, read_events
+from analytics_snapshot import SNAPSHOT_MAX_AGE, open_snapshot, snapshot_age, take_snapshot
 
 # Chart libraries
-try:
-    import plotly.graph_objects as go
-    import plotly.express as px
-    import plotly.utils
-    import pandas as pd
-    PLOTLY_AVAILABLE = True
-    print("✅ Plotly and Pandas imported successfully!")
-except ImportError as e:
-    PLOTLY_AVAILABLE = False
-    print(f"❌ Warning: Plotly/Pandas not available. Error: {e}")
+# Plotly is imported on first use (load_chart_libraries), not at start-up:
+# only the admin charts need it, and it adds seconds to every worker boot and
+# tens of MB to each worker's memory. Charts are built from plain lists with
+# plotly.graph_objects, so pandas is not needed.
+PLOTLY_AVAILABLE = importlib.util.find_spec('plotly') is not None
+if not PLOTLY_AVAILABLE:
+    print("❌ Warning: Plotly not available.")
     print("Charts will be disabled.")
+go = plotly = None
+chart_libraries_load_seconds = None
+_chart_libraries_lock = threading.Lock()
+
+def load_chart_libraries():
+    """Import Plotly once; returns PLOTLY_AVAILABLE"""
+    global go, plotly, PLOTLY_AVAILABLE, chart_libraries_load_seconds
+    if go is not None or not PLOTLY_AVAILABLE:
+        return PLOTLY_AVAILABLE
+    with _chart_libraries_lock:
+        if go is None and PLOTLY_AVAILABLE:
+            started = time.perf_counter()
+            try:
+                import plotly.colors
+                import plotly.utils
+                import plotly.graph_objects as go  # last: go set means everything is loaded
+            except ImportError as e:
+                PLOTLY_AVAILABLE = False
+                print(f"❌ Warning: Plotly not available. Error: {e}")
+                print("Charts will be disabled.")
+                return False
+            chart_libraries_load_seconds = time.perf_counter() - started
+            print(f"✅ Plotly imported in {chart_libraries_load_seconds:.2f}s")
+    return PLOTLY_AVAILABLE
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-this-in-production'
 
 # Database configuration
-DATABASE = 'automotive_service.db'
+DATABASE = os.environ.get('DATABASE_PATH', 'automotive_service.db')
+
+# Connection pool configuration (one pool per worker process)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 4))
+
+# Applied once when a connection is opened, not on every request.
+# busy_timeout goes first so switching to WAL waits for other workers.
+DB_PRAGMAS = [
+    ('busy_timeout', int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))),
+    ('journal_mode', os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')),
+    ('cache_size', int(os.environ.get('SQLITE_CACHE_SIZE', -20000))),   # negative = KiB (~20 MB)
+    ('mmap_size', int(os.environ.get('SQLITE_MMAP_SIZE', 268435456))),  # 256 MB
+    ('foreign_keys', 'ON'),
+]
+
+class MeteredCursor(sqlite3.Cursor):
+    """Cursor that feeds the request metrics and the slow-query log"""
+    statement = None
+    parameters = None
+    statement_seconds = 0.0
+
+    def execute(self, sql, parameters=()):
+        self.statement, self.parameters, self.statement_seconds = sql, parameters, 0.0
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._add_time(time.perf_counter() - started, 1)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.statement, self.parameters, self.statement_seconds = sql, None, 0.0
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._add_time(time.perf_counter() - started, 1)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._add_time(time.perf_counter() - started, 0)
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._add_time(time.perf_counter() - started, 0)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._add_time(time.perf_counter() - started, 0)
+
+    def _add_time(self, seconds, statements):
+        _record_sql(seconds, statements)
+        if SLOW_QUERY_SECONDS and self.statement is not None:
+            before = self.statement_seconds
+            self.statement_seconds += seconds
+            # Log each execution once, when it crosses the threshold
+            if before < SLOW_QUERY_SECONDS <= self.statement_seconds:
+                log_slow_query(self.connection, self.statement, self.parameters, self.statement_seconds)
+
+class PooledConnection(sqlite3.Connection):
+    """SQLite connection that can be shared by everything in one request.
+
+    While a connection is checked out of the pool, close() is a no-op so the
+    existing ``conn.close()`` calls in the routes simply hand it back to the
+    request. The pool closes it for real with discard().
+    """
+    pooled = False
+
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = MeteredCursor if METRICS_ENABLED or SLOW_QUERY_SECONDS else sqlite3.Cursor
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute() does not go through cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        if not self.pooled:
+            super().close()
+
+    def discard(self):
+        """Close the underlying SQLite handle"""
+        sqlite3.Connection.close(self)
+
+_pool = []
+_pool_lock = threading.Lock()
+_pool_pid = None
+
+def open_db_connection():
+    """Open a new connection with the standard pragmas applied"""
+    conn = sqlite3.connect(DATABASE, factory=PooledConnection, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    for name, value in DB_PRAGMAS:
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+def _acquire_connection():
+    """Take a connection from this worker's pool, opening one if it is empty"""
+    global _pool_pid
+    first_in_process = False
+    with _pool_lock:
+        if _pool_pid != os.getpid():
+            # Never reuse connections inherited across a fork (gunicorn --preload)
+            _pool.clear()
+            _pool_pid = os.getpid()
+            first_in_process = True
+        conn = _pool.pop() if _pool else None
+    if conn is None:
+        conn = open_db_connection()
+    if first_in_process:
+        # Bring the database up to the current schema (see migrations.py)
+        migrate(conn, write_transaction)
+    conn.pooled = True
+    return conn
+
+def _release_connection(conn):
+    """Return a connection to the pool, or close it if the pool is full"""
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+    except sqlite3.Error:
+        conn.discard()
+        return
+    with _pool_lock:
+        if _pool_pid == os.getpid() and len(_pool) < DB_POOL_SIZE:
+            _pool.append(conn)
+            return
+    conn.discard()
 
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE)
+    """Get database connection
+
+    Inside a request every call returns the same pooled connection, which is
+    released at teardown. Outside of an app context (scripts, shell) a fresh
+    standalone connection is returned and the caller must close it.
+    """
+    if not has_app_context():
+        return open_db_connection()
+    if 'db' not in g:
+        g.db = _acquire_connection()
+    return g.db
+
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    """Hand the request's connection back to the pool"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        _release_connection(conn)
+
+# Analytics snapshot (see analytics_snapshot.py)
+# With ANALYTICS_SNAPSHOT set to a file path, heavy admin reads (analytics,
+# chart data, the customer list) run on a read-only copy of the database
+# made with the online backup API, so long aggregations never compete with
+# booking writes. A copy is used while it is at most SNAPSHOT_MAX_AGE
+# seconds old; past half that age a background thread takes a new one, and
+# without a usable copy the live database is read. After an admin changes
+# data, their reads go to the live database until a newer copy exists.
+ANALYTICS_SNAPSHOT = os.environ.get('ANALYTICS_SNAPSHOT', '')
+
+_snapshot_refresh_lock = threading.Lock()
+_snapshot_refreshing = False
+
+def _refresh_snapshot(outdated=False):
+    """Take a new snapshot unless another worker just did (runs in a thread)"""
+    global _snapshot_refreshing
+    try:
+        age = snapshot_age(ANALYTICS_SNAPSHOT)
+        if age is None or age > SNAPSHOT_MAX_AGE / 2 or outdated:
+            started = time.perf_counter()
+            take_snapshot(DATABASE, ANALYTICS_SNAPSHOT)
+            print(f"Analytics snapshot refreshed in {time.perf_counter() - started:.2f}s")
+    except (OSError, sqlite3.Error) as e:
+        print(f"Analytics snapshot failed: {e}")
+    finally:
+        with _snapshot_refresh_lock:
+            _snapshot_refreshing = False
+
+def start_snapshot_refresh(outdated=False):
+    """Refresh the snapshot in the background, once per worker at a time"""
+    global _snapshot_refreshing
+    with _snapshot_refresh_lock:
+        if _snapshot_refreshing:
+            return
+        _snapshot_refreshing = True
+    threading.Thread(target=_refresh_snapshot, args=(outdated,), name='analytics-snapshot', daemon=True).start()
+
+def get_report_connection():
+    """Connection for heavy admin reads: the snapshot if fresh enough, else the live database
+
+    Like get_db_connection(), one connection per request, closed at teardown.
+    """
+    if not ANALYTICS_SNAPSHOT or not has_request_context():
+        return get_db_connection()
+    if 'report_db' in g:
+        return g.report_db
+    
+    # The live connection is opened first: the first one in a process migrates
+    live = get_db_connection()
+    age = snapshot_age(ANALYTICS_SNAPSHOT)
+    if age is None or age > SNAPSHOT_MAX_AGE / 2:
+        start_snapshot_refresh()
+    if age is None or age > SNAPSHOT_MAX_AGE or time.time() - age < session.get('admin_write_at', 0):
+        return live
+    
+    conn = open_snapshot(ANALYTICS_SNAPSHOT, factory=PooledConnection)
+    if current_version(conn) < LATEST_VERSION:
+        # Taken before the last migration
+        conn.discard()
+        start_snapshot_refresh(outdated=True)
+        return live
     conn.row_factory = sqlite3.Row
+    conn.pooled = True
+    g.report_db = conn
+    g.report_snapshot_age = age
     return conn
 
+@app.teardown_appcontext
+def close_report_connection(exception=None):
+    """Close the request's snapshot connection"""
+    conn = g.pop('report_db', None)
+    if conn is not None:
+        conn.discard()
+
+@app.after_request
+def note_admin_write(response):
+    """Send this admin's next reads to the live database, which has their change"""
+    if (ANALYTICS_SNAPSHOT and request.method == 'POST' and 'admin_authenticated' in session
+            and request.endpoint != 'admin_login'):
+        session['admin_write_at'] = time.time()
+    return response
+
+
+# High-concurrency write mode (enabled by default, see README).
+# Writes take the lock up front with BEGIN IMMEDIATE and retry with
+# exponential backoff if another worker holds it past busy_timeout.
+HIGH_CONCURRENCY_MODE = os.environ.get('HIGH_CONCURRENCY_MODE', '1') != '0'
+DB_WRITE_RETRIES = int(os.environ.get('DB_WRITE_RETRIES', 3))
+DB_WRITE_BACKOFF = float(os.environ.get('DB_WRITE_BACKOFF', 0.05))  # seconds, doubled per retry
+
+# Lock-wait statistics for this worker, exposed at /admin/api/db-stats
+db_lock_stats = {
+    'write_transactions': 0,
+    'busy_retries': 0,
+    'busy_failures': 0,
+    'lock_wait_seconds_total': 0.0,
+    'lock_wait_seconds_max': 0.0,
+}
+_lock_stats_lock = threading.Lock()
+
+def _record_lock_wait(waited, retries, failed):
+    """Accumulate time spent waiting for the write lock"""
+    with _lock_stats_lock:
+        db_lock_stats['write_transactions'] += 1
+        db_lock_stats['busy_retries'] += retries
+        if failed:
+            db_lock_stats['busy_failures'] += 1
+        db_lock_stats['lock_wait_seconds_total'] += waited
+        db_lock_stats['lock_wait_seconds_max'] = max(db_lock_stats['lock_wait_seconds_max'], waited)
+
+def _is_busy_error(error):
+    """True for SQLITE_BUSY / SQLITE_LOCKED errors"""
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+@contextmanager
+def write_transaction(conn):
+    """Run the enclosed statements as one short write transaction
+
+    Commits on success and rolls back on any exception. In high-concurrency
+    mode the write lock is acquired first (BEGIN IMMEDIATE), so SQLITE_BUSY can
+    only be raised here, where it is retried, rather than half way through.
+    """
+    begin = 'BEGIN IMMEDIATE' if HIGH_CONCURRENCY_MODE else 'BEGIN'
+    retries = DB_WRITE_RETRIES if HIGH_CONCURRENCY_MODE else 0
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            conn.execute(begin)
+            break
+        except sqlite3.OperationalError as e:
+            if not _is_busy_error(e) or attempt >= retries:
+                _record_lock_wait(time.perf_counter() - started, attempt, failed=True)
+                raise
+            time.sleep(DB_WRITE_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.0))
+            attempt += 1
+    _record_lock_wait(time.perf_counter() - started, attempt, failed=False)
+    
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+# Request metrics (per worker, exposed at /admin/metrics)
+# Each request is timed per endpoint. Time spent in SQLite (execute and fetch
+# calls on pooled connections), Jinja rendering and Plotly serialisation is
+# summed on g during the request and added to the endpoint's totals at the end.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_STATEMENT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+METRICS_PHASES = ('sqlite', 'template', 'plotly')
+
+class EndpointMetrics:
+    """Counters and histograms for one endpoint"""
+    __slots__ = ('responses', 'latency_buckets', 'latency_sum', 'statement_buckets',
+                 'statements', 'phase_seconds')
+
+    def __init__(self):
+        self.responses = {}  # (method, status) -> count
+        self.latency_buckets = [0] * (len(METRICS_LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.statement_buckets = [0] * (len(METRICS_STATEMENT_BUCKETS) + 1)
+        self.statements = 0
+        self.phase_seconds = dict.fromkeys(METRICS_PHASES, 0.0)
+
+_endpoint_metrics = {}
+_metrics_lock = threading.Lock()
+
+def _bucket_index(bounds, value):
+    """Index of the first histogram bucket that holds value (last one is +Inf)"""
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            return index
+    return len(bounds)
+
+def _record_sql(seconds, statements):
+    """Add SQLite time and statement count to the current request"""
+    if has_app_context():
+        timings = g.get('request_timings')
+        if timings is not None:
+            timings['sqlite'] += seconds
+            timings['statements'] += statements
+
+def record_phase_time(phase, seconds):
+    """Add time spent in a phase (template, plotly) to the current request"""
+    if has_app_context():
+        timings = g.get('request_timings')
+        if timings is not None:
+            timings[phase] += seconds
+
+@app.before_request
+def start_request_metrics():
+    """Start timing the request"""
+    if METRICS_ENABLED:
+        g.request_timings = dict.fromkeys(METRICS_PHASES, 0.0)
+        g.request_timings['statements'] = 0
+        g.request_started = time.perf_counter()
+
+@app.after_request
+def note_response_status(response):
+    """Remember the status code for the metrics recorded at teardown"""
+    g.response_status = response.status_code
+    return response
+
+@app.teardown_request
+def record_request_metrics(exception=None):
+    """Add the finished request to its endpoint's metrics"""
+    timings = g.pop('request_timings', None)
+    if timings is None:
+        return
+    elapsed = time.perf_counter() - g.pop('request_started')
+    status = g.pop('response_status', 500)
+    key = (request.method, status)
+    with _metrics_lock:
+        metrics = _endpoint_metrics.get(request.endpoint or 'unmatched')
+        if metrics is None:
+            metrics = _endpoint_metrics[request.endpoint or 'unmatched'] = EndpointMetrics()
+        metrics.responses[key] = metrics.responses.get(key, 0) + 1
+        metrics.latency_buckets[_bucket_index(METRICS_LATENCY_BUCKETS, elapsed)] += 1
+        metrics.latency_sum += elapsed
+        metrics.statement_buckets[_bucket_index(METRICS_STATEMENT_BUCKETS, timings['statements'])] += 1
+        metrics.statements += timings['statements']
+        for phase in METRICS_PHASES:
+            metrics.phase_seconds[phase] += timings[phase]
+
+@before_render_template.connect_via(app)
+def _template_render_started(sender, template, context, **extra):
+    if has_app_context():
+        g.template_started = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def _template_render_finished(sender, template, context, **extra):
+    started = g.pop('template_started', None) if has_app_context() else None
+    if started is not None:
+        record_phase_time('template', time.perf_counter() - started)
+
+def _metric_labels(**labels):
+    """Format Prometheus labels"""
+    return '{' + ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    ) + '}'
+
+def _histogram_lines(name, bounds, buckets, total, **labels):
+    """Cumulative bucket, _sum and _count lines of one histogram"""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(list(bounds) + ['+Inf'], buckets):
+        cumulative += count
+        lines.append(f'{name}_bucket{_metric_labels(**labels, le=bound)} {cumulative}')
+    lines.append(f'{name}_sum{_metric_labels(**labels)} {total}')
+    lines.append(f'{name}_count{_metric_labels(**labels)} {cumulative}')
+    return lines
+
+def render_metrics():
+    """This worker's metrics in the Prometheus text exposition format"""
+    with _metrics_lock:
+        snapshot = {endpoint: (dict(m.responses), list(m.latency_buckets), m.latency_sum,
+                               list(m.statement_buckets), m.statements, dict(m.phase_seconds))
+                    for endpoint, m in _endpoint_metrics.items()}
+    with _lock_stats_lock:
+        lock_stats = dict(db_lock_stats)
+    with _pool_lock:
+        idle_connections = len(_pool)
+
+    lines = [
+        '# HELP app_worker_info Worker process serving these metrics.',
+        '# TYPE app_worker_info gauge',
+        f'app_worker_info{_metric_labels(pid=os.getpid())} 1',
+        '# HELP app_startup_seconds Time to import app.py in this worker.',
+        '# TYPE app_startup_seconds gauge',
+        f'app_startup_seconds {startup_seconds}',
+        '# HELP app_chart_libraries_load_seconds Time to import Plotly on first use (0 = not loaded).',
+        '# TYPE app_chart_libraries_load_seconds gauge',
+        f'app_chart_libraries_load_seconds {chart_libraries_load_seconds or 0}',
+        '# HELP app_http_requests_total Requests handled, by endpoint, method and status.',
+        '# TYPE app_http_requests_total counter',
+    ]
+    for endpoint, (responses, *_) in sorted(snapshot.items()):
+        for (method, status), count in sorted(responses.items()):
+            lines.append(f'app_http_requests_total{_metric_labels(endpoint=endpoint, method=method, status=status)} {count}')
+
+    lines += ['# HELP app_http_request_duration_seconds Request latency (until the response is returned).',
+              '# TYPE app_http_request_duration_seconds histogram']
+    for endpoint, (_, latency_buckets, latency_sum, *_) in sorted(snapshot.items()):
+        lines += _histogram_lines('app_http_request_duration_seconds', METRICS_LATENCY_BUCKETS,
+                                  latency_buckets, latency_sum, endpoint=endpoint)
+
+    lines += ['# HELP app_sql_statements_per_request SQL statements executed per request.',
+              '# TYPE app_sql_statements_per_request histogram']
+    for endpoint, (_, _, _, statement_buckets, statements, _) in sorted(snapshot.items()):
+        lines += _histogram_lines('app_sql_statements_per_request', METRICS_STATEMENT_BUCKETS,
+                                  statement_buckets, statements, endpoint=endpoint)
+
+    lines += ['# HELP app_phase_seconds_total Time spent in SQLite, template rendering and Plotly serialisation.',
+              '# TYPE app_phase_seconds_total counter']
+    for endpoint, (*_, phase_seconds) in sorted(snapshot.items()):
+        for phase in METRICS_PHASES:
+            lines.append(f'app_phase_seconds_total{_metric_labels(endpoint=endpoint, phase=phase)} {phase_seconds[phase]}')
+
+    lines += [
+        '# HELP app_db_write_transactions_total Write transactions started.',
+        '# TYPE app_db_write_transactions_total counter',
+        f"app_db_write_transactions_total {lock_stats['write_transactions']}",
+        '# HELP app_db_busy_retries_total Write transactions retried after SQLITE_BUSY.',
+        '# TYPE app_db_busy_retries_total counter',
+        f"app_db_busy_retries_total {lock_stats['busy_retries']}",
+        '# HELP app_db_busy_failures_total Write transactions that gave up on the write lock.',
+        '# TYPE app_db_busy_failures_total counter',
+        f"app_db_busy_failures_total {lock_stats['busy_failures']}",
+        '# HELP app_db_lock_wait_seconds_total Time spent waiting for the write lock.',
+        '# TYPE app_db_lock_wait_seconds_total counter',
+        f"app_db_lock_wait_seconds_total {lock_stats['lock_wait_seconds_total']}",
+        '# HELP app_db_pool_idle_connections Connections idle in this worker\'s pool.',
+        '# TYPE app_db_pool_idle_connections gauge',
+        f'app_db_pool_idle_connections {idle_connections}',
+    ]
+    return '\n'.join(lines) + '\n'
+
+# Slow-query log
+# Statements that take longer than SLOW_QUERY_MS (execute plus fetch calls)
+# are written as JSON lines to a rotating file, with the route, the shape of
+# the bound parameters and the EXPLAIN QUERY PLAN captured the first time each
+# statement is seen, so full scans and temp B-trees show up before users
+# notice them.
+SLOW_QUERY_SECONDS = float(os.environ.get('SLOW_QUERY_MS', 100)) / 1000  # 0 disables
+SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', 'slow_queries.log')
+SLOW_QUERY_LOG_BYTES = int(os.environ.get('SLOW_QUERY_LOG_BYTES', 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', 5))
+SLOW_QUERY_PLAN_CACHE_SIZE = 500
+EXPLAINABLE_STATEMENTS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_query_plans = {}
+_slow_query_logger = None
+_slow_query_lock = threading.Lock()
+
+def get_slow_query_logger():
+    """Logger writing to the rotating slow-query file, created on first use"""
+    global _slow_query_logger
+    with _slow_query_lock:
+        if _slow_query_logger is None:
+            logger = logging.getLogger('automotive_service.slow_queries')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_BYTES,
+                                          backupCount=SLOW_QUERY_LOG_BACKUPS)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            _slow_query_logger = logger
+    return _slow_query_logger
+
+def parameter_shape(parameters):
+    """Types of the bound parameters, without their values"""
+    if parameters is None:
+        return 'executemany'
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return [type(value).__name__ for value in parameters]
+
+def get_query_plan(conn, sql, parameters):
+    """EXPLAIN QUERY PLAN for a statement, captured once per statement text"""
+    shape = ' '.join(sql.split())
+    if shape in _query_plans:
+        return _query_plans[shape]
+    plan = None
+    if parameters is not None and shape.upper().startswith(EXPLAINABLE_STATEMENTS):
+        try:
+            # The base class execute() bypasses the metered cursor
+            rows = sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+            plan = [row[3] for row in rows]
+        except sqlite3.Error as e:
+            plan = [f'unavailable: {e}']
+    if len(_query_plans) >= SLOW_QUERY_PLAN_CACHE_SIZE:
+        _query_plans.clear()
+    _query_plans[shape] = plan
+    return plan
+
+def log_slow_query(conn, sql, parameters, seconds):
+    """Write one slow statement to the slow-query log"""
+    try:
+        plan = get_query_plan(conn, sql, parameters)
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'duration_ms': round(seconds * 1000, 1),
+            'route': f'{request.method} {request.endpoint}' if has_request_context() else None,
+            'pid': os.getpid(),
+            'sql': ' '.join(sql.split()),
+            'parameters': parameter_shape(parameters),
+            'plan': plan,
+            'full_scan': any(step.startswith('SCAN ') and 'CONSTANT ROW' not in step for step in plan or []),
+            'temp_btree': any('TEMP B-TREE' in step for step in plan or []),
+        }
+        get_slow_query_logger().info(json.dumps(entry))
+    except Exception as e:
+        # Never fail a request because of the slow-query log
+        print(f"Slow-query log failed: {e}")
+
+# Scheduling engine
+# Shop capacity is SERVICE_BAYS vehicles at once. An appointment occupies one
+# bay from its start time for the service's estimated_duration.
+SERVICE_BAYS = int(os.environ.get('SERVICE_BAYS', 3))
+SHOP_OPEN = os.environ.get('SHOP_OPEN', '08:00')
+SHOP_CLOSE = os.environ.get('SHOP_CLOSE', '18:00')
+SLOT_MINUTES = 15
+ACTIVE_STATUSES = ('scheduled', 'in_progress')
+
+class SlotUnavailableError(Exception):
+    """Raised when every service bay is taken for the requested time"""
+
+def time_to_minutes(value):
+    """Convert 'HH:MM' (or 'HH:MM:SS') to minutes after midnight"""
+    hours, minutes = value.split(':')[:2]
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f'Invalid time: {value}')
+    return hours * 60 + minutes
+
+def minutes_to_time(minutes):
+    """Convert minutes after midnight to 'HH:MM'"""
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+def get_booked_intervals(conn, appointment_date, start=0, end=24 * 60, exclude_id=None):
+    """(start, end) minutes of active appointments on a day overlapping [start, end)
+
+    Uses idx_appointments_slot: an appointment can only overlap the window if it
+    starts less than the longest service duration before it, so only that
+    bounded range of the day's index is read.
+    """
+    max_duration = conn.execute('SELECT MAX(estimated_duration) FROM services').fetchone()[0] or 0
+    rows = conn.execute('''
+        SELECT a.id, a.appointment_time, s.estimated_duration
+        FROM appointments a
+        JOIN services s ON a.service_id = s.id
+        WHERE a.appointment_date = ?
+          AND a.appointment_time >= ? AND a.appointment_time < ?
+          AND a.status IN (?, ?)
+    ''', (appointment_date, minutes_to_time(max(0, start - max_duration)), minutes_to_time(end),
+          *ACTIVE_STATUSES)).fetchall()
+    
+    intervals = []
+    for row in rows:
+        if row['id'] == exclude_id:
+            continue
+        booked_start = time_to_minutes(row['appointment_time'])
+        booked_end = booked_start + row['estimated_duration']
+        if booked_start < end and booked_end > start:
+            intervals.append((booked_start, booked_end))
+    return intervals
+
+def peak_bays_in_use(intervals, start, end):
+    """Largest number of intervals overlapping at any moment within [start, end)"""
+    events = []
+    for booked_start, booked_end in intervals:
+        if booked_start < end and booked_end > start:
+            events.append((max(booked_start, start), 1))
+            events.append((min(booked_end, end), -1))
+    # Ends sort before starts at the same minute, so back-to-back bookings share a bay
+    events.sort()
+    peak = in_use = 0
+    for _, delta in events:
+        in_use += delta
+        peak = max(peak, in_use)
+    return peak
+
+def is_slot_available(conn, appointment_date, appointment_time, duration, exclude_id=None):
+    """True if a bay is free for the whole of [time, time + duration)"""
+    start = time_to_minutes(appointment_time)
+    end = start + duration
+    intervals = get_booked_intervals(conn, appointment_date, start, end, exclude_id)
+    return peak_bays_in_use(intervals, start, end) < SERVICE_BAYS
+
+def suggest_alternative_slots(conn, appointment_date, appointment_time, duration, exclude_id=None, limit=3):
+    """Free start times on the same day, closest to the requested time first"""
+    opening, closing = time_to_minutes(SHOP_OPEN), time_to_minutes(SHOP_CLOSE)
+    requested = time_to_minutes(appointment_time)
+    intervals = get_booked_intervals(conn, appointment_date, opening, closing, exclude_id)
+    
+    candidates = range(opening, closing - duration + 1, SLOT_MINUTES)
+    free = [start for start in candidates
+            if peak_bays_in_use(intervals, start, start + duration) < SERVICE_BAYS]
+    free.sort(key=lambda start: abs(start - requested))
+    return [minutes_to_time(start) for start in sorted(free[:limit])]
+
+def book_slot_or_raise(conn, appointment_date, appointment_time, duration, exclude_id=None):
+    """Raise SlotUnavailableError if the slot is full; call inside write_transaction()
+
+    Running the check under the write lock makes check-then-insert atomic
+    across workers.
+    """
+    if not is_slot_available(conn, appointment_date, appointment_time, duration, exclude_id):
+        raise SlotUnavailableError(appointment_time)
+
+def flash_slot_unavailable(conn, appointment_date, appointment_time, duration, exclude_id=None):
+    """Tell the customer the slot is full and re-offer nearby free times"""
+    alternatives = suggest_alternative_slots(conn, appointment_date, appointment_time, duration, exclude_id)
+    if alternatives:
+        flash(f'All service bays are booked at {appointment_time} on {appointment_date}. '
+              f'Available times that day: {", ".join(alternatives)}.', 'warning')
+    else:
+        flash(f'All service bays are booked on {appointment_date}. Please choose another date.', 'warning')
+
+# Slot occupancy bitmaps (per worker)
+# The opening hours of each day are split into SLOT_MINUTES slots. Bays fill
+# bottom-up: bit i of bitsets[b] is set when at least b + 1 bays are busy in
+# slot i, so the top bitset is the mask of full slots. Cached days carry the
+# schedule_day_versions value they were built from; a mismatch means another
+# worker changed that day and it is rebuilt from idx_appointments_slot.
+OCCUPANCY_CACHE_DAYS = 400
+AVAILABILITY_MAX_DAYS = 92
+
+class DayOccupancy:
+    """Bay occupancy bitsets for one day"""
+    __slots__ = ('version', 'bitsets', 'overflow')
+
+    def __init__(self, version):
+        self.version = version
+        self.bitsets = [0] * SERVICE_BAYS
+        # Bookings beyond capacity (legacy data or fewer bays configured)
+        self.overflow = {}
+
+    def occupy(self, first_slot, last_slot):
+        for slot in range(first_slot, last_slot):
+            bit = 1 << slot
+            for level, bits in enumerate(self.bitsets):
+                if not bits & bit:
+                    self.bitsets[level] = bits | bit
+                    break
+            else:
+                self.overflow[slot] = self.overflow.get(slot, 0) + 1
+
+    def release(self, first_slot, last_slot):
+        for slot in range(first_slot, last_slot):
+            if self.overflow.get(slot):
+                self.overflow[slot] -= 1
+                continue
+            bit = 1 << slot
+            for level in range(len(self.bitsets) - 1, -1, -1):
+                if self.bitsets[level] & bit:
+                    self.bitsets[level] &= ~bit
+                    break
+
+    def free_starts(self, length, slot_count):
+        """Mask of slots that begin `length` consecutive slots with a free bay"""
+        free = ~self.bitsets[-1] & ((1 << slot_count) - 1)
+        starts = free
+        for shift in range(1, length):
+            starts &= free >> shift
+        return starts
+
+_occupancy_cache = {}
+_occupancy_lock = threading.Lock()
+
+def _shop_slots():
+    """(opening minute, number of slots) for the configured shop hours"""
+    opening = time_to_minutes(SHOP_OPEN)
+    return opening, (time_to_minutes(SHOP_CLOSE) - opening) // SLOT_MINUTES
+
+def _slot_range(start, end):
+    """Slots touched by [start, end) minutes, clipped to opening hours"""
+    opening, slot_count = _shop_slots()
+    first_slot = max(0, (start - opening) // SLOT_MINUTES)
+    last_slot = min(slot_count, -(-(end - opening) // SLOT_MINUTES))
+    return first_slot, max(first_slot, last_slot)
+
+def _build_day_occupancy(conn, day, version):
+    """Build a day's bitsets from the appointments table"""
+    opening, slot_count = _shop_slots()
+    occupancy = DayOccupancy(version)
+    for start, end in get_booked_intervals(conn, day, opening, opening + slot_count * SLOT_MINUTES):
+        occupancy.occupy(*_slot_range(start, end))
+    return occupancy
+
+def get_day_occupancy(conn, first_day, last_day):
+    """{ISO date: DayOccupancy} for every day in the range, rebuilding stale days"""
+    versions = dict(conn.execute(
+        'SELECT appointment_date, version FROM schedule_day_versions WHERE appointment_date BETWEEN ? AND ?',
+        (first_day.isoformat(), last_day.isoformat())
+    ).fetchall())
+    
+    result = {}
+    day = first_day
+    while day <= last_day:
+        key = day.isoformat()
+        version = versions.get(key, 0)
+        with _occupancy_lock:
+            occupancy = _occupancy_cache.get(key)
+        if occupancy is None or occupancy.version != version:
+            occupancy = _build_day_occupancy(conn, key, version)
+            with _occupancy_lock:
+                if len(_occupancy_cache) >= OCCUPANCY_CACHE_DAYS:
+                    _occupancy_cache.clear()
+                _occupancy_cache[key] = occupancy
+        result[key] = occupancy
+        day = date.fromordinal(day.toordinal() + 1)
+    return result
+
+def _apply_occupancy_change(conn, day, released=None, occupied=None):
+    """Apply one statement's effect on a day to the cached bitsets"""
+    row = conn.execute(
+        'SELECT version FROM schedule_day_versions WHERE appointment_date = ?', (day,)
+    ).fetchone()
+    version = row[0] if row else 0
+    with _occupancy_lock:
+        occupancy = _occupancy_cache.get(day)
+        if occupancy is None:
+            return
+        if occupancy.version != version - 1:
+            # Another worker changed the day too; rebuild on next lookup
+            del _occupancy_cache[day]
+            return
+        if released:
+            occupancy.release(*_slot_range(*released))
+        if occupied:
+            occupancy.occupy(*_slot_range(*occupied))
+        occupancy.version = version
+
+def note_booking_change(conn, before=None, after=None):
+    """Update this worker's slot bitmaps after inserting, editing or cancelling a booking
+
+    before/after are (date, time, duration) for the bay the appointment held
+    before and holds after the write, or None. Call inside write_transaction()
+    right after the write, so the day versions read here are our own.
+    """
+    def interval(booking):
+        start = time_to_minutes(booking[1])
+        return start, start + booking[2]
+    
+    if before and after and before[0] == after[0]:
+        _apply_occupancy_change(conn, before[0], interval(before), interval(after))
+        return
+    if before:
+        _apply_occupancy_change(conn, before[0], released=interval(before))
+    if after:
+        _apply_occupancy_change(conn, after[0], occupied=interval(after))
+
+def get_booking_duration(conn, service_id):
+    """estimated_duration of a service in minutes"""
+    row = conn.execute('SELECT estimated_duration FROM services WHERE id = ?', (service_id,)).fetchone()
+    return row['estimated_duration'] if row else 0
+
+# Booking activity (from the appointment event log)
+# Totals for the analytics page are kept in the one-row booking_activity
+# table. The booking_activity consumer (see appointment_events.py) folds the
+# events written since its cursor into it, so a refresh reads only what is
+# new and every worker sees the same totals.
+BookingActivity = namedtuple('BookingActivity', ['bookings', 'reschedules', 'cancellations',
+                                                 'completions', 'lead_days_total', 'lead_days_count'])
+
+def fold_booking_event(activity, event):
+    """BookingActivity with one event applied
+
+    An appointment booked as cancelled or completed counts from its 'created'
+    event; later status changes count from their 'status_changed' event.
+    """
+    kind = event['event_type']
+    if kind in ('created', 'status_changed') and event['status'] == 'cancelled':
+        activity = activity._replace(cancellations=activity.cancellations + 1)
+    elif kind in ('created', 'status_changed') and event['status'] == 'completed':
+        activity = activity._replace(completions=activity.completions + 1)
+    if kind == 'created':
+        activity = activity._replace(bookings=activity.bookings + 1)
+        try:
+            booked = datetime.fromisoformat(str(event['occurred_at'])).date()
+            lead_days = (date.fromisoformat(event['appointment_date']) - booked).days
+        except (TypeError, ValueError):
+            return activity
+        return activity._replace(lead_days_total=activity.lead_days_total + lead_days,
+                                 lead_days_count=activity.lead_days_count + 1)
+    if kind == 'rescheduled':
+        return activity._replace(reschedules=activity.reschedules + 1)
+    return activity
+
+def add_booking_events(conn, events):
+    """consume() handler: add a batch of events to the booking_activity row"""
+    delta = BookingActivity(0, 0, 0, 0, 0, 0)
+    for event in events:
+        delta = fold_booking_event(delta, event)
+    conn.execute('''
+        UPDATE booking_activity SET
+            bookings = bookings + ?, reschedules = reschedules + ?,
+            cancellations = cancellations + ?, completions = completions + ?,
+            lead_days_total = lead_days_total + ?, lead_days_count = lead_days_count + ?
+        WHERE id = 1
+    ''', delta)
+
+def get_booking_activity(conn):
+    """BookingActivity with the events written since the consumer's cursor added"""
+    # Plain reads first, so a view with nothing new to fold takes no write lock
+    latest = conn.execute('SELECT COALESCE(MAX(id), 0) FROM appointment_events').fetchone()[0]
+    if latest > get_cursor(conn, BOOKING_ACTIVITY_CONSUMER):
+        consume(conn, BOOKING_ACTIVITY_CONSUMER, add_booking_events, transaction=write_transaction)
+    row = conn.execute(f'''
+        SELECT {', '.join(BookingActivity._fields)} FROM booking_activity WHERE id = 1
+    ''').fetchone()
+    return BookingActivity(*row)
+
+# Response cache
+# Whole response bodies are kept per worker and reused while the database
+# files are unchanged and the entry is younger than its TTL. The change
+# signal is two stat() calls, so a cache hit runs no SQL and no encoding.
+CHART_CACHE_TTL = float(os.environ.get('CHART_CACHE_TTL', 60))
+
+_response_cache = {}
+_response_cache_lock = threading.Lock()
+
+def database_change_signal():
+    """Token that changes whenever the database or its WAL file is written
+
+    Checkpoints change it too, which only costs a cache miss. On filesystems
+    with coarse timestamps a write can go unnoticed until the TTL expires.
+    """
+    signal = []
+    for path in (DATABASE, DATABASE + '-wal'):
+        try:
+            stat = os.stat(path)
+            signal.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signal.append(None)
+    return tuple(signal)
+
+def cached_response(key, ttl, build):
+    """Serve the body from build() through the response cache
+
+    build() returns (body bytes, mimetype). Responses carry an ETag, and a
+    matching If-None-Match is answered with 304 Not Modified.
+    """
+    # Taken before building so a write during build() invalidates the entry
+    signal = database_change_signal()
+    now = time.monotonic()
+    with _response_cache_lock:
+        entry = _response_cache.get(key)
+    
+    if entry is None or entry['signal'] != signal or now - entry['created'] > ttl:
+        body, mimetype = build()
+        entry = {
+            'signal': signal,
+            'created': now,
+            'body': body,
+            'mimetype': mimetype,
+            'etag': hashlib.sha1(body).hexdigest(),
+        }
+        with _response_cache_lock:
+            _response_cache[key] = entry
+    
+    response = Response(entry['body'], mimetype=entry['mimetype'])
+    response.set_etag(entry['etag'])
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+def invalidate_response_cache(key=None):
+    """Drop one cached response, or all of them"""
+    with _response_cache_lock:
+        if key is None:
+            _response_cache.clear()
+        else:
+            _response_cache.pop(key, None)
+
+# Service catalog cache (per worker)
+# The active services are kept as immutable records. A stat() of the database
+# files tells whether anything was written; only then is the services change
+# counter (table_versions, bumped by triggers) read, and the catalog reloaded
+# if it moved. Pages that render nothing but the catalog can also be served
+# whole from the response cache to anonymous visitors (PAGE_CACHE_TTL > 0).
+PAGE_CACHE_TTL = float(os.environ.get('PAGE_CACHE_TTL', 0))  # seconds, 0 disables
+
+ServiceRecord = namedtuple('ServiceRecord', ['id', 'name', 'description', 'estimated_duration', 'price', 'is_active'])
+ServiceCatalog = namedtuple('ServiceCatalog', ['signal', 'version', 'services', 'by_id'])
+
+EMPTY_SERVICE_CATALOG = ServiceCatalog(None, None, (), MappingProxyType({}))
+_service_catalog = EMPTY_SERVICE_CATALOG
+
+def get_service_catalog():
+    """Active services ordered by name (services) and keyed by id (by_id)"""
+    global _service_catalog
+    catalog = _service_catalog
+    # Taken before reading so a concurrent change is picked up next time
+    signal = database_change_signal()
+    if catalog.signal == signal:
+        return catalog
+
+    conn = get_db_connection()
+    row = conn.execute("SELECT version FROM table_versions WHERE name = 'services'").fetchone()
+    version = row['version'] if row else 0
+    if catalog.version != version:
+        rows = conn.execute('''
+            SELECT id, name, description, estimated_duration, price, is_active
+            FROM services WHERE is_active = 1 ORDER BY name
+        ''').fetchall()
+        services = tuple(ServiceRecord(*row) for row in rows)
+        catalog = ServiceCatalog(signal, version, services,
+                                 MappingProxyType({service.id: service for service in services}))
+    else:
+        catalog = catalog._replace(signal=signal)
+    # A single assignment, so readers always see a complete catalog
+    _service_catalog = catalog
+    return catalog
+
+def invalidate_service_catalog():
+    """Force the next get_service_catalog() call to reload"""
+    global _service_catalog
+    _service_catalog = EMPTY_SERVICE_CATALOG
+
+def cached_public_page(key, build):
+    """Serve a public page from the response cache to anonymous visitors
+
+    Pages are cached only without a logged-in customer and without pending
+    flash messages, since both change what base.html renders.
+    """
+    if PAGE_CACHE_TTL <= 0 or 'customer_id' in session or '_flashes' in session:
+        return build()
+    return cached_response(key, PAGE_CACHE_TTL, lambda: (build().encode('utf-8'), 'text/html'))
+
+# Make/model autocomplete (per worker)
+# Canonical makes and models come from the vehicles already stored (most
+# common spelling wins) and Data/USA_cars_datasets.csv. Each list is kept
+# sorted by its case-folded key, so a keystroke costs a bisect and a short
+# slice. Makes and models are normalised to the canonical spelling on insert,
+# so case variants no longer split the vehicle make chart.
+VEHICLE_NAMES_CSV = os.environ.get('VEHICLE_NAMES_CSV', os.path.join('Data', 'USA_cars_datasets.csv'))
+AUTOCOMPLETE_LIMIT = 10
+
+def name_key(name):
+    """Case- and spacing-insensitive lookup key for a make or model"""
+    return ' '.join(name.split()).casefold()
+
+def clean_vehicle_name(name):
+    """Spelling for a make or model that is not known yet
+
+    Extra spaces are dropped and all-lower or all-upper words are
+    title-cased like the CSV imports. Mixed case (McLaren) and codes with
+    digits (R1T) are kept as typed.
+    """
+    name = ' '.join(name.split())
+    if name.islower() or (name.isupper() and not any(ch.isdigit() for ch in name)):
+        name = name[:1].upper() + name[1:].lower()
+    return name
+
+class PrefixIndex:
+    """Canonical names kept sorted by key for bisect prefix lookups"""
+
+    def __init__(self, names=()):
+        # The first spelling seen for a key is the canonical one
+        self.names = {}
+        for name in names:
+            self.names.setdefault(name_key(name), name)
+        self.keys = sorted(self.names)
+
+    def canonical(self, name):
+        """Known spelling of name, or None"""
+        return self.names.get(name_key(name))
+
+    def add(self, name):
+        """Add a new name; known keys keep their canonical spelling"""
+        key = name_key(name)
+        if key not in self.names:
+            self.names[key] = name
+            bisect.insort(self.keys, key)
+
+    def complete(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """Up to limit canonical names starting with prefix, in key order"""
+        prefix = name_key(prefix)
+        start = bisect.bisect_left(self.keys, prefix)
+        matches = []
+        for key in self.keys[start:start + limit]:
+            if not key.startswith(prefix):
+                break
+            matches.append(self.names[key])
+        return matches
+
+class VehicleNames:
+    """Make index plus one model index per make"""
+
+    def __init__(self, pairs):
+        models = {}
+        for make, model in pairs:
+            models.setdefault(name_key(make), []).append(model)
+        self.makes = PrefixIndex(make for make, _ in pairs)
+        self.models = {key: PrefixIndex(names) for key, names in models.items()}
+
+    def normalise(self, make, model):
+        """Canonical (make, model) spellings for user input"""
+        make = self.makes.canonical(make) or clean_vehicle_name(make)
+        models = self.models.get(name_key(make))
+        model = (models and models.canonical(model)) or clean_vehicle_name(model)
+        return make, model
+
+    def add(self, make, model):
+        """Remember a stored vehicle's make and model for later lookups"""
+        self.makes.add(make)
+        self.models.setdefault(name_key(make), PrefixIndex()).add(model)
+
+    def complete_models(self, make, prefix):
+        """Model completions for a make (empty if the make is unknown)"""
+        models = self.models.get(name_key(make))
+        return models.complete(prefix) if models else []
+
+_vehicle_names = None
+
+def load_vehicle_name_pairs():
+    """(make, model) pairs: stored spellings by popularity, then the CSV"""
+    conn = get_db_connection()
+    try:
+        pairs = [(row['make'], row['model']) for row in conn.execute('''
+            SELECT make, model FROM vehicles
+            WHERE TRIM(make) != '' AND TRIM(model) != ''
+            GROUP BY make, model
+            ORDER BY COUNT(*) DESC
+        ''')]
+    finally:
+        conn.close()
+
+    try:
+        with open(VEHICLE_NAMES_CSV, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                make, model = row.get('brand', '').strip(), row.get('model', '').strip()
+                if make and model:
+                    pairs.append((clean_vehicle_name(make), clean_vehicle_name(model)))
+    except OSError as e:
+        print(f"⚠️  Vehicle names CSV not loaded: {e}")
+    return pairs
+
+def get_vehicle_names():
+    """The worker's make/model index, built on first use"""
+    global _vehicle_names
+    if _vehicle_names is None:
+        _vehicle_names = VehicleNames(load_vehicle_name_pairs())
+    return _vehicle_names
+
 def hash_password(password):
     """Hash password using SHA256"""
     return hashlib.sha256(password.encode()).hexdigest()
@@ -64,13 +1189,14 @@ def get_current_customer():
     if 'customer_id' not in session:
         return None
     
-    conn = get_db_connection()
-    customer = conn.execute(
-        'SELECT * FROM customers WHERE id = ?', 
-        (session['customer_id'],)
-    ).fetchone()
-    conn.close()
-    return customer
+    # Looked up at most once per request
+    if 'current_customer' not in g:
+        conn = get_db_connection()
+        g.current_customer = conn.execute(
+            'SELECT * FROM customers WHERE id = ?', 
+            (session['customer_id'],)
+        ).fetchone()
+    return g.current_customer
 
 # Authentication Routes
 @app.route('/login', methods=['GET', 'POST'])
@@ -131,11 +1257,11 @@ def register():
             return render_template('register.html')
         
         try:
-            conn.execute('''
-                INSERT INTO customers (first_name, last_name, email, password, phone, address)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (first_name, last_name, email, hash_password(password), phone, address))
-            conn.commit()
+            with write_transaction(conn):
+                conn.execute('''
+                    INSERT INTO customers (first_name, last_name, email, password, phone, address)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (first_name, last_name, email, hash_password(password), phone, address))
             
             # Auto-login after registration
             customer = conn.execute(
@@ -166,21 +1292,15 @@ def logout():
 @app.route('/')
 def index():
     """Home page - public"""
-    conn = get_db_connection()
-    
-    # Get available services for display
-    services = conn.execute(
-        'SELECT * FROM services WHERE is_active = 1 ORDER BY name'
-    ).fetchall()
-    
-    conn.close()
-    
-    # Check if user is logged in
-    current_customer = get_current_customer()
-    
-    return render_template('index.html', 
-                         services=services,
-                         current_customer=current_customer)
+    def build():
+        # Check if user is logged in
+        current_customer = get_current_customer()
+
+        return render_template('index.html',
+                             services=get_service_catalog().services,
+                             current_customer=current_customer)
+
+    return cached_public_page('page:index', build)
 
 @app.route('/dashboard')
 @login_required
@@ -247,8 +1367,8 @@ def add_vehicle():
     """Add vehicle for logged in customer"""
     if request.method == 'POST':
         customer_id = session['customer_id']
-        make = request.form['make']
-        model = request.form['model']
+        vehicle_names = get_vehicle_names()
+        make, model = vehicle_names.normalise(request.form['make'], request.form['model'])
         year = int(request.form['year'])
         vin = request.form['vin']
         license_plate = request.form['license_plate']
@@ -257,11 +1377,12 @@ def add_vehicle():
         
         conn = get_db_connection()
         try:
-            conn.execute('''
-                INSERT INTO vehicles (customer_id, make, model, year, vin, license_plate, color, mileage)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (customer_id, make, model, year, vin, license_plate, color, mileage))
-            conn.commit()
+            with write_transaction(conn):
+                conn.execute('''
+                    INSERT INTO vehicles (customer_id, make, model, year, vin, license_plate, color, mileage)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (customer_id, make, model, year, vin, license_plate, color, mileage))
+            vehicle_names.add(make, model)
             flash('Vehicle added successfully!', 'success')
             return redirect(url_for('my_vehicles'))
         except sqlite3.Error as e:
@@ -319,14 +1440,27 @@ def add_appointment():
             conn.close()
             return redirect(url_for('add_appointment'))
         
+        service = get_service_catalog().by_id.get(service_id)
+        
+        if not service:
+            flash('Invalid service selection.', 'error')
+            conn.close()
+            return redirect(url_for('add_appointment'))
+        
         try:
-            conn.execute('''
-                INSERT INTO appointments (customer_id, vehicle_id, service_id, appointment_date, appointment_time, notes)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (customer_id, vehicle_id, service_id, appointment_date, appointment_time, notes))
-            conn.commit()
+            with write_transaction(conn):
+                book_slot_or_raise(conn, appointment_date, appointment_time, service.estimated_duration)
+                conn.execute('''
+                    INSERT INTO appointments (customer_id, vehicle_id, service_id, appointment_date, appointment_time, notes)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (customer_id, vehicle_id, service_id, appointment_date, appointment_time, notes))
+                note_booking_change(conn, after=(appointment_date, appointment_time, service.estimated_duration))
             flash('Appointment scheduled successfully!', 'success')
             return redirect(url_for('my_appointments'))
+        except SlotUnavailableError:
+            flash_slot_unavailable(conn, appointment_date, appointment_time, service.estimated_duration)
+        except ValueError:
+            flash('Invalid appointment time.', 'error')
         except sqlite3.Error as e:
             flash('Error scheduling appointment. Please try again.', 'error')
         finally:
@@ -344,16 +1478,12 @@ def add_appointment():
         conn.close()
         return redirect(url_for('add_vehicle'))
     
-    services = conn.execute(
-        'SELECT * FROM services WHERE is_active = 1 ORDER BY name'
-    ).fetchall()
-    
     conn.close()
     
     current_customer = get_current_customer()
     return render_template('add_appointment.html', 
                          vehicles=vehicles, 
-                         services=services,
+                         services=get_service_catalog().services,
                          current_customer=current_customer)
 
 @app.route('/appointments/cancel/<int:appointment_id>', methods=['POST'])
@@ -383,11 +1513,13 @@ def cancel_appointment(appointment_id):
             return redirect(url_for('my_appointments'))
         
         # Update appointment status to cancelled
-        conn.execute(
-            'UPDATE appointments SET status = ? WHERE id = ?',
-            ('cancelled', appointment_id)
-        )
-        conn.commit()
+        with write_transaction(conn):
+            conn.execute(
+                'UPDATE appointments SET status = ? WHERE id = ?',
+                ('cancelled', appointment_id)
+            )
+            note_booking_change(conn, before=(appointment['appointment_date'], appointment['appointment_time'],
+                                              get_booking_duration(conn, appointment['service_id'])))
         flash('Appointment cancelled successfully.', 'success')
         
     except sqlite3.Error as e:
@@ -438,15 +1570,34 @@ def edit_appointment(appointment_id):
             conn.close()
             return redirect(url_for('edit_appointment', appointment_id=appointment_id))
         
+        service = get_service_catalog().by_id.get(service_id)
+        
+        if not service:
+            flash('Invalid service selection.', 'error')
+            conn.close()
+            return redirect(url_for('edit_appointment', appointment_id=appointment_id))
+        
         try:
-            conn.execute('''
-                UPDATE appointments 
-                SET vehicle_id = ?, service_id = ?, appointment_date = ?, appointment_time = ?, notes = ?
-                WHERE id = ? AND customer_id = ?
-            ''', (vehicle_id, service_id, appointment_date, appointment_time, notes, appointment_id, customer_id))
-            conn.commit()
+            with write_transaction(conn):
+                # The appointment's current booking must not count against itself
+                book_slot_or_raise(conn, appointment_date, appointment_time,
+                                   service.estimated_duration, exclude_id=appointment_id)
+                conn.execute('''
+                    UPDATE appointments 
+                    SET vehicle_id = ?, service_id = ?, appointment_date = ?, appointment_time = ?, notes = ?
+                    WHERE id = ? AND customer_id = ?
+                ''', (vehicle_id, service_id, appointment_date, appointment_time, notes, appointment_id, customer_id))
+                note_booking_change(conn,
+                                    before=(appointment['appointment_date'], appointment['appointment_time'],
+                                            get_booking_duration(conn, appointment['service_id'])),
+                                    after=(appointment_date, appointment_time, service.estimated_duration))
             flash('Appointment updated successfully!', 'success')
             return redirect(url_for('my_appointments'))
+        except SlotUnavailableError:
+            flash_slot_unavailable(conn, appointment_date, appointment_time,
+                                   service.estimated_duration, exclude_id=appointment_id)
+        except ValueError:
+            flash('Invalid appointment time.', 'error')
         except sqlite3.Error as e:
             flash('Error updating appointment. Please try again.', 'error')
         finally:
@@ -458,17 +1609,13 @@ def edit_appointment(appointment_id):
         (customer_id,)
     ).fetchall()
     
-    services = conn.execute(
-        'SELECT * FROM services WHERE is_active = 1 ORDER BY name'
-    ).fetchall()
-    
     conn.close()
     
     current_customer = get_current_customer()
     return render_template('edit_appointment.html', 
                          appointment=appointment,
                          vehicles=vehicles, 
-                         services=services,
+                         services=get_service_catalog().services,
                          current_customer=current_customer)
 
 # Profile Routes
@@ -493,12 +1640,12 @@ def edit_profile():
         
         conn = get_db_connection()
         try:
-            conn.execute('''
-                UPDATE customers 
-                SET first_name = ?, last_name = ?, phone = ?, address = ?
-                WHERE id = ?
-            ''', (first_name, last_name, phone, address, customer_id))
-            conn.commit()
+            with write_transaction(conn):
+                conn.execute('''
+                    UPDATE customers 
+                    SET first_name = ?, last_name = ?, phone = ?, address = ?
+                    WHERE id = ?
+                ''', (first_name, last_name, phone, address, customer_id))
             
             # Update session name
             session['customer_name'] = f"{first_name} {last_name}"
@@ -517,14 +1664,12 @@ def edit_profile():
 @app.route('/services')
 def services():
     """List all available services"""
-    conn = get_db_connection()
-    services = conn.execute(
-        'SELECT * FROM services WHERE is_active = 1 ORDER BY name'
-    ).fetchall()
-    conn.close()
-    
-    current_customer = get_current_customer()
-    return render_template('services.html', services=services, current_customer=current_customer)
+    def build():
+        current_customer = get_current_customer()
+        return render_template('services.html', services=get_service_catalog().services,
+                               current_customer=current_customer)
+
+    return cached_public_page('page:services', build)
 
 # API Routes for AJAX (Customer-specific)
 @app.route('/api/my-vehicles')
@@ -541,23 +1686,81 @@ def api_my_vehicles():
     
     return jsonify([dict(vehicle) for vehicle in vehicles])
 
+@app.route('/api/vehicle-makes')
+def api_vehicle_makes():
+    """API endpoint for make autocomplete (?q=prefix)"""
+    return jsonify(get_vehicle_names().makes.complete(request.args.get('q', '')))
+
+@app.route('/api/vehicle-models')
+def api_vehicle_models():
+    """API endpoint for model autocomplete (?make=...&q=prefix)"""
+    return jsonify(get_vehicle_names().complete_models(request.args.get('make', ''),
+                                                       request.args.get('q', '')))
+
+@app.route('/api/availability')
+def api_availability():
+    """API endpoint to get free start times for a service over a date range"""
+    service_id = request.args.get('service_id', type=int)
+    try:
+        first_day = date.fromisoformat(request.args.get('from', ''))
+        last_day = date.fromisoformat(request.args.get('to') or first_day.isoformat())
+    except ValueError:
+        return jsonify({'error': 'from and to must be dates in YYYY-MM-DD format'}), 400
+    
+    if last_day < first_day or (last_day - first_day).days >= AVAILABILITY_MAX_DAYS:
+        return jsonify({'error': f'Date range must cover 1 to {AVAILABILITY_MAX_DAYS} days'}), 400
+    
+    service = get_service_catalog().by_id.get(service_id)
+    if not service:
+        return jsonify({'error': 'Unknown service'}), 404
+    
+    conn = get_db_connection()
+    occupancy = get_day_occupancy(conn, first_day, last_day)
+    conn.close()
+    
+    opening, slot_count = _shop_slots()
+    length = max(1, -(-service.estimated_duration // SLOT_MINUTES))
+    availability = {}
+    for day, day_occupancy in occupancy.items():
+        starts = day_occupancy.free_starts(length, slot_count)
+        times = []
+        while starts:
+            lowest = starts & -starts
+            times.append(minutes_to_time(opening + (lowest.bit_length() - 1) * SLOT_MINUTES))
+            starts ^= lowest
+        availability[day] = times
+    
+    return jsonify({
+        'service_id': service.id,
+        'duration': service.estimated_duration,
+        'slot_minutes': SLOT_MINUTES,
+        'availability': availability
+    })
+
 # API Routes for Admin Charts
 @app.route('/admin/api/chart-data')
 @admin_required
 def admin_chart_data():
     """API endpoint to get chart data for admin dashboard"""
-    conn = get_db_connection()
+    return cached_response('admin_chart_data', CHART_CACHE_TTL, build_chart_data)
+
+def build_chart_data():
+    """Run the chart aggregations and encode them as JSON"""
+    conn = get_report_connection()
+    
+    # Appointment charts read the trigger-maintained appointment_rollup, so
+    # their cost depends on the number of days covered, not on appointment rows
     
     # Monthly appointments trend (last 12 months)
     monthly_appointments = conn.execute('''
         SELECT 
-            strftime('%Y-%m', appointment_date) as month,
-            COUNT(*) as appointment_count,
-            SUM(s.price) as revenue
-        FROM appointments a
-        JOIN services s ON a.service_id = s.id
-        WHERE a.appointment_date >= date('now', '-12 months')
-        GROUP BY strftime('%Y-%m', appointment_date)
+            substr(r.appointment_date, 1, 7) as month,
+            SUM(r.appointment_count) as appointment_count,
+            SUM(r.appointment_count * s.price) as revenue
+        FROM appointment_rollup r
+        JOIN services s ON r.service_id = s.id
+        WHERE r.appointment_date >= date('now', '-12 months') AND r.appointment_count > 0
+        GROUP BY month
         ORDER BY month
     ''').fetchall()
     
@@ -565,10 +1768,10 @@ def admin_chart_data():
     service_popularity = conn.execute('''
         SELECT 
             s.name,
-            COUNT(a.id) as appointment_count,
-            SUM(CASE WHEN a.status = 'completed' THEN s.price ELSE 0 END) as revenue
+            COALESCE(SUM(r.appointment_count), 0) as appointment_count,
+            SUM(CASE WHEN r.status = 'completed' THEN r.appointment_count * s.price ELSE 0 END) as revenue
         FROM services s
-        LEFT JOIN appointments a ON s.id = a.service_id
+        LEFT JOIN appointment_rollup r ON s.id = r.service_id
         GROUP BY s.id, s.name
         ORDER BY appointment_count DESC
         LIMIT 10
@@ -577,26 +1780,30 @@ def admin_chart_data():
     # Appointment status distribution
     appointment_status = conn.execute('''
         SELECT 
-            status,
-            COUNT(*) as count
-        FROM appointments
+            NULLIF(status, '') as status,
+            SUM(appointment_count) as count
+        FROM appointment_rollup
         GROUP BY status
+        HAVING count > 0
         ORDER BY count DESC
     ''').fetchall()
     
-    # Top customers by spending
+    # Top customers by spending, from the trigger-maintained customer_spend
+    # rollup: take ten rows off the end of its spend index, then join customers
     top_customers = conn.execute('''
-        SELECT 
+        SELECT
             c.first_name || ' ' || c.last_name as customer_name,
-            COUNT(a.id) as appointment_count,
-            SUM(CASE WHEN a.status = 'completed' THEN s.price ELSE 0 END) as total_spent
-        FROM customers c
-        LEFT JOIN appointments a ON c.id = a.customer_id
-        LEFT JOIN services s ON a.service_id = s.id
-        GROUP BY c.id, c.first_name, c.last_name
-        HAVING total_spent > 0
-        ORDER BY total_spent DESC
-        LIMIT 10
+            t.appointment_count,
+            t.spent_cents / 100.0 as total_spent
+        FROM (
+            SELECT customer_id, appointment_count, spent_cents
+            FROM customer_spend
+            WHERE spent_cents > 0
+            ORDER BY spent_cents DESC
+            LIMIT 10
+        ) t
+        JOIN customers c ON c.id = t.customer_id
+        ORDER BY t.spent_cents DESC
     ''').fetchall()
     
     # Vehicle make distribution
@@ -613,34 +1820,36 @@ def admin_chart_data():
     # Daily appointment hours distribution
     appointment_hours = conn.execute('''
         SELECT 
-            strftime('%H', appointment_time) as hour,
-            COUNT(*) as count
-        FROM appointments
-        GROUP BY strftime('%H', appointment_time)
+            NULLIF(hour, '') as hour,
+            SUM(appointment_count) as count
+        FROM appointment_rollup
+        GROUP BY hour
+        HAVING count > 0
         ORDER BY hour
     ''').fetchall()
     
     # Weekly appointment trends
     weekly_appointments = conn.execute('''
         SELECT 
-            CASE strftime('%w', appointment_date)
-                WHEN '0' THEN 'Sunday'
-                WHEN '1' THEN 'Monday'
-                WHEN '2' THEN 'Tuesday'
-                WHEN '3' THEN 'Wednesday'
-                WHEN '4' THEN 'Thursday'
-                WHEN '5' THEN 'Friday'
-                WHEN '6' THEN 'Saturday'
+            CASE weekday
+                WHEN 0 THEN 'Sunday'
+                WHEN 1 THEN 'Monday'
+                WHEN 2 THEN 'Tuesday'
+                WHEN 3 THEN 'Wednesday'
+                WHEN 4 THEN 'Thursday'
+                WHEN 5 THEN 'Friday'
+                WHEN 6 THEN 'Saturday'
             END as day_of_week,
-            COUNT(*) as count
-        FROM appointments
-        GROUP BY strftime('%w', appointment_date)
-        ORDER BY strftime('%w', appointment_date)
+            SUM(appointment_count) as count
+        FROM appointment_rollup
+        GROUP BY weekday
+        HAVING count > 0
+        ORDER BY weekday
     ''').fetchall()
     
     conn.close()
     
-    return jsonify({
+    data = {
         'monthly_appointments': [dict(row) for row in monthly_appointments],
         'service_popularity': [dict(row) for row in service_popularity],
         'appointment_status': [dict(row) for row in appointment_status],
@@ -648,12 +1857,50 @@ def admin_chart_data():
         'vehicle_makes': [dict(row) for row in vehicle_makes],
         'appointment_hours': [dict(row) for row in appointment_hours],
         'weekly_appointments': [dict(row) for row in weekly_appointments]
-    })
+    }
+    return app.json.dumps(data).encode('utf-8'), 'application/json'
 
 # Chart Generation Functions
+# Figure JSON is cached per worker, keyed by chart and a digest of its input
+# rows, so repeated views with unchanged data skip building the figure.
+FIGURE_CACHE_SIZE = int(os.environ.get('FIGURE_CACHE_SIZE', 64))
+
+_figure_cache = OrderedDict()
+_figure_cache_lock = threading.Lock()
+
+def cached_figure(create_chart):
+    """Cache a create_*_chart function's JSON in a bounded LRU"""
+    @wraps(create_chart)
+    def decorated_function(data):
+        digest = hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+        key = (create_chart.__name__, digest)
+        with _figure_cache_lock:
+            figure_json = _figure_cache.get(key)
+            if figure_json is not None:
+                _figure_cache.move_to_end(key)
+                return figure_json
+        
+        figure_json = create_chart(data)
+        if figure_json is not None:
+            with _figure_cache_lock:
+                _figure_cache[key] = figure_json
+                while len(_figure_cache) > FIGURE_CACHE_SIZE:
+                    _figure_cache.popitem(last=False)
+        return figure_json
+    return decorated_function
+
+def figure_to_json(fig):
+    """Serialise a Plotly figure, timing it for the request metrics"""
+    started = time.perf_counter()
+    try:
+        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    finally:
+        record_phase_time('plotly', time.perf_counter() - started)
+
+@cached_figure
 def create_monthly_revenue_chart(data):
     """Create monthly revenue line chart"""
-    if not PLOTLY_AVAILABLE:
+    if not load_chart_libraries():
         return None
     
     if not data:
@@ -674,23 +1921,26 @@ def create_monthly_revenue_chart(data):
             template='plotly_white',
             height=400
         )
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        return figure_to_json(fig)
     
-    df = pd.DataFrame(data)
-    fig = px.line(df, x='month', y='revenue', 
-                  title='Monthly Revenue Trend',
-                  markers=True)
+    fig = go.Figure(go.Scatter(
+        x=[row['month'] for row in data],
+        y=[row['revenue'] for row in data],
+        mode='lines+markers'
+    ))
     fig.update_layout(
+        title='Monthly Revenue Trend',
         xaxis_title='Month',
         yaxis_title='Revenue ($)',
         template='plotly_white',
         height=400
     )
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return figure_to_json(fig)
 
+@cached_figure
 def create_service_popularity_chart(data):
     """Create service popularity bar chart"""
-    if not PLOTLY_AVAILABLE:
+    if not load_chart_libraries():
         return None
     
     if not data:
@@ -708,24 +1958,28 @@ def create_service_popularity_chart(data):
             template='plotly_white',
             height=400
         )
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-    
-    df = pd.DataFrame(data)
-    fig = px.bar(df, x='name', y='appointment_count',
-                 title='Most Popular Services',
-                 color='appointment_count',
-                 color_continuous_scale='viridis')
+        return figure_to_json(fig)
+    
+    counts = [row['appointment_count'] for row in data]
+    fig = go.Figure(go.Bar(
+        x=[row['name'] for row in data],
+        y=counts,
+        marker=dict(color=counts, colorscale='viridis', showscale=True,
+                    colorbar=dict(title='appointment_count'))
+    ))
     fig.update_layout(
+        title='Most Popular Services',
         xaxis_title='Service',
         yaxis_title='Number of Appointments',
         template='plotly_white',
         height=400
     )
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return figure_to_json(fig)
 
+@cached_figure
 def create_appointment_status_chart(data):
     """Create appointment status pie chart"""
-    if not PLOTLY_AVAILABLE:
+    if not load_chart_libraries():
         return None
         
     if not data:
@@ -740,22 +1994,25 @@ def create_appointment_status_chart(data):
             template='plotly_white',
             height=400
         )
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        return figure_to_json(fig)
     
-    df = pd.DataFrame(data)
-    fig = px.pie(df, values='count', names='status',
-                 title='Appointment Status Distribution',
-                 hole=0.3,
-                 color_discrete_sequence=px.colors.qualitative.Set3)
+    fig = go.Figure(go.Pie(
+        labels=[row['status'] for row in data],
+        values=[row['count'] for row in data],
+        hole=0.3,
+        marker=dict(colors=plotly.colors.qualitative.Set3)
+    ))
     fig.update_layout(
+        title='Appointment Status Distribution',
         template='plotly_white',
         height=400
     )
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return figure_to_json(fig)
 
+@cached_figure
 def create_vehicle_makes_chart(data):
     """Create vehicle makes donut chart"""
-    if not PLOTLY_AVAILABLE:
+    if not load_chart_libraries():
         return None
         
     if not data:
@@ -770,22 +2027,25 @@ def create_vehicle_makes_chart(data):
             template='plotly_white',
             height=400
         )
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        return figure_to_json(fig)
     
-    df = pd.DataFrame(data)
-    fig = px.pie(df, values='count', names='make',
-                 title='Customer Vehicle Brands',
-                 hole=0.4,
-                 color_discrete_sequence=px.colors.qualitative.Pastel)
+    fig = go.Figure(go.Pie(
+        labels=[row['make'] for row in data],
+        values=[row['count'] for row in data],
+        hole=0.4,
+        marker=dict(colors=plotly.colors.qualitative.Pastel)
+    ))
     fig.update_layout(
+        title='Customer Vehicle Brands',
         template='plotly_white',
         height=400
     )
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return figure_to_json(fig)
 
+@cached_figure
 def create_appointment_hours_chart(data):
     """Create appointment hours bar chart"""
-    if not PLOTLY_AVAILABLE:
+    if not load_chart_libraries():
         return None
         
     if not data:
@@ -800,24 +2060,27 @@ def create_appointment_hours_chart(data):
             template='plotly_white',
             height=400
         )
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        return figure_to_json(fig)
     
-    df = pd.DataFrame(data)
-    fig = px.bar(df, x='hour', y='count',
-                 title='Busiest Hours of the Day',
-                 color='count',
-                 color_continuous_scale='blues')
+    counts = [row['count'] for row in data]
+    fig = go.Figure(go.Bar(
+        x=[row['hour'] for row in data],
+        y=counts,
+        marker=dict(color=counts, colorscale='blues', showscale=True, colorbar=dict(title='count'))
+    ))
     fig.update_layout(
+        title='Busiest Hours of the Day',
         xaxis_title='Hour',
         yaxis_title='Number of Appointments',
         template='plotly_white',
         height=400
     )
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return figure_to_json(fig)
 
+@cached_figure
 def create_weekly_appointments_chart(data):
     """Create weekly appointments radar chart"""
-    if not PLOTLY_AVAILABLE:
+    if not load_chart_libraries():
         return None
         
     if not data:
@@ -841,13 +2104,13 @@ def create_weekly_appointments_chart(data):
             template='plotly_white',
             height=400
         )
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        return figure_to_json(fig)
     
-    df = pd.DataFrame(data)
+    counts = [row['count'] for row in data]
     fig = go.Figure()
     fig.add_trace(go.Scatterpolar(
-        r=df['count'],
-        theta=df['day_of_week'],
+        r=counts,
+        theta=[row['day_of_week'] for row in data],
         fill='toself',
         name='Appointments',
         line_color='rgb(32, 201, 151)'
@@ -857,16 +2120,17 @@ def create_weekly_appointments_chart(data):
         polar=dict(
             radialaxis=dict(
                 visible=True,
-                range=[0, df['count'].max() if len(df) > 0 else 10]
+                range=[0, max(counts)]
             )),
         template='plotly_white',
         height=400
     )
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return figure_to_json(fig)
 
+@cached_figure
 def create_top_customers_chart(data):
     """Create top customers horizontal bar chart"""
-    if not PLOTLY_AVAILABLE:
+    if not load_chart_libraries():
         return None
         
     if not data:
@@ -885,41 +2149,43 @@ def create_top_customers_chart(data):
             template='plotly_white',
             height=400
         )
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-    
-    df = pd.DataFrame(data)
-    fig = px.bar(df, x='total_spent', y='customer_name',
-                 title='Top Customers by Spending',
-                 orientation='h',
-                 color='total_spent',
-                 color_continuous_scale='greens')
+        return figure_to_json(fig)
+    
+    spent = [row['total_spent'] for row in data]
+    fig = go.Figure(go.Bar(
+        x=spent,
+        y=[row['customer_name'] for row in data],
+        orientation='h',
+        marker=dict(color=spent, colorscale='greens', showscale=True, colorbar=dict(title='total_spent'))
+    ))
     fig.update_layout(
+        title='Top Customers by Spending',
         xaxis_title='Total Spent ($)',
         yaxis_title='Customer',
         template='plotly_white',
         height=400
     )
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return figure_to_json(fig)
 
 @app.route('/admin/analytics')
 @admin_required
 def admin_analytics():
     """Admin analytics dashboard with beautiful charts"""
-    if not PLOTLY_AVAILABLE:
-        flash('Charts are not available. Please install plotly and pandas.', 'warning')
+    if not load_chart_libraries():
+        flash('Charts are not available. Please install plotly.', 'warning')
         return redirect(url_for('admin_dashboard'))
     
-    conn = get_db_connection()
+    conn = get_report_connection()
     
     # Get data for all charts
     # Service popularity (all appointments, not just completed)
     service_popularity = conn.execute('''
         SELECT 
             s.name,
-            COUNT(a.id) as appointment_count,
-            SUM(CASE WHEN a.status = 'completed' THEN s.price ELSE 0 END) as revenue
+            SUM(r.appointment_count) as appointment_count,
+            SUM(CASE WHEN r.status = 'completed' THEN r.appointment_count * s.price ELSE 0 END) as revenue
         FROM services s
-        LEFT JOIN appointments a ON s.id = a.service_id
+        JOIN appointment_rollup r ON s.id = r.service_id
         WHERE s.is_active = 1
         GROUP BY s.id, s.name
         HAVING appointment_count > 0
@@ -939,6 +2205,9 @@ def admin_analytics():
         LIMIT 10
     ''').fetchall()
     
+    # Folding new events writes, so it runs on the live database, not the snapshot
+    activity = get_booking_activity(get_db_connection())
+    
     conn.close()
     
     # Convert to list of dicts
@@ -952,6 +2221,8 @@ def admin_analytics():
     return render_template('admin_analytics.html',
                          popularity_chart=popularity_chart,
                          makes_chart=makes_chart,
+                         activity=activity,
+                         snapshot_age=g.get('report_snapshot_age'),
                          plotly_available=PLOTLY_AVAILABLE)
 
 # Admin Authentication Routes
@@ -1049,28 +2320,110 @@ def admin_dashboard():
                          stats=stats, 
                          recent_appointments=recent_appointments)
 
+# Admin list pagination
+# Lists are paged with keyset (seek) pagination: the cursor holds the sort
+# key of the last (or first) row shown, and the next page is read with a
+# row-value comparison against it, so each page costs O(page size) no matter
+# how deep into the list it is.
+PAGE_SIZE_DEFAULT = 50
+PAGE_SIZE_MAX = 200
+
+def encode_cursor(values):
+    """Opaque URL-safe cursor for a row's sort key"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Sort key from a cursor, or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        return None
+    return values if isinstance(values, list) else None
+
+def paginate(conn, query, sort_options, default_sort, params=()):
+    """Fetch one page of an admin list from the request's paging arguments
+
+    query is a SELECT with {where} and {order_by} placeholders. sort_options
+    maps a sort name to (default direction, [(SQL expression, result column)]);
+    the last column must be unique (the primary key) so the order is total.
+    Reads sort, dir, per_page and after/before cursors from request.args.
+    """
+    sort = request.args.get('sort', default_sort)
+    if sort not in sort_options:
+        sort = default_sort
+    default_direction, columns = sort_options[sort]
+    direction = request.args.get('dir', default_direction)
+    if direction not in ('asc', 'desc'):
+        direction = default_direction
+    per_page = request.args.get('per_page', PAGE_SIZE_DEFAULT, type=int)
+    per_page = max(1, min(per_page or PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX))
+    
+    after = decode_cursor(request.args.get('after'))
+    before = None if after else decode_cursor(request.args.get('before'))
+    cursor = after or before
+    if cursor is not None and len(cursor) != len(columns):
+        cursor = after = before = None
+    
+    # Walking backwards from a 'before' cursor reverses the scan
+    descending = (direction == 'desc') != (before is not None)
+    expressions = ', '.join(expression for expression, _ in columns)
+    where = ''
+    if cursor is not None:
+        placeholders = ', '.join('?' * len(columns))
+        where = f"WHERE ({expressions}) {'<' if descending else '>'} ({placeholders})"
+    order_by = ', '.join(f"{expression} {'DESC' if descending else 'ASC'}" for expression, _ in columns)
+    
+    sql = query.format(where=where, order_by=order_by) + ' LIMIT ?'
+    rows = conn.execute(sql, (*params, *(cursor or ()), per_page + 1)).fetchall()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if before is not None:
+        rows.reverse()
+    
+    def key(row):
+        return encode_cursor([row[name] for _, name in columns])
+    
+    has_next = has_more if before is None else True
+    has_prev = has_more if before is not None else after is not None
+    return {
+        'rows': rows,
+        'sort': sort,
+        'dir': direction,
+        'per_page': per_page,
+        'sort_options': list(sort_options),
+        'next_cursor': key(rows[-1]) if rows and has_next else None,
+        'prev_cursor': key(rows[0]) if rows and has_prev else None,
+    }
+
 @app.route('/admin/customers')
 @admin_required
 def admin_customers():
     """Admin view of all customers"""
-    conn = get_db_connection()
+    conn = get_report_connection()
     
-    customers = conn.execute('''
+    # Counts are correlated index lookups for the rows on this page only
+    page = paginate(conn, '''
         SELECT 
             c.*,
-            COUNT(DISTINCT v.id) as vehicle_count,
-            COUNT(DISTINCT a.id) as appointment_count,
-            MAX(a.appointment_date) as last_appointment
+            (SELECT COUNT(*) FROM vehicles v WHERE v.customer_id = c.id) as vehicle_count,
+            (SELECT COUNT(*) FROM appointments a WHERE a.customer_id = c.id) as appointment_count,
+            (SELECT MAX(a.appointment_date) FROM appointments a WHERE a.customer_id = c.id) as last_appointment
         FROM customers c
-        LEFT JOIN vehicles v ON c.id = v.customer_id
-        LEFT JOIN appointments a ON c.id = a.customer_id
-        GROUP BY c.id
-        ORDER BY c.last_name, c.first_name
-    ''').fetchall()
+        {where}
+        ORDER BY {order_by}
+    ''', {
+        'name': ('asc', [('c.last_name', 'last_name'), ('c.first_name', 'first_name'), ('c.id', 'id')]),
+        'email': ('asc', [('c.email', 'email'), ('c.id', 'id')]),
+        'joined': ('desc', [('c.created_at', 'created_at'), ('c.id', 'id')]),
+        'id': ('asc', [('c.id', 'id')]),
+    }, 'name')
     
     conn.close()
     
-    return render_template('admin_customers.html', customers=customers)
+    return render_template('admin_customers.html', customers=page['rows'], page=page,
+                           snapshot_age=g.get('report_snapshot_age'))
 
 @app.route('/admin/customers/delete/<int:customer_id>', methods=['POST'])
 @admin_required
@@ -1089,21 +2442,13 @@ def admin_delete_customer(customer_id):
             flash('Customer not found.', 'error')
             return redirect(url_for('admin_customers'))
         
-        # Delete all related data in correct order (due to foreign key constraints)
-        # 1. Delete appointments first
-        conn.execute('DELETE FROM appointments WHERE customer_id = ?', (customer_id,))
-        
-        # 2. Delete vehicles
-        conn.execute('DELETE FROM vehicles WHERE customer_id = ?', (customer_id,))
-        
-        # 3. Finally delete customer
-        conn.execute('DELETE FROM customers WHERE id = ?', (customer_id,))
+        # Vehicles and appointments follow through ON DELETE CASCADE
+        with write_transaction(conn):
+            conn.execute('DELETE FROM customers WHERE id = ?', (customer_id,))
         
-        conn.commit()
         flash(f'Customer {customer["first_name"]} {customer["last_name"]} and all related data deleted successfully.', 'success')
         
     except sqlite3.Error as e:
-        conn.rollback()
         flash('Error deleting customer. Please try again.', 'error')
     finally:
         conn.close()
@@ -1116,23 +2461,27 @@ def admin_vehicles():
     """Admin view of all vehicles"""
     conn = get_db_connection()
     
-    vehicles = conn.execute('''
+    page = paginate(conn, '''
         SELECT 
             v.*,
             c.first_name,
             c.last_name,
             c.email,
-            COUNT(a.id) as appointment_count
+            (SELECT COUNT(*) FROM appointments a WHERE a.vehicle_id = v.id) as appointment_count
         FROM vehicles v
         JOIN customers c ON v.customer_id = c.id
-        LEFT JOIN appointments a ON v.id = a.vehicle_id
-        GROUP BY v.id
-        ORDER BY c.last_name, c.first_name, v.year DESC
-    ''').fetchall()
+        {where}
+        ORDER BY {order_by}
+    ''', {
+        'owner': ('asc', [('c.last_name', 'last_name'), ('c.first_name', 'first_name'),
+                          ('c.id', 'customer_id'), ('v.id', 'id')]),
+        'make': ('asc', [('v.make', 'make'), ('v.model', 'model'), ('v.id', 'id')]),
+        'id': ('asc', [('v.id', 'id')]),
+    }, 'owner')
     
     conn.close()
     
-    return render_template('admin_vehicles.html', vehicles=vehicles)
+    return render_template('admin_vehicles.html', vehicles=page['rows'], page=page)
 
 @app.route('/admin/vehicles/delete/<int:vehicle_id>', methods=['POST'])
 @admin_required
@@ -1151,30 +2500,148 @@ def admin_delete_vehicle(vehicle_id):
             flash('Vehicle not found.', 'error')
             return redirect(url_for('admin_vehicles'))
         
-        # Delete all related appointments first
-        conn.execute('DELETE FROM appointments WHERE vehicle_id = ?', (vehicle_id,))
-        
-        # Then delete the vehicle
-        conn.execute('DELETE FROM vehicles WHERE id = ?', (vehicle_id,))
+        # Appointments follow through ON DELETE CASCADE
+        with write_transaction(conn):
+            conn.execute('DELETE FROM vehicles WHERE id = ?', (vehicle_id,))
         
-        conn.commit()
         flash(f'Vehicle {vehicle["year"]} {vehicle["make"]} {vehicle["model"]} (owned by {vehicle["first_name"]} {vehicle["last_name"]}) and all related appointments deleted successfully.', 'success')
         
     except sqlite3.Error as e:
-        conn.rollback()
         flash('Error deleting vehicle. Please try again.', 'error')
     finally:
         conn.close()
     
     return redirect(url_for('admin_vehicles'))
 
+# Bulk removal
+# Customers or vehicles are removed in batches of BULK_DELETE_BATCH_SIZE, each
+# in its own short write transaction, with a pause in between so bookings
+# waiting on the write lock get their turn. Vehicles and appointments go with
+# their customer through ON DELETE CASCADE. With archive, the rows are copied
+# into the archived_* tables in the same transaction first. Progress is
+# streamed back one line per batch; a failure stops the run, and the batches
+# already committed stay removed.
+BULK_DELETE_BATCH_SIZE = int(os.environ.get('BULK_DELETE_BATCH_SIZE', 200))
+BULK_DELETE_PAUSE = float(os.environ.get('BULK_DELETE_PAUSE', 0.05))  # seconds between batches
+
+ARCHIVE_COLUMNS = {
+    'customers': 'id, first_name, last_name, email, phone, address, created_at',
+    'vehicles': 'id, customer_id, make, model, year, vin, license_plate, color, mileage, created_at',
+    'appointments': ('id, customer_id, vehicle_id, service_id, appointment_date, appointment_time, '
+                     'status, notes, created_at'),
+}
+
+# table: (filter field, query for the ids it selects, rows removed with each id)
+BULK_DELETE_TARGETS = {
+    'customers': ('inactive_since', '''
+        SELECT id FROM customers c
+        WHERE c.created_at < :value
+          AND NOT EXISTS (SELECT 1 FROM appointments a
+                          WHERE a.customer_id = c.id AND a.appointment_date >= :value)
+        ORDER BY id
+    ''', [('vehicles', 'customer_id'), ('appointments', 'customer_id')]),
+    'vehicles': ('year_before', '''
+        SELECT id FROM vehicles WHERE year < :value ORDER BY id
+    ''', [('appointments', 'vehicle_id')]),
+}
+
+def parse_id_list(text):
+    """Sorted unique ids from text separated by commas, spaces or newlines"""
+    return sorted({int(value) for value in re.split(r'[\s,]+', text) if value})
+
+def bulk_delete(conn, table, ids, archive=False, batch_size=BULK_DELETE_BATCH_SIZE):
+    """Delete (or archive and delete) rows of table by id, batch by batch
+
+    Yields (ids processed, rows removed per table) after every committed
+    batch.
+    """
+    _, _, dependents = BULK_DELETE_TARGETS[table]
+    removed = dict.fromkeys([table] + [name for name, _ in dependents], 0)
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        placeholders = ', '.join('?' * len(batch))
+        with write_transaction(conn):
+            for name, column in dependents:
+                where = f'WHERE {column} IN ({placeholders})'
+                if archive:
+                    columns = ARCHIVE_COLUMNS[name]
+                    removed[name] += conn.execute(f'''
+                        INSERT OR REPLACE INTO archived_{name} ({columns})
+                        SELECT {columns} FROM {name} {where}
+                    ''', batch).rowcount
+                else:
+                    removed[name] += conn.execute(f'SELECT COUNT(*) FROM {name} {where}', batch).fetchone()[0]
+            if archive:
+                columns = ARCHIVE_COLUMNS[table]
+                conn.execute(f'''
+                    INSERT OR REPLACE INTO archived_{table} ({columns})
+                    SELECT {columns} FROM {table} WHERE id IN ({placeholders})
+                ''', batch)
+            # Dependent rows follow through ON DELETE CASCADE
+            removed[table] += conn.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', batch).rowcount
+        yield start + len(batch), removed
+        if start + batch_size < len(ids):
+            time.sleep(BULK_DELETE_PAUSE)
+
+def generate_bulk_delete_progress(conn, table, ids, archive):
+    """Run bulk_delete() and yield one line of progress per batch"""
+    action = 'Archiving' if archive else 'Deleting'
+    yield f'{action} {len(ids):,} {table} in batches of {BULK_DELETE_BATCH_SIZE}\n'
+    started = time.perf_counter()
+    try:
+        for done, removed in bulk_delete(conn, table, ids, archive, BULK_DELETE_BATCH_SIZE):
+            counts = ', '.join(f'{count:,} {name}' for name, count in removed.items())
+            yield f'{done:,}/{len(ids):,} processed: {counts} removed\n'
+    except sqlite3.Error as e:
+        yield f'Stopped: {e}. Batches reported above were committed.\n'
+        return
+    yield f'Done in {time.perf_counter() - started:.1f}s\n'
+
+@app.route('/admin/bulk-delete', methods=['GET', 'POST'])
+@admin_required
+def admin_bulk_delete():
+    """Remove many customers or vehicles by id list or filter, in batches"""
+    if request.method == 'GET':
+        return render_template('admin_bulk_delete.html', batch_size=BULK_DELETE_BATCH_SIZE)
+    
+    table = request.form.get('table')
+    if table not in BULK_DELETE_TARGETS:
+        flash('Unknown table.', 'error')
+        return redirect(url_for('admin_bulk_delete'))
+    filter_field, filter_query, _ = BULK_DELETE_TARGETS[table]
+    
+    try:
+        ids = parse_id_list(request.form.get('ids', ''))
+        filter_value = request.form.get(filter_field, '').strip()
+        if table == 'customers' and filter_value:
+            filter_value = date.fromisoformat(filter_value).isoformat()
+        elif filter_value:
+            filter_value = int(filter_value)
+    except ValueError:
+        flash('Ids must be numbers and dates must be in YYYY-MM-DD format.', 'error')
+        return redirect(url_for('admin_bulk_delete'))
+    if not ids and filter_value == '':
+        flash('Enter ids or a filter.', 'error')
+        return redirect(url_for('admin_bulk_delete'))
+    
+    conn = get_db_connection()
+    if filter_value != '':
+        matching = [row[0] for row in conn.execute(filter_query, {'value': filter_value})]
+        # With both given, only the listed ids that match the filter
+        ids = sorted(set(ids) & set(matching)) if ids else matching
+    
+    return Response(
+        stream_with_context(generate_bulk_delete_progress(conn, table, ids, 'archive' in request.form)),
+        mimetype='text/plain'
+    )
+
 @app.route('/admin/appointments')
 @admin_required
 def admin_appointments():
     """Admin view of all appointments"""
     conn = get_db_connection()
     
-    appointments = conn.execute('''
+    page = paginate(conn, '''
         SELECT 
             a.*,
             c.first_name,
@@ -1186,19 +2653,122 @@ def admin_appointments():
             v.year,
             v.license_plate,
             s.name as service_name,
-            s.description as service_description,
             s.estimated_duration,
             s.price
         FROM appointments a
         JOIN customers c ON a.customer_id = c.id
         JOIN vehicles v ON a.vehicle_id = v.id
         JOIN services s ON a.service_id = s.id
-        ORDER BY a.appointment_date DESC, a.appointment_time DESC
-    ''').fetchall()
+        {where}
+        ORDER BY {order_by}
+    ''', {
+        'date': ('desc', [('a.appointment_date', 'appointment_date'),
+                          ('a.appointment_time', 'appointment_time'), ('a.id', 'id')]),
+        'created': ('desc', [('a.created_at', 'created_at'), ('a.id', 'id')]),
+        'id': ('desc', [('a.id', 'id')]),
+    }, 'date')
     
     conn.close()
     
-    return render_template('admin_appointments.html', appointments=appointments)
+    return render_template('admin_appointments.html', appointments=page['rows'], page=page,
+                           status_transitions=STATUS_TRANSITIONS)
+
+# Appointment status transitions
+# Shop-floor workflow: scheduled -> in_progress -> completed, with cancelling
+# allowed until work is done. Completed and cancelled are final. A batch of
+# transitions is validated against the current statuses and applied with one
+# executemany in one write transaction; bays freed by completing or
+# cancelling are released from the slot bitmaps.
+STATUS_TRANSITIONS = {
+    'scheduled': ('in_progress', 'completed', 'cancelled'),
+    'in_progress': ('scheduled', 'completed', 'cancelled'),
+    'completed': (),
+    'cancelled': (),
+}
+STATUS_UPDATE_MAX = 1000
+
+def parse_status_updates(payload):
+    """[(id, status)] from {"updates": [{"id", "status"}...]} or {"ids": [...], "status"}
+
+    Raises ValueError for malformed input.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError('Expected a JSON object')
+    if 'updates' in payload:
+        updates = [(int(update['id']), update['status']) for update in payload['updates']]
+    else:
+        updates = [(int(appointment_id), payload['status']) for appointment_id in payload['ids']]
+    if not updates or len(updates) > STATUS_UPDATE_MAX:
+        raise ValueError(f'Send 1 to {STATUS_UPDATE_MAX} updates')
+    return updates
+
+def apply_status_updates(conn, updates):
+    """Validate and apply (id, status) transitions; returns one outcome dict per update"""
+    results = []
+    changes = []
+    released = []
+    with write_transaction(conn):
+        current = {}
+        ids = sorted({appointment_id for appointment_id, _ in updates})
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            for row in conn.execute(f'''
+                SELECT a.id, a.status, a.appointment_date, a.appointment_time, s.estimated_duration
+                FROM appointments a
+                JOIN services s ON a.service_id = s.id
+                WHERE a.id IN ({', '.join('?' * len(batch))})
+            ''', batch):
+                current[row['id']] = row
+        
+        for appointment_id, status in updates:
+            row = current.get(appointment_id)
+            if row is None:
+                results.append({'id': appointment_id, 'outcome': 'not_found'})
+                continue
+            previous = row['status']
+            outcome = {'id': appointment_id, 'from': previous, 'to': status}
+            if status == previous:
+                outcome['outcome'] = 'unchanged'
+            elif status not in STATUS_TRANSITIONS.get(previous, ()):
+                outcome['outcome'] = 'invalid_transition'
+            else:
+                outcome['outcome'] = 'updated'
+                changes.append((status, appointment_id))
+                if previous in ACTIVE_STATUSES and status not in ACTIVE_STATUSES:
+                    released.append((row['appointment_date'], row['appointment_time'], row['estimated_duration']))
+                # Later updates for the same id start from the new status
+                current[appointment_id] = dict(row, status=status)
+            results.append(outcome)
+        
+        if changes:
+            conn.executemany('UPDATE appointments SET status = ? WHERE id = ?', changes)
+            # A day with several updates is past its cached version, so its
+            # bitmap is dropped and rebuilt on the next lookup instead
+            for booking in released:
+                note_booking_change(conn, before=booking)
+    return results
+
+@app.route('/admin/api/appointments/status', methods=['POST'])
+@admin_required
+def admin_api_appointment_status():
+    """Move many appointments to a new status in one request"""
+    try:
+        updates = parse_status_updates(request.get_json(silent=True))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+    
+    conn = get_db_connection()
+    try:
+        results = apply_status_updates(conn, updates)
+    except sqlite3.Error:
+        return jsonify({'error': 'Database error, no appointments were changed'}), 503
+    finally:
+        conn.close()
+    
+    return jsonify({
+        'updated': sum(1 for result in results if result['outcome'] == 'updated'),
+        'results': results,
+    })
 
 @app.route('/admin/services')
 @admin_required
@@ -1220,17 +2790,219 @@ def admin_services():
     
     return render_template('admin_services.html', services=services)
 
+# Admin data exports
+# Rows are streamed from the cursor in batches, so memory use does not grow
+# with table size and the download starts immediately. Password hashes are
+# never exported.
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+EXPORT_QUERIES = {
+    # table: (query, date column for from/to, status column or None)
+    'customers': ('''
+        SELECT id, first_name, last_name, email, phone, address, created_at
+        FROM customers {where} ORDER BY id
+    ''', 'created_at', None),
+    'vehicles': ('''
+        SELECT id, customer_id, make, model, year, vin, license_plate, color, mileage, created_at
+        FROM vehicles {where} ORDER BY id
+    ''', 'created_at', None),
+    'services': ('''
+        SELECT id, name, description, estimated_duration, price, is_active
+        FROM services {where} ORDER BY id
+    ''', None, None),
+    'appointments': ('''
+        SELECT id, customer_id, vehicle_id, service_id, appointment_date, appointment_time,
+               status, notes, created_at
+        FROM appointments {where} ORDER BY id
+    ''', 'appointment_date', 'status'),
+}
+
+def generate_export(cursor, export_format):
+    """Yield an open cursor's rows as CSV or NDJSON text in batches"""
+    columns = [column[0] for column in cursor.description]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if export_format == 'csv' else None
+    if writer:
+        writer.writerow(columns)
+    
+    while True:
+        rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+        if not rows:
+            break
+        for row in rows:
+            if writer:
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(dict(zip(columns, row)), default=str))
+                buffer.write('\n')
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@app.route('/admin/export/<table>.<export_format>')
+@admin_required
+def admin_export(table, export_format):
+    """Stream a table as CSV or NDJSON, optionally filtered by date range and status"""
+    if table not in EXPORT_QUERIES or export_format not in EXPORT_FORMATS:
+        flash('Unknown export.', 'error')
+        return redirect(url_for('admin_dashboard'))
+    
+    query, date_column, status_column = EXPORT_QUERIES[table]
+    conditions = []
+    params = []
+    try:
+        if date_column and request.args.get('from'):
+            conditions.append(f'{date_column} >= ?')
+            params.append(date.fromisoformat(request.args['from']).isoformat())
+        if date_column and request.args.get('to'):
+            # Inclusive end date, also for timestamp columns
+            conditions.append(f"{date_column} < date(?, '+1 day')")
+            params.append(date.fromisoformat(request.args['to']).isoformat())
+    except ValueError:
+        flash('Export dates must be in YYYY-MM-DD format.', 'error')
+        return redirect(url_for('admin_dashboard'))
+    if status_column and request.args.get('status'):
+        conditions.append(f'{status_column} = ?')
+        params.append(request.args['status'])
+    
+    where = 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+    cursor = get_db_connection().execute(query.format(where=where), params)
+    
+    filename = f'{table}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{export_format}'
+    return Response(
+        stream_with_context(generate_export(cursor, export_format)),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+# Admin search
+# customers_fts and vehicles_fts are FTS5 indexes kept in sync by triggers
+# (see migrations.py). Every word typed is matched as a prefix and all words
+# must match; results are ranked by bm25 with name/make matches weighted up.
+# Only the first SEARCH_CANDIDATE_LIMIT matches are ranked, so a one-letter
+# search does not score half the table.
+SEARCH_RESULT_LIMIT = 50
+SEARCH_CANDIDATE_LIMIT = 2000
+SEARCH_MAX_TERMS = 8
+
+def fts_match_query(text):
+    """FTS5 MATCH expression for free text, or None if it has no words
+
+    Each word is quoted, so FTS5 operators typed by the user are searched
+    for as plain text.
+    """
+    terms = re.findall(r'\w+', text)[:SEARCH_MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms) or None
+
+@app.route('/admin/search')
+@admin_required
+def admin_search():
+    """Search customers and vehicles by name, contact details, make, model, VIN or plate"""
+    query = request.args.get('q', '').strip()
+    match = fts_match_query(query)
+    customers, vehicles = [], []
+    if match:
+        conn = get_db_connection()
+        try:
+            customers = conn.execute('''
+                SELECT c.id, c.first_name, c.last_name, c.email, c.phone, c.address
+                FROM (
+                    SELECT rowid, bm25(customers_fts, 10.0, 10.0, 5.0, 2.0, 1.0) as score
+                    FROM customers_fts
+                    WHERE customers_fts MATCH ?
+                    LIMIT ?
+                ) hits
+                JOIN customers c ON c.id = hits.rowid
+                ORDER BY hits.score
+                LIMIT ?
+            ''', (match, SEARCH_CANDIDATE_LIMIT, SEARCH_RESULT_LIMIT)).fetchall()
+            vehicles = conn.execute('''
+                SELECT v.id, v.make, v.model, v.year, v.vin, v.license_plate,
+                       c.id as customer_id, c.first_name, c.last_name
+                FROM (
+                    SELECT rowid, bm25(vehicles_fts, 5.0, 5.0, 10.0, 10.0) as score
+                    FROM vehicles_fts
+                    WHERE vehicles_fts MATCH ?
+                    LIMIT ?
+                ) hits
+                JOIN vehicles v ON v.id = hits.rowid
+                JOIN customers c ON c.id = v.customer_id
+                ORDER BY hits.score
+                LIMIT ?
+            ''', (match, SEARCH_CANDIDATE_LIMIT, SEARCH_RESULT_LIMIT)).fetchall()
+        except sqlite3.Error as e:
+            flash('Search failed. Please try again.', 'error')
+        finally:
+            conn.close()
+
+    return render_template('admin_search.html',
+                         query=query,
+                         customers=customers,
+                         vehicles=vehicles,
+                         limit=SEARCH_RESULT_LIMIT)
+
+@app.route('/admin/api/appointment-events')
+@admin_required
+def admin_api_appointment_events():
+    """Appointment events after a cursor (?after=<last event id>&limit=N)"""
+    try:
+        after_id = int(request.args.get('after', 0))
+        limit = min(max(int(request.args.get('limit', EVENT_BATCH_SIZE)), 1), EVENT_BATCH_SIZE)
+    except ValueError:
+        return jsonify({'error': 'after and limit must be integers'}), 400
+    
+    conn = get_db_connection()
+    events = read_events(conn, after_id, limit)
+    conn.close()
+    
+    return jsonify({
+        'events': events,
+        # Pass back as ?after= to continue
+        'next_after': events[-1]['id'] if events else after_id,
+        'has_more': len(events) == limit,
+    })
+
+@app.route('/admin/api/db-stats')
+@admin_required
+def admin_db_stats():
+    """Write-lock contention statistics for this worker"""
+    with _lock_stats_lock:
+        stats = dict(db_lock_stats)
+    stats['high_concurrency_mode'] = HIGH_CONCURRENCY_MODE
+    stats['pid'] = os.getpid()
+    if stats['write_transactions']:
+        stats['lock_wait_seconds_avg'] = stats['lock_wait_seconds_total'] / stats['write_transactions']
+    return jsonify(stats)
+
+@app.route('/admin/metrics')
+@admin_required
+def admin_metrics():
+    """Request, SQL and lock metrics for this worker (Prometheus text format)"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 # Flask-Admin Setup (commented out due to installation issues)
 # Will be implemented once Flask-Admin is properly installed
 
 # Customer Authentication Routes
 
+# Cold-start report: time to import this module, dependencies included
+STARTUP_WARN_SECONDS = float(os.environ.get('STARTUP_WARN_SECONDS', 2.0))
+startup_seconds = time.perf_counter() - _load_started
+print(f"✅ App loaded in {startup_seconds:.2f}s (chart libraries load on first use)")
+if startup_seconds > STARTUP_WARN_SECONDS:
+    print(f"❌ Warning: start-up took longer than STARTUP_WARN_SECONDS ({STARTUP_WARN_SECONDS:.1f}s)")
+
 if __name__ == '__main__':
-    # Check if database exists, if not run setup
+    # A missing database is created empty by the migrations on first connect
     if not os.path.exists(DATABASE):
-        print("Database not found. Please run setup.py first!")
-        print("Run: python setup.py")
-        exit(1)
+        print(f"Database '{DATABASE}' not found; creating an empty one.")
+        print("Run: python setup.py for sample data")
 
     # Allow port override via command line argument or environment variable
     import sys
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Appointment event log for Automotive Service Scheduling System
+Reads the append-only appointment_events table that triggers fill on every
+insert, reschedule, status change, update and delete of an appointment (see
+migrations.py). Consumers read the events after a cursor - the last event id
+they processed - so each run only handles what is new. Named consumers keep
+their cursor in event_consumers.
+
+SQLite has a single writer and ids are assigned at insert, so events commit
+in id order and "id > cursor" never skips an event.
+
+Usage:
+    python appointment_events.py tail [--after ID | --consumer NAME] [--limit N] [--database PATH]
+    python appointment_events.py consumers [--database PATH]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+
+from migrations import immediate_transaction
+
+DATABASE = os.environ.get('DATABASE_PATH', 'automotive_service.db')
+EVENT_BATCH_SIZE = 1000
+
+# Consumer behind the analytics page's booking_activity totals (app.get_booking_activity)
+BOOKING_ACTIVITY_CONSUMER = 'booking_activity'
+
+EVENT_COLUMNS = ('id', 'appointment_id', 'event_type', 'customer_id', 'vehicle_id', 'service_id',
+                 'appointment_date', 'appointment_time', 'status',
+                 'previous_date', 'previous_time', 'previous_status', 'occurred_at')
+EVENT_TYPES = ('created', 'rescheduled', 'status_changed', 'updated', 'deleted')
+
+def read_events(conn, after_id=0, limit=EVENT_BATCH_SIZE):
+    """Up to limit events with an id above after_id, oldest first, as dicts"""
+    rows = conn.execute(f'''
+        SELECT {', '.join(EVENT_COLUMNS)}
+        FROM appointment_events
+        WHERE id > ?
+        ORDER BY id
+        LIMIT ?
+    ''', (after_id, limit)).fetchall()
+    return [dict(zip(EVENT_COLUMNS, row)) for row in rows]
+
+def get_cursor(conn, consumer):
+    """Last event id the named consumer has processed (0 if it never ran)"""
+    row = conn.execute('SELECT last_event_id FROM event_consumers WHERE name = ?', (consumer,)).fetchone()
+    return row[0] if row else 0
+
+def save_cursor(conn, consumer, last_event_id):
+    """Store the consumer's cursor; call in the transaction that applies the events"""
+    conn.execute('''
+        INSERT INTO event_consumers (name, last_event_id, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(name) DO UPDATE SET last_event_id = excluded.last_event_id,
+                                        updated_at = excluded.updated_at
+    ''', (consumer, last_event_id))
+
+def consume(conn, consumer, handle, batch_size=EVENT_BATCH_SIZE, transaction=immediate_transaction):
+    """Feed the consumer's new events to handle(conn, events), batch by batch
+
+    Each batch is handled and the cursor advanced in one transaction, so a
+    consumer that writes its results to this database processes every event
+    exactly once, even if it is interrupted. Returns the number of events.
+    """
+    total = 0
+    while True:
+        with transaction(conn):
+            events = read_events(conn, get_cursor(conn, consumer), batch_size)
+            if not events:
+                return total
+            handle(conn, events)
+            save_cursor(conn, consumer, events[-1]['id'])
+        total += len(events)
+
+def tail(conn, after_id, limit, consumer=None):
+    """Print events after the cursor as NDJSON; a named consumer's cursor advances"""
+    if consumer:
+        after_id = get_cursor(conn, consumer)
+    events = read_events(conn, after_id, limit)
+    for event in events:
+        print(json.dumps(event))
+    if consumer and events:
+        with immediate_transaction(conn):
+            save_cursor(conn, consumer, events[-1]['id'])
+    print(f"{len(events)} events after {after_id}", file=sys.stderr)
+
+def show_consumers(conn):
+    """Print every consumer with its cursor and backlog"""
+    latest = conn.execute('SELECT COALESCE(MAX(id), 0) FROM appointment_events').fetchone()[0]
+    print(f"Latest event: {latest}")
+    for name, last_event_id, updated_at in conn.execute(
+            'SELECT name, last_event_id, updated_at FROM event_consumers ORDER BY name'):
+        print(f"  {name:<30} at {last_event_id:>10}  ({latest - last_event_id} behind, updated {updated_at})")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Read the appointment event log.')
+    parser.add_argument('command', nargs='?', default='tail', choices=['tail', 'consumers'])
+    parser.add_argument('--database', default=DATABASE, help=f'database file (default: {DATABASE})')
+    parser.add_argument('--after', type=int, default=0, help='print events after this id (default: 0)')
+    parser.add_argument('--consumer', help='read from, and advance, this named cursor instead of --after')
+    parser.add_argument('--limit', type=int, default=EVENT_BATCH_SIZE,
+                        help=f'maximum number of events (default: {EVENT_BATCH_SIZE})')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    conn.execute('PRAGMA busy_timeout = 5000')
+    try:
+        if args.command == 'consumers':
+            show_consumers(conn)
+        else:
+            tail(conn, args.after, args.limit, args.consumer)
+    except sqlite3.Error as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
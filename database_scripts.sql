@@ -1,5 +1,7 @@
 -- Automotive Service Scheduling System - SQL Scripts
 -- This file contains all SQL operations for CRUD functionality
+-- The schema (tables, indexes, triggers) is applied to databases by migrations.py;
+-- keep the definitions below in sync with it.
 
 -- Create customers table
 CREATE TABLE IF NOT EXISTS customers (
@@ -25,7 +27,7 @@ CREATE TABLE IF NOT EXISTS vehicles (
     color TEXT,
     mileage INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (customer_id) REFERENCES customers (id)
+    FOREIGN KEY (customer_id) REFERENCES customers (id) ON DELETE CASCADE
 );
 
 -- Create services table
@@ -49,18 +51,369 @@ CREATE TABLE IF NOT EXISTS appointments (
     status TEXT DEFAULT 'scheduled',
     notes TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (customer_id) REFERENCES customers (id),
-    FOREIGN KEY (vehicle_id) REFERENCES vehicles (id),
+    FOREIGN KEY (customer_id) REFERENCES customers (id) ON DELETE CASCADE,
+    FOREIGN KEY (vehicle_id) REFERENCES vehicles (id) ON DELETE CASCADE,
     FOREIGN KEY (service_id) REFERENCES services (id)
 );
 
 -- Create indexes for better query performance
-CREATE INDEX IF NOT EXISTS idx_customers_email ON customers(email);
 CREATE INDEX IF NOT EXISTS idx_customers_name ON customers(last_name, first_name);
 CREATE INDEX IF NOT EXISTS idx_vehicles_customer ON vehicles(customer_id);
-CREATE INDEX IF NOT EXISTS idx_vehicles_vin ON vehicles(vin);
-CREATE INDEX IF NOT EXISTS idx_appointments_customer ON appointments(customer_id);
 CREATE INDEX IF NOT EXISTS idx_appointments_vehicle ON appointments(vehicle_id);
 CREATE INDEX IF NOT EXISTS idx_appointments_service ON appointments(service_id);
-CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments(appointment_date);
-CREATE INDEX IF NOT EXISTS idx_appointments_status ON appointments(status);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_appointments_status ON appointments(status);
+CREATE INDEX IF NOT EXISTS idx_appointments_slot ON appointments(appointment_date, appointment_time, status, service_id);
+CREATE INDEX IF NOT EXISTS idx_appointments_customer_date ON appointments(customer_id, appointment_date, appointment_time);
+CREATE INDEX IF NOT EXISTS idx_appointments_created ON appointments(created_at);
+CREATE INDEX IF NOT EXISTS idx_customers_created ON customers(created_at);
+CREATE INDEX IF NOT EXISTS idx_vehicles_make_model ON vehicles(make, model);
+
+-- Per-day change counter used to invalidate cached slot availability
+CREATE TABLE IF NOT EXISTS schedule_day_versions (
+    appointment_date DATE PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_schedule_version_insert
+AFTER INSERT ON appointments
+BEGIN
+    INSERT INTO schedule_day_versions (appointment_date, version) VALUES (NEW.appointment_date, 1)
+    ON CONFLICT(appointment_date) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_schedule_version_update
+AFTER UPDATE OF appointment_date, appointment_time, status, service_id ON appointments
+BEGIN
+    INSERT INTO schedule_day_versions (appointment_date, version) VALUES (OLD.appointment_date, 1)
+    ON CONFLICT(appointment_date) DO UPDATE SET version = version + 1;
+    INSERT INTO schedule_day_versions (appointment_date, version)
+    SELECT NEW.appointment_date, 1 WHERE NEW.appointment_date IS NOT OLD.appointment_date
+    ON CONFLICT(appointment_date) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_schedule_version_delete
+AFTER DELETE ON appointments
+BEGIN
+    INSERT INTO schedule_day_versions (appointment_date, version) VALUES (OLD.appointment_date, 1)
+    ON CONFLICT(appointment_date) DO UPDATE SET version = version + 1;
+END;
+
+-- Pre-aggregated appointment counts for the admin charts (day x service x status x hour)
+CREATE TABLE IF NOT EXISTS appointment_rollup (
+    appointment_date DATE NOT NULL,
+    service_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    hour TEXT NOT NULL,
+    weekday INTEGER,
+    appointment_count INTEGER NOT NULL,
+    PRIMARY KEY (appointment_date, service_id, status, hour)
+) WITHOUT ROWID;
+
+-- Appointment count and completed spend per customer for the top customers chart,
+-- in cents so that adding and removing the same price nets out to exactly zero
+CREATE TABLE IF NOT EXISTS customer_spend (
+    customer_id INTEGER PRIMARY KEY,
+    appointment_count INTEGER NOT NULL,
+    spent_cents INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_customer_spend_spent ON customer_spend(spent_cents);
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_insert
+AFTER INSERT ON appointments
+BEGIN
+    INSERT INTO appointment_rollup VALUES (
+        NEW.appointment_date, NEW.service_id, COALESCE(NEW.status, ''),
+        COALESCE(strftime('%H', NEW.appointment_time), ''),
+        CAST(strftime('%w', NEW.appointment_date) AS INTEGER), 1)
+    ON CONFLICT(appointment_date, service_id, status, hour) DO UPDATE SET appointment_count = appointment_count + 1;
+    INSERT INTO customer_spend VALUES (
+        NEW.customer_id, 1,
+        CASE WHEN NEW.status = 'completed'
+             THEN COALESCE((SELECT CAST(ROUND(price * 100) AS INTEGER) FROM services WHERE id = NEW.service_id), 0)
+             ELSE 0 END)
+    ON CONFLICT(customer_id) DO UPDATE SET appointment_count = appointment_count + 1,
+                                           spent_cents = spent_cents + excluded.spent_cents;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_update
+AFTER UPDATE OF appointment_date, appointment_time, status, service_id, customer_id ON appointments
+BEGIN
+    UPDATE appointment_rollup SET appointment_count = appointment_count - 1
+    WHERE appointment_date = OLD.appointment_date AND service_id = OLD.service_id
+      AND status = COALESCE(OLD.status, '') AND hour = COALESCE(strftime('%H', OLD.appointment_time), '');
+    INSERT INTO appointment_rollup VALUES (
+        NEW.appointment_date, NEW.service_id, COALESCE(NEW.status, ''),
+        COALESCE(strftime('%H', NEW.appointment_time), ''),
+        CAST(strftime('%w', NEW.appointment_date) AS INTEGER), 1)
+    ON CONFLICT(appointment_date, service_id, status, hour) DO UPDATE SET appointment_count = appointment_count + 1;
+    UPDATE customer_spend SET
+        appointment_count = appointment_count - 1,
+        spent_cents = spent_cents - CASE WHEN OLD.status = 'completed'
+            THEN COALESCE((SELECT CAST(ROUND(price * 100) AS INTEGER) FROM services WHERE id = OLD.service_id), 0)
+            ELSE 0 END
+    WHERE customer_id = OLD.customer_id;
+    INSERT INTO customer_spend VALUES (
+        NEW.customer_id, 1,
+        CASE WHEN NEW.status = 'completed'
+             THEN COALESCE((SELECT CAST(ROUND(price * 100) AS INTEGER) FROM services WHERE id = NEW.service_id), 0)
+             ELSE 0 END)
+    ON CONFLICT(customer_id) DO UPDATE SET appointment_count = appointment_count + 1,
+                                           spent_cents = spent_cents + excluded.spent_cents;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_delete
+AFTER DELETE ON appointments
+BEGIN
+    UPDATE appointment_rollup SET appointment_count = appointment_count - 1
+    WHERE appointment_date = OLD.appointment_date AND service_id = OLD.service_id
+      AND status = COALESCE(OLD.status, '') AND hour = COALESCE(strftime('%H', OLD.appointment_time), '');
+    UPDATE customer_spend SET
+        appointment_count = appointment_count - 1,
+        spent_cents = spent_cents - CASE WHEN OLD.status = 'completed'
+            THEN COALESCE((SELECT CAST(ROUND(price * 100) AS INTEGER) FROM services WHERE id = OLD.service_id), 0)
+            ELSE 0 END
+    WHERE customer_id = OLD.customer_id;
+END;
+
+-- Spend follows the current price, like the revenue read from appointment_rollup
+CREATE TRIGGER IF NOT EXISTS trg_customer_spend_price
+AFTER UPDATE OF price ON services
+WHEN OLD.price IS NOT NEW.price
+BEGIN
+    UPDATE customer_spend SET spent_cents = spent_cents
+        + (SELECT COUNT(*) FROM appointments a
+           WHERE a.customer_id = customer_spend.customer_id AND a.service_id = NEW.id AND a.status = 'completed')
+        * (COALESCE(CAST(ROUND(NEW.price * 100) AS INTEGER), 0) - COALESCE(CAST(ROUND(OLD.price * 100) AS INTEGER), 0))
+    WHERE customer_id IN (SELECT customer_id FROM appointments WHERE service_id = NEW.id AND status = 'completed');
+END;
+
+-- Change counter for the services table (service catalog cache)
+CREATE TABLE IF NOT EXISTS table_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_services_version_insert
+AFTER INSERT ON services
+BEGIN
+    INSERT INTO table_versions (name, version) VALUES ('services', 1)
+    ON CONFLICT(name) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_services_version_update
+AFTER UPDATE ON services
+BEGIN
+    INSERT INTO table_versions (name, version) VALUES ('services', 1)
+    ON CONFLICT(name) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_services_version_delete
+AFTER DELETE ON services
+BEGIN
+    INSERT INTO table_versions (name, version) VALUES ('services', 1)
+    ON CONFLICT(name) DO UPDATE SET version = version + 1;
+END;
+
+-- Full-text search indexes for the admin search (external content, kept in sync by triggers)
+CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(
+    first_name, last_name, email, phone, address,
+    content='customers', content_rowid='id', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_fts_insert
+AFTER INSERT ON customers
+BEGIN
+    INSERT INTO customers_fts (rowid, first_name, last_name, email, phone, address)
+    VALUES (NEW.id, NEW.first_name, NEW.last_name, NEW.email, NEW.phone, NEW.address);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_fts_update
+AFTER UPDATE OF first_name, last_name, email, phone, address ON customers
+BEGIN
+    INSERT INTO customers_fts (customers_fts, rowid, first_name, last_name, email, phone, address)
+    VALUES ('delete', OLD.id, OLD.first_name, OLD.last_name, OLD.email, OLD.phone, OLD.address);
+    INSERT INTO customers_fts (rowid, first_name, last_name, email, phone, address)
+    VALUES (NEW.id, NEW.first_name, NEW.last_name, NEW.email, NEW.phone, NEW.address);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_fts_delete
+AFTER DELETE ON customers
+BEGIN
+    INSERT INTO customers_fts (customers_fts, rowid, first_name, last_name, email, phone, address)
+    VALUES ('delete', OLD.id, OLD.first_name, OLD.last_name, OLD.email, OLD.phone, OLD.address);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS vehicles_fts USING fts5(
+    make, model, vin, license_plate,
+    content='vehicles', content_rowid='id', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_vehicles_fts_insert
+AFTER INSERT ON vehicles
+BEGIN
+    INSERT INTO vehicles_fts (rowid, make, model, vin, license_plate)
+    VALUES (NEW.id, NEW.make, NEW.model, NEW.vin, NEW.license_plate);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_vehicles_fts_update
+AFTER UPDATE OF make, model, vin, license_plate ON vehicles
+BEGIN
+    INSERT INTO vehicles_fts (vehicles_fts, rowid, make, model, vin, license_plate)
+    VALUES ('delete', OLD.id, OLD.make, OLD.model, OLD.vin, OLD.license_plate);
+    INSERT INTO vehicles_fts (rowid, make, model, vin, license_plate)
+    VALUES (NEW.id, NEW.make, NEW.model, NEW.vin, NEW.license_plate);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_vehicles_fts_delete
+AFTER DELETE ON vehicles
+BEGIN
+    INSERT INTO vehicles_fts (vehicles_fts, rowid, make, model, vin, license_plate)
+    VALUES ('delete', OLD.id, OLD.make, OLD.model, OLD.vin, OLD.license_plate);
+END;
+
+-- Rows removed by the admin bulk delete with "archive" ticked
+CREATE TABLE IF NOT EXISTS archived_customers (
+    id INTEGER PRIMARY KEY,
+    first_name TEXT,
+    last_name TEXT,
+    email TEXT,
+    phone TEXT,
+    address TEXT,
+    created_at TIMESTAMP,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS archived_vehicles (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER,
+    make TEXT,
+    model TEXT,
+    year INTEGER,
+    vin TEXT,
+    license_plate TEXT,
+    color TEXT,
+    mileage INTEGER,
+    created_at TIMESTAMP,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS archived_appointments (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER,
+    vehicle_id INTEGER,
+    service_id INTEGER,
+    appointment_date DATE,
+    appointment_time TIME,
+    status TEXT,
+    notes TEXT,
+    created_at TIMESTAMP,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_archived_vehicles_customer ON archived_vehicles(customer_id);
+CREATE INDEX IF NOT EXISTS idx_archived_appointments_customer ON archived_appointments(customer_id);
+
+-- Append-only appointment event log (see appointment_events.py)
+
+CREATE TABLE IF NOT EXISTS appointment_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    appointment_id INTEGER NOT NULL,
+    event_type TEXT NOT NULL,
+    customer_id INTEGER,
+    vehicle_id INTEGER,
+    service_id INTEGER,
+    appointment_date DATE,
+    appointment_time TIME,
+    status TEXT,
+    previous_date DATE,
+    previous_time TIME,
+    previous_status TEXT,
+    occurred_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_appointment_events_appointment ON appointment_events(appointment_id);
+
+CREATE TRIGGER IF NOT EXISTS trg_appointment_events_insert
+AFTER INSERT ON appointments
+BEGIN
+    INSERT INTO appointment_events (appointment_id, event_type, customer_id, vehicle_id, service_id,
+                                    appointment_date, appointment_time, status)
+    VALUES (NEW.id, 'created', NEW.customer_id, NEW.vehicle_id, NEW.service_id,
+            NEW.appointment_date, NEW.appointment_time, NEW.status);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_appointment_events_reschedule
+AFTER UPDATE OF appointment_date, appointment_time ON appointments
+WHEN OLD.appointment_date IS NOT NEW.appointment_date
+  OR OLD.appointment_time IS NOT NEW.appointment_time
+BEGIN
+    INSERT INTO appointment_events (appointment_id, event_type, customer_id, vehicle_id, service_id,
+                                    appointment_date, appointment_time, status,
+                                    previous_date, previous_time)
+    VALUES (NEW.id, 'rescheduled', NEW.customer_id, NEW.vehicle_id, NEW.service_id,
+            NEW.appointment_date, NEW.appointment_time, NEW.status,
+            OLD.appointment_date, OLD.appointment_time);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_appointment_events_status
+AFTER UPDATE OF status ON appointments
+WHEN OLD.status IS NOT NEW.status
+BEGIN
+    INSERT INTO appointment_events (appointment_id, event_type, customer_id, vehicle_id, service_id,
+                                    appointment_date, appointment_time, status, previous_status)
+    VALUES (NEW.id, 'status_changed', NEW.customer_id, NEW.vehicle_id, NEW.service_id,
+            NEW.appointment_date, NEW.appointment_time, NEW.status, OLD.status);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_appointment_events_update
+AFTER UPDATE OF customer_id, vehicle_id, service_id ON appointments
+WHEN OLD.customer_id IS NOT NEW.customer_id
+  OR OLD.vehicle_id IS NOT NEW.vehicle_id
+  OR OLD.service_id IS NOT NEW.service_id
+BEGIN
+    INSERT INTO appointment_events (appointment_id, event_type, customer_id, vehicle_id, service_id,
+                                    appointment_date, appointment_time, status)
+    VALUES (NEW.id, 'updated', NEW.customer_id, NEW.vehicle_id, NEW.service_id,
+            NEW.appointment_date, NEW.appointment_time, NEW.status);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_appointment_events_delete
+AFTER DELETE ON appointments
+BEGIN
+    INSERT INTO appointment_events (appointment_id, event_type, customer_id, vehicle_id, service_id,
+                                    appointment_date, appointment_time, status)
+    VALUES (OLD.id, 'deleted', OLD.customer_id, OLD.vehicle_id, OLD.service_id,
+            OLD.appointment_date, OLD.appointment_time, OLD.status);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_appointment_events_no_update
+BEFORE UPDATE ON appointment_events
+BEGIN
+    SELECT RAISE(ABORT, 'appointment_events is append-only');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_appointment_events_no_delete
+BEFORE DELETE ON appointment_events
+BEGIN
+    SELECT RAISE(ABORT, 'appointment_events is append-only');
+END;
+
+CREATE TABLE IF NOT EXISTS event_consumers (
+    name TEXT PRIMARY KEY,
+    last_event_id INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) WITHOUT ROWID;
+
+-- Booking activity totals for the analytics page, advanced by the booking_activity consumer
+CREATE TABLE IF NOT EXISTS booking_activity (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    bookings INTEGER NOT NULL,
+    reschedules INTEGER NOT NULL,
+    cancellations INTEGER NOT NULL,
+    completions INTEGER NOT NULL,
+    lead_days_total INTEGER NOT NULL,
+    lead_days_count INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO booking_activity VALUES (1, 0, 0, 0, 0, 0, 0);
@@ -2,13 +2,32 @@
 """
 Database Viewer for Automotive Service Scheduling System
 Simple script to view database contents
+
+Listings are read from the cursor row by row and written straight to stdout,
+so memory use stays flat and output starts at once, even on million-row
+databases.
+
+Usage:
+    python db_viewer.py [customers|vehicles|appointments|services|stats|analyze|all]
+                        [--limit N] [--offset N] [--where SQL]
+                        [--format table|csv|ndjson] [--database PATH]
+    python db_viewer.py analyze [--no-analyze] [--database PATH]
 """
 
+import argparse
+import ast
+import csv
+import json
+import os
+import re
 import sqlite3
 import sys
 from datetime import datetime
 
+from analytics_snapshot import SNAPSHOT_MAX_AGE, SNAPSHOT_PATH, open_snapshot, snapshot_age
+
 DATABASE = 'automotive_service.db'
+OUTPUT_FORMATS = ('table', 'csv', 'ndjson')
 
 def get_db_connection():
     """Get database connection"""
@@ -20,155 +39,159 @@ def get_db_connection():
         print(f"Database connection failed: {e}")
         return None
 
-def view_customers():
-    """View all customers"""
-    conn = get_db_connection()
-    if not conn:
-        return
-    
+def get_report_connection():
+    """Connection for statistics: the analytics snapshot if fresh enough, else the live database"""
+    age = snapshot_age(SNAPSHOT_PATH) if SNAPSHOT_PATH else None
+    if age is None or age > SNAPSHOT_MAX_AGE:
+        return get_db_connection()
     try:
-        customers = conn.execute('''
-            SELECT 
-                c.*,
-                COUNT(DISTINCT v.id) as vehicle_count,
-                COUNT(DISTINCT a.id) as appointment_count
-            FROM customers c
-            LEFT JOIN vehicles v ON c.id = v.customer_id
-            LEFT JOIN appointments a ON c.id = a.customer_id
-            GROUP BY c.id
-            ORDER BY c.last_name, c.first_name
-        ''').fetchall()
-        
-        print("\n=== CUSTOMERS ===")
-        print(f"{'ID':<5} {'Name':<25} {'Email':<30} {'Phone':<15} {'Vehicles':<8} {'Appointments':<12}")
-        print("-" * 95)
-        
-        for customer in customers:
-            name = f"{customer['first_name']} {customer['last_name']}"
-            print(f"{customer['id']:<5} {name:<25} {customer['email']:<30} {customer['phone']:<15} {customer['vehicle_count']:<8} {customer['appointment_count']:<12}")
-        
-        print(f"\nTotal customers: {len(customers)}")
-        
-    except sqlite3.Error as e:
-        print(f"Error viewing customers: {e}")
-    finally:
-        conn.close()
+        conn = open_snapshot(SNAPSHOT_PATH)
+        conn.row_factory = sqlite3.Row
+    except sqlite3.Error:
+        return get_db_connection()
+    print(f"(statistics from analytics snapshot {SNAPSHOT_PATH}, taken {age:.0f}s ago)")
+    return conn
 
-def view_vehicles():
-    """View all vehicles"""
-    conn = get_db_connection()
-    if not conn:
-        return
-    
-    try:
-        vehicles = conn.execute('''
-            SELECT 
-                v.*,
-                c.first_name,
-                c.last_name,
-                COUNT(a.id) as appointment_count
-            FROM vehicles v
-            JOIN customers c ON v.customer_id = c.id
-            LEFT JOIN appointments a ON v.id = a.vehicle_id
-            GROUP BY v.id
-            ORDER BY c.last_name, c.first_name, v.year DESC
-        ''').fetchall()
-        
-        print("\n=== VEHICLES ===")
-        print(f"{'ID':<5} {'Owner':<25} {'Vehicle':<30} {'Year':<6} {'VIN':<10} {'Appointments':<12}")
-        print("-" * 88)
-        
-        for vehicle in vehicles:
-            owner = f"{vehicle['first_name']} {vehicle['last_name']}"
-            vehicle_info = f"{vehicle['make']} {vehicle['model']}"
-            vin = vehicle['vin'][:10] if vehicle['vin'] else 'N/A'
-            print(f"{vehicle['id']:<5} {owner:<25} {vehicle_info:<30} {vehicle['year']:<6} {vin:<10} {vehicle['appointment_count']:<12}")
-        
-        print(f"\nTotal vehicles: {len(vehicles)}")
-        
-    except sqlite3.Error as e:
-        print(f"Error viewing vehicles: {e}")
-    finally:
-        conn.close()
+# Table-format row printers
+def format_customer(customer):
+    name = f"{customer['first_name']} {customer['last_name']}"
+    return f"{customer['id']:<5} {name:<25} {customer['email']:<30} {customer['phone']:<15} {customer['vehicle_count']:<8} {customer['appointment_count']:<12}"
 
-def view_appointments():
-    """View all appointments"""
-    conn = get_db_connection()
-    if not conn:
-        return
-    
-    try:
-        appointments = conn.execute('''
-            SELECT 
-                a.*,
-                c.first_name,
-                c.last_name,
-                v.make,
-                v.model,
-                v.year,
-                s.name as service_name,
-                s.price
-            FROM appointments a
-            JOIN customers c ON a.customer_id = c.id
-            JOIN vehicles v ON a.vehicle_id = v.id
-            JOIN services s ON a.service_id = s.id
-            ORDER BY a.appointment_date DESC, a.appointment_time DESC
-            LIMIT 20
-        ''').fetchall()
-        
-        print("\n=== RECENT APPOINTMENTS (Last 20) ===")
-        print(f"{'ID':<5} {'Customer':<20} {'Vehicle':<25} {'Service':<20} {'Date':<12} {'Status':<12} {'Price':<8}")
-        print("-" * 102)
-        
-        for appt in appointments:
-            customer = f"{appt['first_name']} {appt['last_name']}"
-            vehicle = f"{appt['year']} {appt['make']} {appt['model']}"
-            print(f"{appt['id']:<5} {customer:<20} {vehicle:<25} {appt['service_name']:<20} {appt['appointment_date']:<12} {appt['status']:<12} ${appt['price']:<7.2f}")
-        
-        print(f"\nShowing recent 20 appointments")
-        
-    except sqlite3.Error as e:
-        print(f"Error viewing appointments: {e}")
-    finally:
-        conn.close()
+def format_vehicle(vehicle):
+    owner = f"{vehicle['first_name']} {vehicle['last_name']}"
+    vehicle_info = f"{vehicle['make']} {vehicle['model']}"
+    vin = vehicle['vin'][:10] if vehicle['vin'] else 'N/A'
+    return f"{vehicle['id']:<5} {owner:<25} {vehicle_info:<30} {vehicle['year']:<6} {vin:<10} {vehicle['appointment_count']:<12}"
+
+def format_appointment(appt):
+    customer = f"{appt['first_name']} {appt['last_name']}"
+    vehicle = f"{appt['year']} {appt['make']} {appt['model']}"
+    return f"{appt['id']:<5} {customer:<20} {vehicle:<25} {appt['service_name']:<20} {appt['appointment_date']:<12} {appt['status']:<12} ${appt['price']:<7.2f}"
+
+def format_service(service):
+    active = "Yes" if service['is_active'] else "No"
+    duration = f"{service['estimated_duration']} min"
+    return f"{service['id']:<5} {service['name']:<25} {duration:<10} ${service['price']:<9.2f} {active:<8} {service['appointment_count']:<12} ${service['total_revenue']:<9.2f}"
+
+# Listings: query ({where} is replaced by the --where filter), title, table
+# header, row printer and default --limit. The per-row counts are correlated
+# subqueries on indexed columns and the ORDER BY follows an index where it
+# can, so SQLite hands rows over as it finds them instead of grouping and
+# sorting the whole result first. --where can use the aliases c (customers),
+# v (vehicles), a (appointments) and s (services) of each query. Password
+# hashes are never listed.
+LISTINGS = {
+    'customers': ('''
+        SELECT 
+            c.id, c.first_name, c.last_name, c.email, c.phone, c.address, c.created_at,
+            (SELECT COUNT(*) FROM vehicles v WHERE v.customer_id = c.id) as vehicle_count,
+            (SELECT COUNT(*) FROM appointments a WHERE a.customer_id = c.id) as appointment_count
+        FROM customers c
+        {where}
+        ORDER BY c.last_name, c.first_name
+    ''', 'CUSTOMERS',
+        f"{'ID':<5} {'Name':<25} {'Email':<30} {'Phone':<15} {'Vehicles':<8} {'Appointments':<12}",
+        format_customer, None),
+    'vehicles': ('''
+        SELECT 
+            v.*,
+            c.first_name,
+            c.last_name,
+            (SELECT COUNT(*) FROM appointments a WHERE a.vehicle_id = v.id) as appointment_count
+        FROM vehicles v
+        JOIN customers c ON v.customer_id = c.id
+        {where}
+        ORDER BY c.last_name, c.first_name, v.year DESC
+    ''', 'VEHICLES',
+        f"{'ID':<5} {'Owner':<25} {'Vehicle':<30} {'Year':<6} {'VIN':<10} {'Appointments':<12}",
+        format_vehicle, None),
+    'appointments': ('''
+        SELECT 
+            a.*,
+            c.first_name,
+            c.last_name,
+            v.make,
+            v.model,
+            v.year,
+            s.name as service_name,
+            s.price
+        FROM appointments a
+        JOIN customers c ON a.customer_id = c.id
+        JOIN vehicles v ON a.vehicle_id = v.id
+        JOIN services s ON a.service_id = s.id
+        {where}
+        ORDER BY a.appointment_date DESC, a.appointment_time DESC
+    ''', 'RECENT APPOINTMENTS',
+        f"{'ID':<5} {'Customer':<20} {'Vehicle':<25} {'Service':<20} {'Date':<12} {'Status':<12} {'Price':<8}",
+        format_appointment, 20),
+    'services': ('''
+        SELECT 
+            s.*,
+            (SELECT COUNT(*) FROM appointments a WHERE a.service_id = s.id) as appointment_count,
+            (SELECT COALESCE(SUM(CASE WHEN a.status = 'completed' THEN s.price ELSE 0 END), 0)
+             FROM appointments a WHERE a.service_id = s.id) as total_revenue
+        FROM services s
+        {where}
+        ORDER BY s.name
+    ''', 'SERVICES',
+        f"{'ID':<5} {'Service Name':<25} {'Duration':<10} {'Price':<10} {'Active':<8} {'Appointments':<12} {'Revenue':<10}",
+        format_service, None),
+}
+
+def open_listing(conn, name, where=None, limit=None, offset=0):
+    """Execute a listing's query; the returned cursor yields rows lazily"""
+    query, _, _, _, default_limit = LISTINGS[name]
+    limit = default_limit if limit is None else limit
+    sql = query.format(where=f'WHERE {where}' if where else '') + ' LIMIT ? OFFSET ?'
+    # --limit 0 lists every row; LIMIT -1 is SQLite's "no limit"
+    return conn.execute(sql, (limit or -1, offset))
+
+def write_table(name, cursor, out):
+    """Print rows as the fixed-width table, row by row"""
+    _, title, header, format_row, _ = LISTINGS[name]
+    print(f"\n=== {title} ===", file=out)
+    print(header, file=out)
+    print("-" * len(header), file=out)
+    count = 0
+    for row in cursor:
+        print(format_row(row), file=out)
+        count += 1
+    print(f"\n{name.title()} shown: {count}", file=out)
 
-def view_services():
-    """View all services"""
+def write_csv(name, cursor, out):
+    """Write rows as CSV with a header line"""
+    writer = csv.writer(out)
+    writer.writerow(column[0] for column in cursor.description)
+    for row in cursor:
+        writer.writerow(row)
+
+def write_ndjson(name, cursor, out):
+    """Write one JSON object per row"""
+    columns = [column[0] for column in cursor.description]
+    for row in cursor:
+        out.write(json.dumps(dict(zip(columns, row)), default=str))
+        out.write('\n')
+
+WRITERS = {'table': write_table, 'csv': write_csv, 'ndjson': write_ndjson}
+
+def view_listing(name, output_format='table', where=None, limit=None, offset=0, out=sys.stdout):
+    """Stream one listing to out in the given format; returns False on a query error"""
     conn = get_db_connection()
     if not conn:
-        return
+        return False
     
     try:
-        services = conn.execute('''
-            SELECT 
-                s.*,
-                COUNT(a.id) as appointment_count,
-                SUM(CASE WHEN a.status = 'completed' THEN s.price ELSE 0 END) as total_revenue
-            FROM services s
-            LEFT JOIN appointments a ON s.id = a.service_id
-            GROUP BY s.id
-            ORDER BY s.name
-        ''').fetchall()
-        
-        print("\n=== SERVICES ===")
-        print(f"{'ID':<5} {'Service Name':<25} {'Duration':<10} {'Price':<10} {'Active':<8} {'Appointments':<12} {'Revenue':<10}")
-        print("-" * 80)
-        
-        for service in services:
-            active = "Yes" if service['is_active'] else "No"
-            duration = f"{service['estimated_duration']} min"
-            print(f"{service['id']:<5} {service['name']:<25} {duration:<10} ${service['price']:<9.2f} {active:<8} {service['appointment_count']:<12} ${service['total_revenue']:<9.2f}")
-        
-        print(f"\nTotal services: {len(services)}")
-        
+        WRITERS[output_format](name, open_listing(conn, name, where, limit, offset), out)
+        return True
     except sqlite3.Error as e:
-        print(f"Error viewing services: {e}")
+        print(f"Error viewing {name}: {e}", file=sys.stderr)
+        return False
     finally:
         conn.close()
 
 def view_statistics():
     """View database statistics"""
-    conn = get_db_connection()
+    conn = get_report_connection()
     if not conn:
         return
     
@@ -217,42 +240,353 @@ def view_statistics():
     finally:
         conn.close()
 
+# Query plan audit
+# Finds the SQL in app.py by parsing its source (nothing is imported or run),
+# prepares every statement with EXPLAIN QUERY PLAN against the database and
+# flags full scans (of a table or a whole index), temporary B-trees and
+# correlated subqueries. For the scans it suggests indexes, with row
+# estimates from sqlite_stat1.
+ANALYZE_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+SQL_STATEMENT = re.compile(r'\s*(SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\s')
+TABLE_REFERENCE = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+NOT_AN_ALIAS = {'where', 'join', 'left', 'inner', 'cross', 'on', 'group', 'order', 'limit',
+                'union', 'set', 'values', 'using', 'natural', 'outer', 'as', 'having'}
+SMALL_TABLE_ROWS = 1000  # full scans of smaller tables are not worth an index
+DISTINCT_SAMPLE_ROWS = 100000
+
+def route_label(function):
+    """'name (METHODS /path)' for a Flask view function, else just its name"""
+    for decorator in function.decorator_list:
+        if (isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Attribute)
+                and decorator.func.attr == 'route' and decorator.args):
+            path = ast.literal_eval(decorator.args[0])
+            methods = ['GET']
+            for keyword in decorator.keywords:
+                if keyword.arg == 'methods':
+                    methods = ast.literal_eval(keyword.value)
+            return f"{function.name} ({'/'.join(methods)} {path})"
+    return function.name
+
+def render_fstring(node, constants):
+    """SQL text of an f-string, or (None, reason) if a part is only known at run time"""
+    parts = []
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            parts.append(str(value.value))
+            continue
+        expression = ast.unparse(value.value)
+        if isinstance(value.value, ast.Name) and value.value.id in constants:
+            parts.append(str(constants[value.value.id]))
+        elif "'?'" in expression:
+            parts.append('?')  # a generated placeholder list: IN ({', '.join('?' * n)})
+        elif expression == 'where':
+            parts.append('')
+        else:
+            return None, f'built at run time from {{{expression}}}'
+    return ''.join(parts), None
+
+def collect_statements(path=ANALYZE_SOURCE):
+    """SQL statements in a Python source file
+
+    Returns ([(line, label, sql)], [(line, label, reason)]) - the statements
+    that could be rendered, and those skipped because they are only put
+    together at run time. Query templates get an empty {where}; paginate()
+    queries are expanded once per sort option.
+    """
+    with open(path) as source:
+        tree = ast.parse(source.read(), path)
+    constants = {}
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+                and isinstance(node.value, ast.Constant) and isinstance(node.value.value, (str, int, float))):
+            constants[node.targets[0].id] = node.value.value
+    statements = []
+    skipped = []
+    handled = set()
+
+    def visit(node, label):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            label = route_label(node)
+        elif isinstance(node, ast.Assign) and label is None:
+            label = ast.unparse(node.targets[0])
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'paginate'
+                and len(node.args) >= 3 and isinstance(node.args[1], ast.Constant)):
+            handled.add(id(node.args[1]))
+            for sort, (direction, columns) in ast.literal_eval(node.args[2]).items():
+                order_by = ', '.join(f'{expression} {direction.upper()}' for expression, _ in columns)
+                sql = node.args[1].value.format(where='', order_by=order_by) + ' LIMIT ?'
+                statements.append((node.lineno, f'{label} [sort={sort}]', sql))
+        elif id(node) not in handled and isinstance(node, ast.Constant) and isinstance(node.value, str):
+            if SQL_STATEMENT.match(node.value):
+                try:
+                    statements.append((node.lineno, label, node.value.format(where='')))
+                except (KeyError, IndexError, ValueError):
+                    skipped.append((node.lineno, label, 'template with run-time placeholders'))
+        elif isinstance(node, ast.JoinedStr):
+            first = node.values[0] if node.values else None
+            if isinstance(first, ast.Constant) and SQL_STATEMENT.match(str(first.value)):
+                sql, reason = render_fstring(node, constants)
+                if sql is None:
+                    skipped.append((node.lineno, label, reason))
+                else:
+                    statements.append((node.lineno, label, sql))
+            return  # the f-string's own parts are not statements
+        for child in ast.iter_child_nodes(node):
+            visit(child, label)
+
+    for node in tree.body:
+        visit(node, None)
+    return statements, skipped
+
+def placeholder_values(sql):
+    """NULL bindings for every placeholder, so the statement can be prepared"""
+    # Placeholders inside string literals are not placeholders
+    code = re.sub(r"'(?:[^']|'')*'", "''", sql)
+    names = re.findall(r'(?<![:\w]):(\w+)', code)
+    if names:
+        return {name: None for name in names}
+    return (None,) * code.count('?')
+
+def explain(conn, sql):
+    """EXPLAIN QUERY PLAN steps as (depth, detail)"""
+    depth = {0: -1}
+    steps = []
+    for node_id, parent, _, detail in conn.execute('EXPLAIN QUERY PLAN ' + sql, placeholder_values(sql)):
+        depth[node_id] = depth.get(parent, -1) + 1
+        steps.append((depth[node_id], detail))
+    return steps
+
+def plan_findings(steps):
+    """(kind, plan step) for each step worth a look"""
+    findings = []
+    for _, detail in steps:
+        # A SCAN has no constraint to seek with, so it reads the whole table or
+        # the whole index (as in the slow-query log's full_scan)
+        if detail.startswith('SCAN ') and 'CONSTANT ROW' not in detail:
+            findings.append(('full scan', detail))
+        elif 'TEMP B-TREE' in detail:
+            findings.append(('temp b-tree', detail))
+        elif detail.startswith('CORRELATED '):
+            findings.append(('correlated subquery', detail))
+    return findings
+
+def table_aliases(conn, sql):
+    """{name used in the plan: table} for the ordinary tables a statement reads"""
+    # Virtual tables (the FTS indexes) scan by their own rules
+    tables = {row[0].lower() for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND sql NOT LIKE 'CREATE VIRTUAL%'")}
+    aliases = {}
+    for table, alias in TABLE_REFERENCE.findall(sql):
+        if table.lower() not in tables:
+            continue
+        aliases[table] = table
+        if alias and alias.lower() not in NOT_AN_ALIAS:
+            aliases[alias] = table
+    return aliases
+
+def filter_clauses(sql):
+    """Text of the WHERE and ON clauses, where the filtering comparisons are"""
+    return ' '.join(re.findall(
+        r'\b(?:WHERE|ON)\b(.*?)(?=\b(?:GROUP\s+BY|ORDER\s+BY|LIMIT|HAVING|UNION|WHERE|(?:LEFT\s+|INNER\s+|CROSS\s+)?JOIN)\b|\)|$)',
+        sql, re.IGNORECASE | re.DOTALL))
+
+def candidate_columns(conn, sql, alias, table, aliases, join_keys=True):
+    """Columns of table filtered on in sql: equality columns first, then one range column
+
+    Join keys only count for a table that is not the outermost loop; the
+    outer table is read before there is a value to look up.
+    """
+    # The INTEGER PRIMARY KEY is the rowid, which needs no index
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')
+               if not (row[5] and row[2].upper() == 'INTEGER')]
+    clauses = filter_clauses(sql)
+    single_table = len(set(aliases.values())) == 1
+    value = r"(?:\?|:\w+|'|-?\d)" if not join_keys else r"(?:\?|:\w+|'|-?\d|\w+\.\w+)"
+    equality, ranges = [], []
+    for column in columns:
+        if single_table:
+            reference = rf'(?<!\.)\b(?:{re.escape(alias)}\.)?{column}\b'
+        else:
+            reference = rf'\b{re.escape(alias)}\.{column}\b'
+        if (re.search(rf'{reference}\s*(?:=\s*{value}|IN\s*\()', clauses, re.IGNORECASE)
+                or re.search(rf'{value}\w*\s*=\s*{reference}', clauses)):
+            equality.append(column)
+        elif re.search(rf'{reference}\s*(?:<|>|BETWEEN\b)', clauses, re.IGNORECASE):
+            ranges.append(column)
+    return equality + ranges[:1]
+
+def existing_index(conn, table, columns):
+    """Name of an index on table that starts with columns, or None"""
+    for index in conn.execute(f'PRAGMA index_list({table})'):
+        indexed = [row[2] for row in conn.execute(f'PRAGMA index_info({index[1]})')]
+        if indexed[:len(columns)] == columns:
+            return index[1]
+    return None
+
+def estimate_rows(conn, table, columns):
+    """(rows in table, rows per key of columns) estimated from sqlite_stat1
+
+    An index starting with the first column gives the rows per key directly;
+    otherwise they are measured on a sample of the table.
+    """
+    table_rows = None
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        return None, None
+    for index, stat in conn.execute('SELECT idx, stat FROM sqlite_stat1 WHERE tbl = ?', (table,)):
+        numbers = [int(number) for number in stat.split() if number.isdigit()]
+        table_rows = numbers[0]
+        leading = [row[2] for row in conn.execute(f'PRAGMA index_info({index})')] if index else []
+        if len(columns) == 1 and leading[:1] == columns and len(numbers) > 1:
+            return table_rows, numbers[1]
+    if table_rows is None or not columns:
+        return table_rows, table_rows
+    column_list = ', '.join(columns)
+    sample = f'SELECT {column_list} FROM {table} LIMIT {DISTINCT_SAMPLE_ROWS}'
+    sampled = conn.execute(f'SELECT COUNT(*) FROM ({sample})').fetchone()[0]
+    distinct = conn.execute(f'SELECT COUNT(*) FROM (SELECT DISTINCT {column_list} FROM ({sample}))').fetchone()[0]
+    return table_rows, max(1, round(sampled / max(distinct, 1)))
+
+def line_list(lines):
+    """'line 12' or 'lines 12, 40'"""
+    lines = sorted(set(lines))
+    return f"line{'s' if len(lines) > 1 else ''} {', '.join(map(str, lines))}"
+
+def view_analysis(run_analyze=True):
+    """Audit the query plans of app.py's SQL and suggest indexes"""
+    conn = get_db_connection()
+    if not conn:
+        return False
+    
+    try:
+        conn.execute('PRAGMA busy_timeout = 5000')
+        if run_analyze:
+            print("\nRunning ANALYZE...")
+            conn.execute('ANALYZE')
+            conn.commit()
+        
+        statements, skipped = collect_statements()
+        print(f"\n=== QUERY PLAN AUDIT ({os.path.basename(ANALYZE_SOURCE)}: {len(statements)} statements) ===")
+        # scan key -> (table, columns, where the scans are)
+        scans = {}
+        flagged = failed = 0
+        for line, label, sql in statements:
+            try:
+                steps = explain(conn, sql)
+            except sqlite3.Error as e:
+                print(f"\nline {line}  {label}\n  could not prepare: {e}")
+                failed += 1
+                continue
+            aliases = table_aliases(conn, sql)
+            # Scans of CTEs, subqueries and virtual tables are not table scans
+            findings = [(kind, detail) for kind, detail in plan_findings(steps)
+                        if kind != 'full scan' or detail.split()[1] in aliases]
+            if not findings:
+                continue
+            flagged += 1
+            print(f"\nline {line}  {label}")
+            print(f"  {' '.join(sql.split())[:150]}")
+            for depth, detail in steps:
+                print(f"  {'  ' * depth}{detail}")
+            outermost = next((detail for depth, detail in steps
+                              if depth == 0 and detail.startswith(('SCAN ', 'SEARCH '))), None)
+            # An outer scan in ORDER BY order stops after LIMIT rows
+            stops_early = (re.search(r'\bLIMIT\s+\?\s*$', sql)
+                           and not any('TEMP B-TREE FOR ORDER BY' in detail for _, detail in steps))
+            for kind, detail in findings:
+                if kind == 'full scan' and stops_early and detail == outermost:
+                    print(f"  ! {kind}: {detail} (stops at LIMIT)")
+                    continue
+                print(f"  ! {kind}: {detail}")
+                if kind == 'full scan':
+                    name = detail.split()[1]
+                    table = aliases[name]
+                    columns = candidate_columns(conn, sql, name, table, aliases, detail != outermost)
+                    scans.setdefault((table, tuple(columns)), []).append(line)
+        
+        print(f"\n{len(statements)} statements checked, {flagged} flagged, {failed} could not be prepared")
+        for line, label, reason in skipped:
+            print(f"  skipped line {line} {label}: {reason}")
+        
+        print("\n=== CANDIDATE INDEXES ===")
+        suggested = 0
+        small = {}
+        unanalyzed = {}
+        for (table, columns), lines in sorted(scans.items()):
+            columns = list(columns)
+            where = line_list(lines)
+            table_rows, per_key = estimate_rows(conn, table, columns)
+            if table_rows is None:
+                unanalyzed.setdefault(table, []).extend(lines)
+            elif table_rows < SMALL_TABLE_ROWS:
+                small.setdefault((table, table_rows), []).extend(lines)
+            elif not columns:
+                print(f"{table}: scans ~{table_rows:,} rows with no filter to index ({where})")
+            elif existing_index(conn, table, columns):
+                print(f"{table}({', '.join(columns)}): {existing_index(conn, table, columns)} exists, "
+                      f"the planner prefers the scan ({where})")
+            else:
+                suggested += 1
+                print(f"CREATE INDEX idx_{table}_{'_'.join(columns)} ON {table}({', '.join(columns)});")
+                print(f"    {where}: full scan of ~{table_rows:,} rows, ~{per_key:,} rows per lookup with the index")
+        for table, lines in unanalyzed.items():
+            print(f"{table}: no sqlite_stat1 rows; run without --no-analyze ({line_list(lines)})")
+        for (table, table_rows), lines in small.items():
+            print(f"{table}: {table_rows:,} rows, too small to need an index ({line_list(lines)})")
+        if not scans:
+            print("No full scans.")
+        elif not suggested:
+            print("No new indexes suggested.")
+        return True
+    except sqlite3.Error as e:
+        print(f"Error analyzing queries: {e}", file=sys.stderr)
+        return False
+    finally:
+        conn.close()
+
 def main():
     """Main function"""
-    print("=== Automotive Service Scheduling - Database Viewer ===")
-    print(f"Database: {DATABASE}")
-    print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    global DATABASE
+    parser = argparse.ArgumentParser(description='View database contents.')
+    parser.add_argument('view', nargs='?', default='all', choices=[*LISTINGS, 'stats', 'analyze', 'all'])
+    parser.add_argument('--database', default=DATABASE, help=f'database file (default: {DATABASE})')
+    parser.add_argument('--limit', type=int, help='maximum rows per listing, 0 for all (default: all, 20 for appointments)')
+    parser.add_argument('--offset', type=int, default=0, help='rows to skip first (default: 0)')
+    parser.add_argument('--where', help="SQL filter, e.g. \"c.created_at >= '2025-01-01'\" (aliases c, v, a, s)")
+    parser.add_argument('--format', dest='output_format', default='table', choices=OUTPUT_FORMATS,
+                        help='output format (default: table)')
+    parser.add_argument('--no-analyze', action='store_true',
+                        help='analyze: use the existing sqlite_stat1 instead of running ANALYZE first')
+    args = parser.parse_args()
+    DATABASE = args.database
     
     # Check if database exists
-    try:
-        conn = sqlite3.connect(DATABASE)
-        conn.close()
-    except sqlite3.Error:
-        print(f"Error: Database '{DATABASE}' not found or cannot be accessed.")
-        print("Please run setup.py first to create the database.")
+    if not os.path.exists(DATABASE):
+        print(f"Error: Database '{DATABASE}' not found or cannot be accessed.", file=sys.stderr)
+        print("Please run setup.py first to create the database.", file=sys.stderr)
         sys.exit(1)
     
-    if len(sys.argv) > 1:
-        option = sys.argv[1].lower()
-        if option == 'customers':
-            view_customers()
-        elif option == 'vehicles':
-            view_vehicles()
-        elif option == 'appointments':
-            view_appointments()
-        elif option == 'services':
-            view_services()
-        elif option == 'stats':
+    views = list(LISTINGS) if args.view == 'all' else [args.view] if args.view in LISTINGS else []
+    if args.output_format != 'table' and len(views) != 1:
+        parser.error('csv and ndjson output need a single listing: customers, vehicles, appointments or services')
+    
+    if args.output_format == 'table':
+        print("=== Automotive Service Scheduling - Database Viewer ===")
+        print(f"Database: {DATABASE}")
+        print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        if args.view in ('stats', 'all'):
             view_statistics()
-        else:
-            print("Invalid option. Use: customers, vehicles, appointments, services, or stats")
-    else:
-        # Show all by default
-        view_statistics()
-        view_customers()
-        view_vehicles()
-        view_services()
-        view_appointments()
+        if args.view == 'analyze' and not view_analysis(not args.no_analyze):
+            sys.exit(1)
+    
+    try:
+        for name in views:
+            if not view_listing(name, args.output_format, args.where, args.limit, args.offset):
+                sys.exit(1)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader (head, less) went away; stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
 
 if __name__ == "__main__":
     main()
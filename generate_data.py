@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for Automotive Service Scheduling System
+Fills the database with a deterministic, production-sized data set drawn from
+the distributions in the Data/ CSV files.
+
+Usage:
+    python generate_data.py --scale 1000 --seed 42   # 1M customers, 2M vehicles, 10M appointments
+"""
+
+import argparse
+import csv
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from appointment_events import BOOKING_ACTIVITY_CONSUMER, get_cursor, save_cursor
+from import_data import (
+    CUSTOMERS_CSV, DATABASE, DEFAULT_PASSWORD_HASH, SERVICES_CSV, VEHICLES_CSV,
+    ImportStats, batched, deferred_indexes, import_services, rebuild_indexes, title_case,
+)
+
+# Rows per unit of --scale
+CUSTOMERS_PER_SCALE = 1000
+VEHICLES_PER_SCALE = 2000
+APPOINTMENTS_PER_SCALE = 10000
+
+# Appointment window and shop hours (SLOT_MINUTES grid, as in app.py)
+DEFAULT_START_DATE = '2024-01-01'
+DEFAULT_DAYS = 3 * 365
+UPCOMING_DAYS = 60
+SHOP_OPEN_HOUR = 8
+SHOP_CLOSE_HOUR = 18
+SLOT_MINUTES = 15
+SERVICE_BAYS = int(os.environ.get('SERVICE_BAYS', 3))  # fewest bays the data is generated for
+BAY_OCCUPANCY = 0.5  # average share of bay time held, which sets the bay count for larger volumes
+BOOKING_ATTEMPTS = 8  # random slots tried before a booking that finds no free bay is cancelled
+UPCOMING_FILL = 0.6  # share of an upcoming day's bay time that is booked at most, so slots stay free
+
+# Status mix for past and upcoming appointments
+PAST_STATUSES = (('completed', 85), ('cancelled', 14), ('in_progress', 1))
+UPCOMING_STATUSES = (('scheduled', 90), ('cancelled', 10))
+
+VIN_CHARS = 'ABCDEFGHJKLMNPRSTUVWXYZ0123456789'
+
+class SourceDistributions:
+    """Value pools sampled from the Data/ CSV files
+
+    Pools keep duplicates, so rng.choice() reproduces the empirical
+    frequencies of the source data.
+    """
+
+    def __init__(self, customers_csv, vehicles_csv, services_csv):
+        self.first_names, self.last_names = [], []
+        self.streets, self.cities, self.states, self.zip_codes = [], [], [], []
+        with open(customers_csv, newline='', encoding='utf-8') as f:
+            for record in csv.DictReader(f):
+                first_name, _, last_name = ' '.join((record.get('Name') or '').split()).partition(' ')
+                if first_name and last_name:
+                    self.first_names.append(first_name)
+                    self.last_names.append(last_name)
+                self.streets.append((record.get('Street Address') or '').strip())
+                self.cities.append((record.get('City') or '').strip())
+                self.states.append((record.get('State') or '').strip())
+                self.zip_codes.append((record.get('Zip Code') or '').strip())
+
+        self.vehicles = []
+        with open(vehicles_csv, newline='', encoding='utf-8') as f:
+            for record in csv.DictReader(f):
+                try:
+                    year = int(float(record['year']))
+                    mileage = int(round(float(record['mileage'])))
+                except (KeyError, ValueError):
+                    continue
+                make, model = title_case(record.get('brand') or ''), title_case(record.get('model') or '')
+                if make and model and year > 1980 and mileage >= 0:
+                    self.vehicles.append((make, model, year, title_case(record.get('color') or '') or 'Unknown', mileage))
+
+        self.repair_counts = {}
+        with open(services_csv, newline='', encoding='utf-8') as f:
+            for record in csv.DictReader(f):
+                name = (record.get('Repair Description') or '').strip()
+                if name:
+                    self.repair_counts[name] = self.repair_counts.get(name, 0) + 1
+
+    def service_weights(self, services):
+        """Booking weight per service id; services missing from the CSV get the average weight"""
+        average = sum(self.repair_counts.values()) / len(self.repair_counts) if self.repair_counts else 1
+        return [self.repair_counts.get(name, average) for _, name in services]
+
+def weighted_pool(choices, size=1000):
+    """Expand (value, weight) pairs into a list for fast rng.choice()"""
+    total = sum(weight for _, weight in choices)
+    pool = []
+    for value, weight in choices:
+        pool.extend([value] * max(1, round(size * weight / total)))
+    return pool
+
+@contextmanager
+def deferred_triggers(conn, table):
+    """Drop the table's triggers for a load and recreate them afterwards, also if it fails"""
+    triggers = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,)
+    ).fetchall()
+    for name, _ in triggers:
+        conn.execute(f'DROP TRIGGER {name}')
+    conn.commit()
+    try:
+        yield
+    finally:
+        rebuild_indexes(conn, [sql for _, sql in triggers])
+
+def table_exists(conn, name):
+    """Check whether a table exists"""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+def next_id(conn, table):
+    """First free id of a table"""
+    return (conn.execute(f'SELECT MAX(id) FROM {table}').fetchone()[0] or 0) + 1
+
+def insert_rows(conn, stats, insert_sql, rows, batch_size):
+    """executemany() generated rows in chunked transactions"""
+    for batch in batched(rows, batch_size):
+        with conn:
+            conn.executemany(insert_sql, batch)
+        stats.read += len(batch)
+        stats.inserted += len(batch)
+
+def generate_customers(rng, source, first_id, count):
+    """Yield customer rows with unique e-mail addresses"""
+    created_start = date.fromisoformat(DEFAULT_START_DATE) - timedelta(days=2 * 365)
+    for customer_id in range(first_id, first_id + count):
+        first_name = rng.choice(source.first_names)
+        last_name = rng.choice(source.last_names)
+        address = (f"{rng.choice(source.streets)}, {rng.choice(source.cities)}, "
+                   f"{rng.choice(source.states)} {rng.choice(source.zip_codes)}")
+        phone = f"({rng.randrange(200, 1000)}) {rng.randrange(200, 1000)}-{rng.randrange(10000):04d}"
+        created_at = (f"{created_start + timedelta(days=rng.randrange(2 * 365))} "
+                      f"{rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}")
+        yield (customer_id, first_name, last_name,
+               f"{first_name.lower()}.{last_name.lower()}.{customer_id}@example.com",
+               DEFAULT_PASSWORD_HASH, phone, address, created_at)
+
+def generate_vehicles(rng, source, first_id, count, first_customer, customer_count, owners):
+    """Yield vehicle rows; owners[i] records the owner of vehicle first_id + i"""
+    created_start = date.fromisoformat(DEFAULT_START_DATE) - timedelta(days=365)
+    for vehicle_id in range(first_id, first_id + count):
+        customer_id = first_customer + rng.randrange(customer_count)
+        owners.append(customer_id)
+        make, model, year, color, mileage = rng.choice(source.vehicles)
+        # Serial suffix keeps VINs unique without a lookup
+        vin = ''.join(rng.choices(VIN_CHARS, k=9)) + f'{vehicle_id:08d}'
+        created_at = (f"{created_start + timedelta(days=rng.randrange(365))} "
+                      f"{rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}")
+        yield (vehicle_id, customer_id, make, model, year, vin, f'LP-{rng.randrange(1000000):06d}',
+               color, max(0, mileage + rng.randrange(-5000, 5001)), created_at)
+
+def bays_in_use(conn, start, days):
+    """Bays held per day and slot of the window by the appointments already booked"""
+    slots_per_day = (SHOP_CLOSE_HOUR - SHOP_OPEN_HOUR) * 60 // SLOT_MINUTES
+    in_use = array('H', bytes(2 * days * slots_per_day))
+    rows = conn.execute('''
+        SELECT julianday(a.appointment_date) - julianday(?),
+               (CAST(substr(a.appointment_time, 1, 2) AS INTEGER) * 60
+                + CAST(substr(a.appointment_time, 4, 2) AS INTEGER) - ?) / ?,
+               s.estimated_duration
+        FROM appointments a
+        JOIN services s ON a.service_id = s.id
+        WHERE a.appointment_date >= ? AND a.appointment_date < ? AND a.status != 'cancelled'
+    ''', (start.isoformat(), SHOP_OPEN_HOUR * 60, SLOT_MINUTES,
+          start.isoformat(), (start + timedelta(days=days)).isoformat()))
+    for day, slot, duration in rows:
+        day = int(day)
+        needed = max(1, -(-duration // SLOT_MINUTES))
+        for slot in range(max(0, slot), min(slots_per_day, slot + needed)):
+            in_use[day * slots_per_day + slot] += 1
+    return in_use
+
+def bays_needed(appointments, slots_needed, weights, in_use, days):
+    """Bays that hold the booked appointments plus the new ones at BAY_OCCUPANCY, at least SERVICE_BAYS
+
+    A fixed number of bays fills up at some volume, after which every extra
+    booking would have to be cancelled; sizing the shop to the volume keeps
+    the PAST_STATUSES and UPCOMING_STATUSES mix at any --scale.
+    """
+    slots_per_day = (SHOP_CLOSE_HOUR - SHOP_OPEN_HOUR) * 60 // SLOT_MINUTES
+    upcoming_share = min(UPCOMING_DAYS, days) / days
+    def holding(statuses):
+        return sum(weight for status, weight in statuses if status != 'cancelled') / sum(w for _, w in statuses)
+    held = (1 - upcoming_share) * holding(PAST_STATUSES) + upcoming_share * holding(UPCOMING_STATUSES)
+    average_slots = sum(n * w for n, w in zip(slots_needed, weights)) / sum(weights)
+    demand = sum(in_use) + appointments * held * average_slots
+    return max(SERVICE_BAYS, math.ceil(demand / (days * slots_per_day * BAY_OCCUPANCY)))
+
+def generate_appointments(rng, first_id, count, first_vehicle, owners, service_ids, weights, slots_needed,
+                          bays, in_use, start, days, turned_away):
+    """Yield appointment rows spread over the window on the shop's slot grid
+
+    Every appointment that is not cancelled holds one of the bays from its
+    start for its service's slots_needed, as the booking rules require;
+    in_use (from bays_in_use()) is updated as bays are taken. Upcoming days
+    are booked up to UPCOMING_FILL of their bay time. A booking that finds
+    no free bay in BOOKING_ATTEMPTS random slots is written as cancelled and
+    counted in turned_away[0]; with bays from bays_needed() that is rare.
+    """
+    dates = [(start + timedelta(days=offset)).isoformat() for offset in range(days)]
+    slots_per_day = (SHOP_CLOSE_HOUR - SHOP_OPEN_HOUR) * 60 // SLOT_MINUTES
+    times = [f'{minute // 60:02d}:{minute % 60:02d}'
+             for minute in range(SHOP_OPEN_HOUR * 60, SHOP_CLOSE_HOUR * 60, SLOT_MINUTES)]
+    service_pool = rng.choices(range(len(service_ids)), weights=weights, k=1000)
+    past_pool = weighted_pool(PAST_STATUSES)
+    upcoming_pool = weighted_pool(UPCOMING_STATUSES)
+    upcoming_from = max(0, days - UPCOMING_DAYS)
+    upcoming_limit = int(UPCOMING_FILL * bays * slots_per_day)
+    for appointment_id in range(first_id, first_id + count):
+        vehicle_index = rng.randrange(len(owners))
+        service = rng.choice(service_pool)
+        needed = min(slots_needed[service], slots_per_day)
+        day = rng.randrange(days)
+        slot = rng.randrange(slots_per_day - needed + 1)
+        status = rng.choice(upcoming_pool if day >= upcoming_from else past_pool)
+        if status != 'cancelled':
+            # Other days stay in the same part (past or upcoming) of the window
+            first_day, last_day = (upcoming_from, days) if day >= upcoming_from else (0, upcoming_from)
+            for attempt in range(BOOKING_ATTEMPTS):
+                if attempt:
+                    day = rng.randrange(first_day, last_day)
+                    slot = rng.randrange(slots_per_day - needed + 1)
+                first = day * slots_per_day + slot
+                if day >= upcoming_from and (
+                        sum(in_use[day * slots_per_day:(day + 1) * slots_per_day]) + needed > upcoming_limit):
+                    continue
+                if max(in_use[first:first + needed]) < bays:
+                    for index in range(first, first + needed):
+                        in_use[index] += 1
+                    break
+            else:
+                status = 'cancelled'
+                turned_away[0] += 1
+        booked = dates[max(0, day - rng.randrange(1, 31))]
+        yield (appointment_id, owners[vehicle_index], first_vehicle + vehicle_index, service_ids[service],
+               dates[day], times[slot], status,
+               f'{booked} {rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}')
+
+def refresh_appointment_summaries(conn, start, days):
+    """Rebuild the tables the appointment triggers maintain, after a trigger-less load"""
+    with conn:
+        if table_exists(conn, 'appointment_rollup'):
+            conn.execute('DELETE FROM appointment_rollup')
+            conn.execute('''
+                INSERT INTO appointment_rollup
+                SELECT appointment_date, service_id, COALESCE(status, ''),
+                       COALESCE(strftime('%H', appointment_time), ''),
+                       CAST(strftime('%w', appointment_date) AS INTEGER), COUNT(*)
+                FROM appointments
+                GROUP BY 1, 2, 3, 4
+            ''')
+        if table_exists(conn, 'customer_spend'):
+            conn.execute('DELETE FROM customer_spend')
+            conn.execute('''
+                INSERT INTO customer_spend
+                SELECT a.customer_id, COUNT(*),
+                       SUM(CASE WHEN a.status = 'completed' THEN COALESCE(CAST(ROUND(s.price * 100) AS INTEGER), 0) ELSE 0 END)
+                FROM appointments a
+                LEFT JOIN services s ON a.service_id = s.id
+                GROUP BY a.customer_id
+            ''')
+        if table_exists(conn, 'schedule_day_versions'):
+            # Bump every generated day so running workers drop cached slot bitmaps
+            conn.executemany('''
+                INSERT INTO schedule_day_versions (appointment_date, version) VALUES (?, 1)
+                ON CONFLICT(appointment_date) DO UPDATE SET version = version + 1
+            ''', [((start + timedelta(days=offset)).isoformat(),) for offset in range(days)])
+
+def record_created_events(conn, first_id):
+    """Write the 'created' events the event-log trigger would have, for a trigger-less load
+
+    The booking_activity totals take the new events in the same transaction,
+    so the analytics page does not fold them on its next view.
+    """
+    if table_exists(conn, 'appointment_events'):
+        with conn:
+            conn.execute('''
+                INSERT INTO appointment_events (appointment_id, event_type, customer_id, vehicle_id, service_id,
+                                                appointment_date, appointment_time, status, occurred_at)
+                SELECT id, 'created', customer_id, vehicle_id, service_id,
+                       appointment_date, appointment_time, status, created_at
+                FROM appointments
+                WHERE id >= ?
+                ORDER BY id
+            ''', (first_id,))
+            if table_exists(conn, 'booking_activity'):
+                fold_booking_activity(conn)
+
+def fold_booking_activity(conn):
+    """Add the events after the booking_activity cursor to the totals and advance it
+
+    The same fold as migration 13, in SQL; app.fold_booking_event() is the
+    per-event version the analytics page uses.
+    """
+    cursor = get_cursor(conn, BOOKING_ACTIVITY_CONSUMER)
+    latest = conn.execute('SELECT COALESCE(MAX(id), 0) FROM appointment_events').fetchone()[0]
+    if latest <= cursor:
+        return
+    conn.execute('''
+        UPDATE booking_activity
+        SET (bookings, reschedules, cancellations, completions, lead_days_total, lead_days_count) = (
+            SELECT bookings + COALESCE(SUM(e.event_type = 'created'), 0),
+                   reschedules + COALESCE(SUM(e.event_type = 'rescheduled'), 0),
+                   cancellations + COALESCE(SUM(e.event_type IN ('created', 'status_changed') AND e.status = 'cancelled'), 0),
+                   completions + COALESCE(SUM(e.event_type IN ('created', 'status_changed') AND e.status = 'completed'), 0),
+                   lead_days_total + COALESCE(SUM(CASE WHEN e.event_type = 'created'
+                       THEN CAST(julianday(e.appointment_date) - julianday(date(e.occurred_at)) AS INTEGER) END), 0),
+                   lead_days_count + COUNT(CASE WHEN e.event_type = 'created'
+                       THEN julianday(e.appointment_date) - julianday(date(e.occurred_at)) END)
+            FROM appointment_events e
+            WHERE e.id > ? AND e.id <= ?)
+        WHERE id = 1
+    ''', (cursor, latest))
+    save_cursor(conn, BOOKING_ACTIVITY_CONSUMER, latest)
+
+def rebuild_search_index(conn, table):
+    """Repopulate the table's full-text index, after a trigger-less load"""
+    if table_exists(conn, f'{table}_fts'):
+        with conn:
+            conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+def wipe_data(conn):
+    """Delete all customers, vehicles and appointments (services are kept)"""
+    with conn:
+        for table in ('appointments', 'vehicles', 'customers'):
+            conn.execute(f'DELETE FROM {table}')
+    print("Existing customers, vehicles and appointments wiped")
+
+def bulk_load_pragmas(conn):
+    """Trade durability for speed while generating; returns the journal mode to restore"""
+    journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA locking_mode = EXCLUSIVE')
+    conn.execute('PRAGMA cache_size = -500000')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    return journal_mode
+
+def generate(conn, customers, vehicles, appointments, seed=None, batch_size=50000,
+             start=DEFAULT_START_DATE, days=DEFAULT_DAYS,
+             customers_csv=CUSTOMERS_CSV, vehicles_csv=VEHICLES_CSV, services_csv=SERVICES_CSV):
+    """Generate the requested number of rows and return an ImportStats per table"""
+    rng = random.Random(seed)
+    source = SourceDistributions(customers_csv, vehicles_csv, services_csv)
+    start = date.fromisoformat(start)
+    results = []
+
+    services = conn.execute('SELECT id, name FROM services WHERE is_active = 1 ORDER BY id').fetchall()
+    if not services:
+        results.append(import_services(conn, services_csv, batch_size, rng, False))
+        services = conn.execute('SELECT id, name FROM services WHERE is_active = 1 ORDER BY id').fetchall()
+
+    # The indexes and triggers come back even if a load fails, and the
+    # derived tables are rebuilt from whatever rows were committed
+    stats = ImportStats('customers')
+    first_customer = next_id(conn, 'customers')
+    with deferred_indexes(conn, 'customers'), deferred_triggers(conn, 'customers'):
+        try:
+            insert_rows(conn, stats, '''
+                INSERT INTO customers (id, first_name, last_name, email, password, phone, address, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', generate_customers(rng, source, first_customer, customers), batch_size)
+        finally:
+            rebuild_search_index(conn, 'customers')
+    stats.finish()
+    results.append(stats)
+
+    owners = array('q')
+    if customers and vehicles:
+        stats = ImportStats('vehicles')
+        first_vehicle = next_id(conn, 'vehicles')
+        with deferred_indexes(conn, 'vehicles'), deferred_triggers(conn, 'vehicles'):
+            try:
+                insert_rows(conn, stats, '''
+                    INSERT INTO vehicles (id, customer_id, make, model, year, vin, license_plate, color, mileage, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', generate_vehicles(rng, source, first_vehicle, vehicles, first_customer, customers, owners),
+                    batch_size)
+            finally:
+                rebuild_search_index(conn, 'vehicles')
+        stats.finish()
+        results.append(stats)
+
+    if owners and appointments:
+        stats = ImportStats('appointments')
+        first_appointment = next_id(conn, 'appointments')
+        durations = dict(conn.execute('SELECT id, estimated_duration FROM services'))
+        service_ids = [service_id for service_id, _ in services]
+        weights = source.service_weights(services)
+        slots_needed = [max(1, -(-durations[service_id] // SLOT_MINUTES)) for service_id in service_ids]
+        in_use = bays_in_use(conn, start, days)
+        bays = bays_needed(appointments, slots_needed, weights, in_use, days)
+        turned_away = array('q', [0])
+        with deferred_indexes(conn, 'appointments'), deferred_triggers(conn, 'appointments'):
+            try:
+                insert_rows(conn, stats, '''
+                    INSERT INTO appointments (id, customer_id, vehicle_id, service_id, appointment_date, appointment_time, status, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', generate_appointments(rng, first_appointment, appointments, first_vehicle, owners,
+                                           service_ids, weights, slots_needed, bays, in_use, start, days,
+                                           turned_away), batch_size)
+            finally:
+                refresh_appointment_summaries(conn, start, days)
+                record_created_events(conn, first_appointment)
+        stats.finish()
+        results.append(stats)
+        if bays > SERVICE_BAYS:
+            print(f"appointments: booked into {bays} service bays to fit the volume; "
+                  f"run the app with SERVICE_BAYS={bays}")
+        if turned_away[0]:
+            print(f"appointments: {turned_away[0]:,} found every bay taken and were written as cancelled")
+
+    return results
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Generate a deterministic synthetic data set.')
+    parser.add_argument('--database', default=DATABASE, help=f'database file (default: {DATABASE})')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help=f'scale factor: {CUSTOMERS_PER_SCALE} customers, {VEHICLES_PER_SCALE} vehicles '
+                             f'and {APPOINTMENTS_PER_SCALE} appointments per unit (default: 1)')
+    parser.add_argument('--customers', type=int, help='number of customers (overrides --scale)')
+    parser.add_argument('--vehicles', type=int, help='number of vehicles (overrides --scale)')
+    parser.add_argument('--appointments', type=int, help='number of appointments (overrides --scale)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed (default: 42)')
+    parser.add_argument('--start', default=DEFAULT_START_DATE,
+                        help=f'first appointment date (default: {DEFAULT_START_DATE})')
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS,
+                        help=f'appointment window in days (default: {DEFAULT_DAYS})')
+    parser.add_argument('--batch-size', type=int, default=50000, help='rows per transaction (default: 50000)')
+    parser.add_argument('--replace', action='store_true',
+                        help='wipe customers, vehicles and appointments first')
+    args = parser.parse_args()
+
+    customers = args.customers if args.customers is not None else round(args.scale * CUSTOMERS_PER_SCALE)
+    vehicles = args.vehicles if args.vehicles is not None else round(args.scale * VEHICLES_PER_SCALE)
+    appointments = args.appointments if args.appointments is not None else round(args.scale * APPOINTMENTS_PER_SCALE)
+
+    if not os.path.exists(args.database):
+        print(f"Error: Database '{args.database}' not found.")
+        print("Please run setup.py first to create the database.")
+        sys.exit(1)
+
+    print("=== Automotive Service Scheduling - Synthetic Data Generator ===")
+    print(f"Database: {args.database}")
+    print(f"Generating {customers:,} customers, {vehicles:,} vehicles, {appointments:,} appointments (seed {args.seed})")
+    started = time.perf_counter()
+    conn = sqlite3.connect(args.database)
+    journal_mode = bulk_load_pragmas(conn)
+    try:
+        if args.replace:
+            wipe_data(conn)
+        for stats in generate(conn, customers, vehicles, appointments, seed=args.seed, batch_size=args.batch_size,
+                              start=args.start, days=args.days):
+            stats.report()
+        print("Analyzing...")
+        conn.execute('ANALYZE')
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Generation failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.execute(f'PRAGMA journal_mode = {journal_mode}')
+        conn.close()
+    print(f"Generation completed in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
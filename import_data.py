@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Bulk CSV importer for Automotive Service Scheduling System
+Streams the Data/ CSV files into the database in batched transactions.
+Replaces the manual sqlite3 .import steps of the load_*_from_csv.sql scripts.
+
+Usage:
+    python import_data.py [all|customers|services|vehicles] [options]
+"""
+
+import argparse
+import csv
+import hashlib
+import os
+import random
+import sqlite3
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import islice
+
+DATABASE = os.environ.get('DATABASE_PATH', 'automotive_service.db')
+
+CUSTOMERS_CSV = os.path.join('Data', 'customers_DataSet.csv')
+VEHICLES_CSV = os.path.join('Data', 'USA_cars_datasets.csv')
+SERVICES_CSV = os.path.join('Data', 'Service_Type.csv')
+
+# Password for imported customer accounts, as in the SQL scripts
+DEFAULT_PASSWORD_HASH = hashlib.sha256('123456'.encode()).hexdigest()
+
+# Vehicle years accepted by the import
+MIN_VEHICLE_YEAR = 1981
+MAX_VEHICLE_YEAR = datetime.now().year + 1
+
+# Service duration (minutes) by keyword in the repair description;
+# first match wins, same rules as load_services_from_csv.sql
+SERVICE_DURATION_RULES = [
+    (('oil', 'filter'), 30),
+    (('tire', 'wheel'), 45),
+    (('battery', 'spark'), 30),
+    (('brake',), 90),
+    (('transmission', 'engine'), 240),
+    (('suspension', 'steering'), 120),
+    (('ac', 'air'), 60),
+    (('exhaust', 'muffler'), 75),
+    (('alignment',), 60),
+    (('inspection', 'diagnostic'), 45),
+]
+
+class ImportStats:
+    """Row counts and timing for one table"""
+
+    def __init__(self, table):
+        self.table = table
+        self.read = 0
+        self.inserted = 0
+        self.rejects = Counter()
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def reject(self, reason):
+        self.rejects[reason] += 1
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def report(self):
+        rate = self.read / self.elapsed if self.elapsed else 0
+        print(f"{self.table}: {self.read} read, {self.inserted} inserted, "
+              f"{sum(self.rejects.values())} rejected in {self.elapsed:.2f}s ({rate:,.0f} rows/sec)")
+        for reason, count in self.rejects.most_common():
+            print(f"  - {reason}: {count}")
+
+def get_db_connection(db_path):
+    """Open the database configured for bulk loading"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA busy_timeout = 5000')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA cache_size = -200000')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    return conn
+
+def batched(iterable, size):
+    """Yield lists of up to size items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def title_case(value):
+    """First letter upper case, rest lower case"""
+    value = value.strip()
+    return value[:1].upper() + value[1:].lower()
+
+def random_timestamp(rng, start_year=2024, days=365):
+    """Random 'YYYY-MM-DD HH:MM:SS' within a year, like the SQL scripts"""
+    moment = datetime(start_year, 1, 1) + timedelta(
+        days=rng.randrange(days), hours=rng.randrange(24), minutes=rng.randrange(60))
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+@contextmanager
+def deferred_indexes(conn, table, defer=True):
+    """Drop the table's secondary indexes for a load and recreate them afterwards
+
+    They are recreated even if the load fails, so an aborted import never
+    leaves the table without them. Open the input before entering, so a bad
+    path fails before anything is dropped. UNIQUE constraints are kept (they
+    are automatic indexes), so duplicate emails and VINs are still rejected
+    during the load.
+    """
+    indexes = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,)
+    ).fetchall() if defer else []
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX {name}')
+    conn.commit()
+    try:
+        yield
+    finally:
+        rebuild_indexes(conn, [sql for _, sql in indexes])
+
+def load_rows(conn, stats, insert_sql, rows, batch_size):
+    """executemany() the rows in chunked transactions; duplicates are rejected"""
+    for batch in batched(rows, batch_size):
+        with conn:
+            cursor = conn.executemany(insert_sql, batch)
+        stats.inserted += cursor.rowcount
+        if cursor.rowcount < len(batch):
+            stats.rejects['duplicate'] += len(batch) - cursor.rowcount
+
+def normalize_customers(reader, stats, rng):
+    """Yield customer rows ready for insertion"""
+    for record in reader:
+        stats.read += 1
+        name = ' '.join((record.get('Name') or '').split())
+        email = (record.get('Email') or '').strip()
+        if not name:
+            stats.reject('missing name')
+            continue
+        if '@' not in email:
+            stats.reject('invalid email')
+            continue
+
+        first_name, _, last_name = name.partition(' ')
+        address = ', '.join(part for part in (
+            (record.get('Street Address') or '').strip(),
+            (record.get('City') or '').strip(),
+            f"{(record.get('State') or '').strip()} {(record.get('Zip Code') or '').strip()}".strip(),
+        ) if part)
+        yield (first_name, last_name, email, DEFAULT_PASSWORD_HASH,
+               (record.get('Phone Number') or '').strip(), address, random_timestamp(rng))
+
+def normalize_vehicles(reader, stats, rng, customer_ids):
+    """Yield vehicle rows, assigning owners round-robin over shuffled customers"""
+    for record in reader:
+        stats.read += 1
+        make = title_case(record.get('brand') or '')
+        model = title_case(record.get('model') or '')
+        vin = (record.get('vin') or '').strip()
+        try:
+            year = int(float(record.get('year') or ''))
+            mileage = int(round(float(record.get('mileage') or '')))
+        except ValueError:
+            stats.reject('invalid year or mileage')
+            continue
+        if not make or not model:
+            stats.reject('missing make or model')
+            continue
+        if not vin:
+            stats.reject('missing vin')
+            continue
+        if not MIN_VEHICLE_YEAR <= year <= MAX_VEHICLE_YEAR or mileage < 0:
+            stats.reject('year or mileage out of range')
+            continue
+
+        customer_id = customer_ids[(stats.read - 1) % len(customer_ids)]
+        license_plate = 'LP-' + (record.get('lot') or '').strip()[-6:]
+        color = title_case(record.get('color') or '') or 'Unknown'
+        yield (customer_id, make, model, year, vin, license_plate, color, mileage, random_timestamp(rng))
+
+def import_customers(conn, path, batch_size, rng, defer_indexes):
+    """Load customers from customers_DataSet.csv"""
+    stats = ImportStats('customers')
+    with open(path, newline='', encoding='utf-8') as f, deferred_indexes(conn, 'customers', defer_indexes):
+        load_rows(conn, stats, '''
+            INSERT OR IGNORE INTO customers (first_name, last_name, email, password, phone, address, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', normalize_customers(csv.DictReader(f), stats, rng), batch_size)
+    stats.finish()
+    return stats
+
+def import_services(conn, path, batch_size, rng, defer_indexes):
+    """Load one service per repair type from Service_Type.csv, priced at the average cost"""
+    stats = ImportStats('services')
+    costs = {}
+    with_parts = set()
+    with open(path, newline='', encoding='utf-8') as f:
+        for record in csv.DictReader(f):
+            stats.read += 1
+            name = (record.get('Repair Description') or '').strip()
+            try:
+                cost = float(record.get('Cost') or '')
+            except ValueError:
+                stats.reject('invalid cost')
+                continue
+            if not name or cost <= 0:
+                stats.reject('missing name or cost')
+                continue
+            total, count = costs.get(name, (0.0, 0))
+            costs[name] = (total + cost, count + 1)
+            if (record.get('Parts Replaced') or '').strip():
+                with_parts.add(name)
+
+    existing = {row[0] for row in conn.execute('SELECT name FROM services')}
+    rows = []
+    for name, (total, count) in sorted(costs.items()):
+        if name in existing:
+            stats.reject('duplicate')
+            continue
+        price = round(total / count, 2)
+        if name in with_parts:
+            description = f'Professional {name} service including parts replacement. Quality parts and expert workmanship guaranteed.'
+        else:
+            description = f'Professional {name} service with thorough inspection and quality workmanship. All work comes with warranty.'
+        rows.append((name, description, estimate_duration(name, price), price))
+
+    load_rows(conn, stats, '''
+        INSERT INTO services (name, description, estimated_duration, price, is_active)
+        VALUES (?, ?, ?, ?, 1)
+    ''', rows, batch_size)
+    stats.finish()
+    return stats
+
+def estimate_duration(name, price):
+    """Estimated duration in minutes from the service name, else from its price"""
+    lowered = name.lower()
+    for keywords, minutes in SERVICE_DURATION_RULES:
+        if any(keyword in lowered for keyword in keywords):
+            return minutes
+    if price < 100:
+        return 30
+    if price <= 500:
+        return 60
+    if price <= 1000:
+        return 90
+    if price <= 2000:
+        return 150
+    return 180
+
+def import_vehicles(conn, path, batch_size, rng, defer_indexes):
+    """Load vehicles from USA_cars_datasets.csv and assign them to customers"""
+    stats = ImportStats('vehicles')
+    customer_ids = [row[0] for row in conn.execute('SELECT id FROM customers')]
+    if not customer_ids:
+        print("vehicles: skipped, load customers first")
+        stats.finish()
+        return stats
+    rng.shuffle(customer_ids)
+
+    with open(path, newline='', encoding='utf-8') as f, deferred_indexes(conn, 'vehicles', defer_indexes):
+        load_rows(conn, stats, '''
+            INSERT OR IGNORE INTO vehicles (customer_id, make, model, year, vin, license_plate, color, mileage, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', normalize_vehicles(csv.DictReader(f), stats, rng, customer_ids), batch_size)
+    stats.finish()
+    return stats
+
+def rebuild_indexes(conn, index_sql):
+    """Recreate indexes dropped by deferred_indexes()"""
+    for sql in index_sql:
+        conn.execute(sql)
+    conn.commit()
+
+def wipe_data(conn):
+    """Delete all customers, vehicles, services and appointments"""
+    with conn:
+        for table in ('appointments', 'vehicles', 'services', 'customers'):
+            conn.execute(f'DELETE FROM {table}')
+        conn.execute("DELETE FROM sqlite_sequence WHERE name IN ('customers', 'services', 'vehicles', 'appointments')")
+    print("All data wiped")
+
+IMPORTERS = {
+    'customers': (import_customers, 'customers_csv'),
+    'services': (import_services, 'services_csv'),
+    'vehicles': (import_vehicles, 'vehicles_csv'),
+}
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Bulk import the Data/ CSV files into the database.')
+    parser.add_argument('tables', nargs='*', metavar='table',
+                        help='all, customers, services or vehicles (default: all, in dependency order)')
+    parser.add_argument('--database', default=DATABASE, help=f'database file (default: {DATABASE})')
+    parser.add_argument('--customers-csv', default=CUSTOMERS_CSV)
+    parser.add_argument('--vehicles-csv', default=VEHICLES_CSV)
+    parser.add_argument('--services-csv', default=SERVICES_CSV)
+    parser.add_argument('--batch-size', type=int, default=10000, help='rows per transaction (default: 10000)')
+    parser.add_argument('--seed', type=int, default=None, help='random seed for owners and timestamps')
+    parser.add_argument('--keep-indexes', action='store_true',
+                        help='maintain indexes during the load instead of rebuilding them at the end')
+    parser.add_argument('--replace', action='store_true',
+                        help='wipe customers, vehicles, services and appointments first')
+    args = parser.parse_args()
+    invalid = set(args.tables) - {'all'} - set(IMPORTERS)
+    if invalid:
+        parser.error(f"invalid table(s): {', '.join(sorted(invalid))}")
+
+    if not os.path.exists(args.database):
+        print(f"Error: Database '{args.database}' not found.")
+        print("Please run setup.py first to create the database.")
+        sys.exit(1)
+
+    tables = args.tables if args.tables and 'all' not in args.tables else list(IMPORTERS)
+    for table in tables:
+        path = getattr(args, IMPORTERS[table][1])
+        if not os.path.isfile(path):
+            print(f"Error: {table} CSV '{path}' not found.")
+            sys.exit(1)
+    rng = random.Random(args.seed)
+    conn = get_db_connection(args.database)
+
+    print("=== Automotive Service Scheduling - Bulk Import ===")
+    print(f"Database: {args.database}")
+    started = time.perf_counter()
+    try:
+        if args.replace:
+            wipe_data(conn)
+        for table in ['customers', 'services', 'vehicles']:
+            if table not in tables:
+                continue
+            importer, path_option = IMPORTERS[table]
+            stats = importer(conn, getattr(args, path_option), args.batch_size, rng, not args.keep_indexes)
+            stats.report()
+        conn.execute('PRAGMA optimize')
+    except (OSError, sqlite3.Error) as e:
+        print(f"Import failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+    print(f"Import completed in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
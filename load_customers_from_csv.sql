@@ -1,3 +1,4 @@
+-- Superseded by import_data.py (python import_data.py --help); kept for reference.
 -- Description: Load customer data from customers_DataSet.csv 
 
 PRAGMA foreign_keys = ON;
@@ -1,3 +1,4 @@
+-- Superseded by import_data.py (python import_data.py --help); kept for reference.
 -- Description: Load service data from Service_Type.csv
 
 PRAGMA foreign_keys = ON;
@@ -1,3 +1,4 @@
+-- Superseded by import_data.py (python import_data.py --help); kept for reference.
 -- Create temporary table to match CSV structure
 CREATE TEMPORARY TABLE temp_vehicles_csv (
     "?" TEXT,          
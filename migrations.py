@@ -0,0 +1,638 @@
+#!/usr/bin/env python3
+"""
+Schema migrations for Automotive Service Scheduling System
+Brings any database - new, created by setup.py, or an older production copy -
+up to the current schema. Applied versions are recorded in schema_version.
+
+Usage:
+    python migrations.py [status|upgrade] [--database PATH]
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+from contextlib import contextmanager
+
+DATABASE = os.environ.get('DATABASE_PATH', 'automotive_service.db')
+
+# Customer and vehicle references without an ON DELETE action yet
+CASCADE_REFERENCE = re.compile(
+    r'REFERENCES\s+"?(customers|vehicles)"?\s*\(\s*"?id"?\s*\)(?!\s*ON\s+DELETE)', re.IGNORECASE)
+
+def add_delete_cascade(conn):
+    """Make vehicles and appointments follow their customer/vehicle on delete
+
+    Changing a foreign key action leaves the stored rows as they are, so the
+    CREATE TABLE text is rewritten in place (the procedure the SQLite ALTER
+    TABLE documentation gives for such changes) instead of copying both
+    tables and recreating every index and trigger on them.
+    """
+    changed = []
+    for name, sql in conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name IN ('vehicles', 'appointments')"
+    ).fetchall():
+        new_sql = CASCADE_REFERENCE.sub(r'\g<0> ON DELETE CASCADE', sql)
+        if new_sql != sql:
+            changed.append((new_sql, name))
+    if not changed:
+        return
+    schema_version = conn.execute('PRAGMA schema_version').fetchone()[0]
+    conn.execute('PRAGMA writable_schema = ON')
+    try:
+        conn.executemany("UPDATE sqlite_master SET sql = ? WHERE type = 'table' AND name = ?", changed)
+    finally:
+        conn.execute('PRAGMA writable_schema = OFF')
+    # Makes every connection re-read the schema
+    conn.execute(f'PRAGMA schema_version = {schema_version + 1}')
+
+# Ordered migration steps: (version, description, statements).
+# Never edit a released step; add a new one. Statements are written to be
+# idempotent so databases that already have some of the objects (older
+# setup.py / database_scripts.sql runs) migrate cleanly. A statement can
+# also be a function taking the connection, for changes plain SQL cannot
+# express.
+MIGRATIONS = [
+    (1, 'Core tables and the original setup.py indexes', [
+        '''CREATE TABLE IF NOT EXISTS customers (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               first_name TEXT NOT NULL,
+               last_name TEXT NOT NULL,
+               email TEXT UNIQUE NOT NULL,
+               password TEXT NOT NULL,
+               phone TEXT NOT NULL,
+               address TEXT,
+               created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+           )''',
+        '''CREATE TABLE IF NOT EXISTS vehicles (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               customer_id INTEGER NOT NULL,
+               make TEXT NOT NULL,
+               model TEXT NOT NULL,
+               year INTEGER NOT NULL,
+               vin TEXT UNIQUE,
+               license_plate TEXT,
+               color TEXT,
+               mileage INTEGER,
+               created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               FOREIGN KEY (customer_id) REFERENCES customers (id)
+           )''',
+        '''CREATE TABLE IF NOT EXISTS services (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               name TEXT NOT NULL,
+               description TEXT,
+               estimated_duration INTEGER NOT NULL,
+               price DECIMAL(10,2) NOT NULL,
+               is_active BOOLEAN DEFAULT 1
+           )''',
+        '''CREATE TABLE IF NOT EXISTS appointments (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               customer_id INTEGER NOT NULL,
+               vehicle_id INTEGER NOT NULL,
+               service_id INTEGER NOT NULL,
+               appointment_date DATE NOT NULL,
+               appointment_time TIME NOT NULL,
+               status TEXT DEFAULT 'scheduled',
+               notes TEXT,
+               created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               FOREIGN KEY (customer_id) REFERENCES customers (id),
+               FOREIGN KEY (vehicle_id) REFERENCES vehicles (id),
+               FOREIGN KEY (service_id) REFERENCES services (id)
+           )''',
+        'CREATE INDEX IF NOT EXISTS idx_customers_email ON customers(email)',
+        'CREATE INDEX IF NOT EXISTS idx_customers_name ON customers(last_name, first_name)',
+        'CREATE INDEX IF NOT EXISTS idx_vehicles_customer ON vehicles(customer_id)',
+        'CREATE INDEX IF NOT EXISTS idx_appointments_customer ON appointments(customer_id)',
+        'CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments(appointment_date)',
+    ]),
+    (2, 'Remaining database_scripts.sql indexes', [
+        'CREATE INDEX IF NOT EXISTS idx_vehicles_vin ON vehicles(vin)',
+        'CREATE INDEX IF NOT EXISTS idx_appointments_vehicle ON appointments(vehicle_id)',
+        'CREATE INDEX IF NOT EXISTS idx_appointments_service ON appointments(service_id)',
+        'CREATE INDEX IF NOT EXISTS idx_appointments_status ON appointments(status)',
+    ]),
+    (3, 'Slot index and per-day schedule versions for the scheduling engine', [
+        # Interval lookups for the slot conflict engine (date + start time range)
+        '''CREATE INDEX IF NOT EXISTS idx_appointments_slot
+           ON appointments(appointment_date, appointment_time, status, service_id)''',
+        # Per-day change counter so every worker can tell when its cached slot
+        # bitmaps for a day are stale; each statement bumps each affected day once
+        '''CREATE TABLE IF NOT EXISTS schedule_day_versions (
+               appointment_date DATE PRIMARY KEY,
+               version INTEGER NOT NULL
+           ) WITHOUT ROWID''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_schedule_version_insert
+           AFTER INSERT ON appointments
+           BEGIN
+               INSERT INTO schedule_day_versions (appointment_date, version) VALUES (NEW.appointment_date, 1)
+               ON CONFLICT(appointment_date) DO UPDATE SET version = version + 1;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_schedule_version_update
+           AFTER UPDATE OF appointment_date, appointment_time, status, service_id ON appointments
+           BEGIN
+               INSERT INTO schedule_day_versions (appointment_date, version) VALUES (OLD.appointment_date, 1)
+               ON CONFLICT(appointment_date) DO UPDATE SET version = version + 1;
+               INSERT INTO schedule_day_versions (appointment_date, version)
+               SELECT NEW.appointment_date, 1 WHERE NEW.appointment_date IS NOT OLD.appointment_date
+               ON CONFLICT(appointment_date) DO UPDATE SET version = version + 1;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_schedule_version_delete
+           AFTER DELETE ON appointments
+           BEGIN
+               INSERT INTO schedule_day_versions (appointment_date, version) VALUES (OLD.appointment_date, 1)
+               ON CONFLICT(appointment_date) DO UPDATE SET version = version + 1;
+           END''',
+    ]),
+    (4, 'Indexes for keyset pagination of the admin lists', [
+        # Keyset pagination of the admin lists: every sort order is an index walk
+        # and the per-row counts are indexed lookups
+        '''CREATE INDEX IF NOT EXISTS idx_appointments_customer_date
+           ON appointments(customer_id, appointment_date, appointment_time)''',
+        'CREATE INDEX IF NOT EXISTS idx_appointments_date_time ON appointments(appointment_date, appointment_time)',
+        'CREATE INDEX IF NOT EXISTS idx_appointments_created ON appointments(created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_customers_created ON customers(created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_vehicles_make_model ON vehicles(make, model)',
+    ]),
+    (5, 'Appointment rollup for the admin charts', [
+        # Pre-aggregated appointment counts (day x service x status x hour) for the
+        # admin charts. Revenue is count x current service price, as in the
+        # original queries, so price changes need no rollup maintenance.
+        '''CREATE TABLE IF NOT EXISTS appointment_rollup (
+               appointment_date DATE NOT NULL,
+               service_id INTEGER NOT NULL,
+               status TEXT NOT NULL,
+               hour TEXT NOT NULL,
+               weekday INTEGER,
+               appointment_count INTEGER NOT NULL,
+               PRIMARY KEY (appointment_date, service_id, status, hour)
+           ) WITHOUT ROWID''',
+        # Backfill once for databases that pre-date the rollup
+        '''INSERT INTO appointment_rollup
+           SELECT appointment_date, service_id, COALESCE(status, ''),
+                  COALESCE(strftime('%H', appointment_time), ''),
+                  CAST(strftime('%w', appointment_date) AS INTEGER), COUNT(*)
+           FROM appointments
+           WHERE NOT EXISTS (SELECT 1 FROM appointment_rollup)
+           GROUP BY 1, 2, 3, 4''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_rollup_insert
+           AFTER INSERT ON appointments
+           BEGIN
+               INSERT INTO appointment_rollup VALUES (
+                   NEW.appointment_date, NEW.service_id, COALESCE(NEW.status, ''),
+                   COALESCE(strftime('%H', NEW.appointment_time), ''),
+                   CAST(strftime('%w', NEW.appointment_date) AS INTEGER), 1)
+               ON CONFLICT(appointment_date, service_id, status, hour) DO UPDATE SET appointment_count = appointment_count + 1;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_rollup_update
+           AFTER UPDATE OF appointment_date, appointment_time, status, service_id ON appointments
+           BEGIN
+               UPDATE appointment_rollup SET appointment_count = appointment_count - 1
+               WHERE appointment_date = OLD.appointment_date AND service_id = OLD.service_id
+                 AND status = COALESCE(OLD.status, '') AND hour = COALESCE(strftime('%H', OLD.appointment_time), '');
+               INSERT INTO appointment_rollup VALUES (
+                   NEW.appointment_date, NEW.service_id, COALESCE(NEW.status, ''),
+                   COALESCE(strftime('%H', NEW.appointment_time), ''),
+                   CAST(strftime('%w', NEW.appointment_date) AS INTEGER), 1)
+               ON CONFLICT(appointment_date, service_id, status, hour) DO UPDATE SET appointment_count = appointment_count + 1;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_rollup_delete
+           AFTER DELETE ON appointments
+           BEGIN
+               UPDATE appointment_rollup SET appointment_count = appointment_count - 1
+               WHERE appointment_date = OLD.appointment_date AND service_id = OLD.service_id
+                 AND status = COALESCE(OLD.status, '') AND hour = COALESCE(strftime('%H', OLD.appointment_time), '');
+           END''',
+    ]),
+    (6, 'Drop indexes duplicated by a UNIQUE constraint or a longer composite index', [
+        'DROP INDEX IF EXISTS idx_customers_email',        # UNIQUE(email)
+        'DROP INDEX IF EXISTS idx_vehicles_vin',           # UNIQUE(vin)
+        'DROP INDEX IF EXISTS idx_appointments_customer',  # idx_appointments_customer_date
+        'DROP INDEX IF EXISTS idx_appointments_date',      # idx_appointments_date_time
+    ]),
+    (7, 'Change counter for the services table (service catalog cache)', [
+        # Bumped by every statement that changes services, so workers can
+        # tell when their cached catalog is stale
+        '''CREATE TABLE IF NOT EXISTS table_versions (
+               name TEXT PRIMARY KEY,
+               version INTEGER NOT NULL
+           ) WITHOUT ROWID''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_services_version_insert
+           AFTER INSERT ON services
+           BEGIN
+               INSERT INTO table_versions (name, version) VALUES ('services', 1)
+               ON CONFLICT(name) DO UPDATE SET version = version + 1;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_services_version_update
+           AFTER UPDATE ON services
+           BEGIN
+               INSERT INTO table_versions (name, version) VALUES ('services', 1)
+               ON CONFLICT(name) DO UPDATE SET version = version + 1;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_services_version_delete
+           AFTER DELETE ON services
+           BEGIN
+               INSERT INTO table_versions (name, version) VALUES ('services', 1)
+               ON CONFLICT(name) DO UPDATE SET version = version + 1;
+           END''',
+    ]),
+    (8, 'Full-text search over customers and vehicles for the admin search', [
+        # External-content FTS5 indexes: the text lives in the base tables and
+        # the triggers keep the index in step with every insert, update and
+        # delete. prefix='2 3' makes short prefix queries index lookups.
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(
+               first_name, last_name, email, phone, address,
+               content='customers', content_rowid='id', prefix='2 3'
+           )''',
+        "INSERT INTO customers_fts (customers_fts) VALUES ('rebuild')",
+        '''CREATE TRIGGER IF NOT EXISTS trg_customers_fts_insert
+           AFTER INSERT ON customers
+           BEGIN
+               INSERT INTO customers_fts (rowid, first_name, last_name, email, phone, address)
+               VALUES (NEW.id, NEW.first_name, NEW.last_name, NEW.email, NEW.phone, NEW.address);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_customers_fts_update
+           AFTER UPDATE OF first_name, last_name, email, phone, address ON customers
+           BEGIN
+               INSERT INTO customers_fts (customers_fts, rowid, first_name, last_name, email, phone, address)
+               VALUES ('delete', OLD.id, OLD.first_name, OLD.last_name, OLD.email, OLD.phone, OLD.address);
+               INSERT INTO customers_fts (rowid, first_name, last_name, email, phone, address)
+               VALUES (NEW.id, NEW.first_name, NEW.last_name, NEW.email, NEW.phone, NEW.address);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_customers_fts_delete
+           AFTER DELETE ON customers
+           BEGIN
+               INSERT INTO customers_fts (customers_fts, rowid, first_name, last_name, email, phone, address)
+               VALUES ('delete', OLD.id, OLD.first_name, OLD.last_name, OLD.email, OLD.phone, OLD.address);
+           END''',
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS vehicles_fts USING fts5(
+               make, model, vin, license_plate,
+               content='vehicles', content_rowid='id', prefix='2 3'
+           )''',
+        "INSERT INTO vehicles_fts (vehicles_fts) VALUES ('rebuild')",
+        '''CREATE TRIGGER IF NOT EXISTS trg_vehicles_fts_insert
+           AFTER INSERT ON vehicles
+           BEGIN
+               INSERT INTO vehicles_fts (rowid, make, model, vin, license_plate)
+               VALUES (NEW.id, NEW.make, NEW.model, NEW.vin, NEW.license_plate);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_vehicles_fts_update
+           AFTER UPDATE OF make, model, vin, license_plate ON vehicles
+           BEGIN
+               INSERT INTO vehicles_fts (vehicles_fts, rowid, make, model, vin, license_plate)
+               VALUES ('delete', OLD.id, OLD.make, OLD.model, OLD.vin, OLD.license_plate);
+               INSERT INTO vehicles_fts (rowid, make, model, vin, license_plate)
+               VALUES (NEW.id, NEW.make, NEW.model, NEW.vin, NEW.license_plate);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_vehicles_fts_delete
+           AFTER DELETE ON vehicles
+           BEGIN
+               INSERT INTO vehicles_fts (vehicles_fts, rowid, make, model, vin, license_plate)
+               VALUES ('delete', OLD.id, OLD.make, OLD.model, OLD.vin, OLD.license_plate);
+           END''',
+    ]),
+    (9, 'ON DELETE CASCADE for customer and vehicle references, archive tables', [
+        add_delete_cascade,
+        '''CREATE TABLE IF NOT EXISTS archived_customers (
+               id INTEGER PRIMARY KEY,
+               first_name TEXT,
+               last_name TEXT,
+               email TEXT,
+               phone TEXT,
+               address TEXT,
+               created_at TIMESTAMP,
+               archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+           )''',
+        '''CREATE TABLE IF NOT EXISTS archived_vehicles (
+               id INTEGER PRIMARY KEY,
+               customer_id INTEGER,
+               make TEXT,
+               model TEXT,
+               year INTEGER,
+               vin TEXT,
+               license_plate TEXT,
+               color TEXT,
+               mileage INTEGER,
+               created_at TIMESTAMP,
+               archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+           )''',
+        '''CREATE TABLE IF NOT EXISTS archived_appointments (
+               id INTEGER PRIMARY KEY,
+               customer_id INTEGER,
+               vehicle_id INTEGER,
+               service_id INTEGER,
+               appointment_date DATE,
+               appointment_time TIME,
+               status TEXT,
+               notes TEXT,
+               created_at TIMESTAMP,
+               archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+           )''',
+        'CREATE INDEX IF NOT EXISTS idx_archived_vehicles_customer ON archived_vehicles(customer_id)',
+        'CREATE INDEX IF NOT EXISTS idx_archived_appointments_customer ON archived_appointments(customer_id)',
+    ]),
+    (10, 'Append-only appointment event log and consumer cursors', [
+        # One row per change to an appointment, written by triggers. Rows are
+        # never updated or deleted, so consumers can read "everything after
+        # event N" and fold only what is new.
+        '''CREATE TABLE IF NOT EXISTS appointment_events (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               appointment_id INTEGER NOT NULL,
+               event_type TEXT NOT NULL,
+               customer_id INTEGER,
+               vehicle_id INTEGER,
+               service_id INTEGER,
+               appointment_date DATE,
+               appointment_time TIME,
+               status TEXT,
+               previous_date DATE,
+               previous_time TIME,
+               previous_status TEXT,
+               occurred_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+           )''',
+        'CREATE INDEX IF NOT EXISTS idx_appointment_events_appointment ON appointment_events(appointment_id)',
+        # Existing appointments start their history with a 'created' event
+        '''INSERT INTO appointment_events (appointment_id, event_type, customer_id, vehicle_id, service_id,
+                                           appointment_date, appointment_time, status, occurred_at)
+           SELECT id, 'created', customer_id, vehicle_id, service_id,
+                  appointment_date, appointment_time, status, COALESCE(created_at, CURRENT_TIMESTAMP)
+           FROM appointments
+           WHERE NOT EXISTS (SELECT 1 FROM appointment_events)
+           ORDER BY id''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_appointment_events_insert
+           AFTER INSERT ON appointments
+           BEGIN
+               INSERT INTO appointment_events (appointment_id, event_type, customer_id, vehicle_id, service_id,
+                                               appointment_date, appointment_time, status)
+               VALUES (NEW.id, 'created', NEW.customer_id, NEW.vehicle_id, NEW.service_id,
+                       NEW.appointment_date, NEW.appointment_time, NEW.status);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_appointment_events_reschedule
+           AFTER UPDATE OF appointment_date, appointment_time ON appointments
+           WHEN OLD.appointment_date IS NOT NEW.appointment_date
+             OR OLD.appointment_time IS NOT NEW.appointment_time
+           BEGIN
+               INSERT INTO appointment_events (appointment_id, event_type, customer_id, vehicle_id, service_id,
+                                               appointment_date, appointment_time, status,
+                                               previous_date, previous_time)
+               VALUES (NEW.id, 'rescheduled', NEW.customer_id, NEW.vehicle_id, NEW.service_id,
+                       NEW.appointment_date, NEW.appointment_time, NEW.status,
+                       OLD.appointment_date, OLD.appointment_time);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_appointment_events_status
+           AFTER UPDATE OF status ON appointments
+           WHEN OLD.status IS NOT NEW.status
+           BEGIN
+               INSERT INTO appointment_events (appointment_id, event_type, customer_id, vehicle_id, service_id,
+                                               appointment_date, appointment_time, status, previous_status)
+               VALUES (NEW.id, 'status_changed', NEW.customer_id, NEW.vehicle_id, NEW.service_id,
+                       NEW.appointment_date, NEW.appointment_time, NEW.status, OLD.status);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_appointment_events_update
+           AFTER UPDATE OF customer_id, vehicle_id, service_id ON appointments
+           WHEN OLD.customer_id IS NOT NEW.customer_id
+             OR OLD.vehicle_id IS NOT NEW.vehicle_id
+             OR OLD.service_id IS NOT NEW.service_id
+           BEGIN
+               INSERT INTO appointment_events (appointment_id, event_type, customer_id, vehicle_id, service_id,
+                                               appointment_date, appointment_time, status)
+               VALUES (NEW.id, 'updated', NEW.customer_id, NEW.vehicle_id, NEW.service_id,
+                       NEW.appointment_date, NEW.appointment_time, NEW.status);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_appointment_events_delete
+           AFTER DELETE ON appointments
+           BEGIN
+               INSERT INTO appointment_events (appointment_id, event_type, customer_id, vehicle_id, service_id,
+                                               appointment_date, appointment_time, status)
+               VALUES (OLD.id, 'deleted', OLD.customer_id, OLD.vehicle_id, OLD.service_id,
+                       OLD.appointment_date, OLD.appointment_time, OLD.status);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_appointment_events_no_update
+           BEFORE UPDATE ON appointment_events
+           BEGIN
+               SELECT RAISE(ABORT, 'appointment_events is append-only');
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_appointment_events_no_delete
+           BEFORE DELETE ON appointment_events
+           BEGIN
+               SELECT RAISE(ABORT, 'appointment_events is append-only');
+           END''',
+        # Last event id each named consumer has processed
+        '''CREATE TABLE IF NOT EXISTS event_consumers (
+               name TEXT PRIMARY KEY,
+               last_event_id INTEGER NOT NULL DEFAULT 0,
+               updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+           ) WITHOUT ROWID''',
+    ]),
+    (11, 'Drop idx_appointments_date_time, a prefix of idx_appointments_slot', [
+        # Created by step 4; its columns lead idx_appointments_slot
+        'DROP INDEX IF EXISTS idx_appointments_date_time',
+    ]),
+    (12, 'Per-customer spend rollup for the top customers chart', [
+        # Appointment count and completed spend per customer, in cents so that
+        # adding and removing the same price nets out to exactly zero
+        '''CREATE TABLE IF NOT EXISTS customer_spend (
+               customer_id INTEGER PRIMARY KEY,
+               appointment_count INTEGER NOT NULL,
+               spent_cents INTEGER NOT NULL
+           )''',
+        '''INSERT INTO customer_spend
+           SELECT a.customer_id, COUNT(*),
+                  SUM(CASE WHEN a.status = 'completed' THEN COALESCE(CAST(ROUND(s.price * 100) AS INTEGER), 0) ELSE 0 END)
+           FROM appointments a
+           LEFT JOIN services s ON a.service_id = s.id
+           WHERE NOT EXISTS (SELECT 1 FROM customer_spend)
+           GROUP BY a.customer_id''',
+        'CREATE INDEX IF NOT EXISTS idx_customer_spend_spent ON customer_spend(spent_cents)',
+        # Kept in the step 5 rollup triggers, which are recreated with the
+        # customer_spend statements added and customer_id in the update columns
+        'DROP TRIGGER IF EXISTS trg_rollup_insert',
+        'DROP TRIGGER IF EXISTS trg_rollup_update',
+        'DROP TRIGGER IF EXISTS trg_rollup_delete',
+        '''CREATE TRIGGER trg_rollup_insert
+           AFTER INSERT ON appointments
+           BEGIN
+               INSERT INTO appointment_rollup VALUES (
+                   NEW.appointment_date, NEW.service_id, COALESCE(NEW.status, ''),
+                   COALESCE(strftime('%H', NEW.appointment_time), ''),
+                   CAST(strftime('%w', NEW.appointment_date) AS INTEGER), 1)
+               ON CONFLICT(appointment_date, service_id, status, hour) DO UPDATE SET appointment_count = appointment_count + 1;
+               INSERT INTO customer_spend VALUES (
+                   NEW.customer_id, 1,
+                   CASE WHEN NEW.status = 'completed'
+                        THEN COALESCE((SELECT CAST(ROUND(price * 100) AS INTEGER) FROM services WHERE id = NEW.service_id), 0)
+                        ELSE 0 END)
+               ON CONFLICT(customer_id) DO UPDATE SET appointment_count = appointment_count + 1,
+                                                      spent_cents = spent_cents + excluded.spent_cents;
+           END''',
+        '''CREATE TRIGGER trg_rollup_update
+           AFTER UPDATE OF appointment_date, appointment_time, status, service_id, customer_id ON appointments
+           BEGIN
+               UPDATE appointment_rollup SET appointment_count = appointment_count - 1
+               WHERE appointment_date = OLD.appointment_date AND service_id = OLD.service_id
+                 AND status = COALESCE(OLD.status, '') AND hour = COALESCE(strftime('%H', OLD.appointment_time), '');
+               INSERT INTO appointment_rollup VALUES (
+                   NEW.appointment_date, NEW.service_id, COALESCE(NEW.status, ''),
+                   COALESCE(strftime('%H', NEW.appointment_time), ''),
+                   CAST(strftime('%w', NEW.appointment_date) AS INTEGER), 1)
+               ON CONFLICT(appointment_date, service_id, status, hour) DO UPDATE SET appointment_count = appointment_count + 1;
+               UPDATE customer_spend SET
+                   appointment_count = appointment_count - 1,
+                   spent_cents = spent_cents - CASE WHEN OLD.status = 'completed'
+                       THEN COALESCE((SELECT CAST(ROUND(price * 100) AS INTEGER) FROM services WHERE id = OLD.service_id), 0)
+                       ELSE 0 END
+               WHERE customer_id = OLD.customer_id;
+               INSERT INTO customer_spend VALUES (
+                   NEW.customer_id, 1,
+                   CASE WHEN NEW.status = 'completed'
+                        THEN COALESCE((SELECT CAST(ROUND(price * 100) AS INTEGER) FROM services WHERE id = NEW.service_id), 0)
+                        ELSE 0 END)
+               ON CONFLICT(customer_id) DO UPDATE SET appointment_count = appointment_count + 1,
+                                                      spent_cents = spent_cents + excluded.spent_cents;
+           END''',
+        '''CREATE TRIGGER trg_rollup_delete
+           AFTER DELETE ON appointments
+           BEGIN
+               UPDATE appointment_rollup SET appointment_count = appointment_count - 1
+               WHERE appointment_date = OLD.appointment_date AND service_id = OLD.service_id
+                 AND status = COALESCE(OLD.status, '') AND hour = COALESCE(strftime('%H', OLD.appointment_time), '');
+               UPDATE customer_spend SET
+                   appointment_count = appointment_count - 1,
+                   spent_cents = spent_cents - CASE WHEN OLD.status = 'completed'
+                       THEN COALESCE((SELECT CAST(ROUND(price * 100) AS INTEGER) FROM services WHERE id = OLD.service_id), 0)
+                       ELSE 0 END
+               WHERE customer_id = OLD.customer_id;
+           END''',
+        # Spend follows the current price, like the revenue read from appointment_rollup
+        '''CREATE TRIGGER IF NOT EXISTS trg_customer_spend_price
+           AFTER UPDATE OF price ON services
+           WHEN OLD.price IS NOT NEW.price
+           BEGIN
+               UPDATE customer_spend SET spent_cents = spent_cents
+                   + (SELECT COUNT(*) FROM appointments a
+                      WHERE a.customer_id = customer_spend.customer_id AND a.service_id = NEW.id AND a.status = 'completed')
+                   * (COALESCE(CAST(ROUND(NEW.price * 100) AS INTEGER), 0) - COALESCE(CAST(ROUND(OLD.price * 100) AS INTEGER), 0))
+               WHERE customer_id IN (SELECT customer_id FROM appointments WHERE service_id = NEW.id AND status = 'completed');
+           END''',
+    ]),
+    (13, 'Booking activity totals, advanced by the booking_activity event consumer', [
+        # One row, folded from appointment_events by app.get_booking_activity()
+        '''CREATE TABLE IF NOT EXISTS booking_activity (
+               id INTEGER PRIMARY KEY CHECK (id = 1),
+               bookings INTEGER NOT NULL,
+               reschedules INTEGER NOT NULL,
+               cancellations INTEGER NOT NULL,
+               completions INTEGER NOT NULL,
+               lead_days_total INTEGER NOT NULL,
+               lead_days_count INTEGER NOT NULL
+           )''',
+        # Fold the existing log here, in one pass, and start the consumer after it.
+        # An appointment booked as cancelled or completed counts from its 'created' event.
+        '''INSERT INTO booking_activity
+           SELECT 1,
+                  COALESCE(SUM(event_type = 'created'), 0),
+                  COALESCE(SUM(event_type = 'rescheduled'), 0),
+                  COALESCE(SUM(event_type IN ('created', 'status_changed') AND status = 'cancelled'), 0),
+                  COALESCE(SUM(event_type IN ('created', 'status_changed') AND status = 'completed'), 0),
+                  COALESCE(SUM(CASE WHEN event_type = 'created'
+                                    THEN CAST(julianday(appointment_date) - julianday(date(occurred_at)) AS INTEGER) END), 0),
+                  COUNT(CASE WHEN event_type = 'created'
+                             THEN julianday(appointment_date) - julianday(date(occurred_at)) END)
+           FROM appointment_events
+           WHERE NOT EXISTS (SELECT 1 FROM booking_activity)''',
+        '''INSERT OR IGNORE INTO event_consumers (name, last_event_id)
+           SELECT 'booking_activity', COALESCE(MAX(id), 0) FROM appointment_events''',
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+@contextmanager
+def immediate_transaction(conn):
+    """Default transaction for migrate(): take the write lock up front"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+def current_version(conn):
+    """Highest applied migration version (0 for an unversioned database)"""
+    try:
+        return conn.execute('SELECT MAX(version) FROM schema_version').fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        return 0
+
+def migrate(conn, transaction=immediate_transaction, target=LATEST_VERSION):
+    """Apply pending migrations up to target; returns the versions applied
+
+    Each step runs in its own transaction together with its schema_version
+    row, so a failed step leaves the database at the previous version.
+    The version is re-read under the write lock, so workers starting at the
+    same time apply each step exactly once.
+    """
+    if current_version(conn) >= target:
+        return []
+
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version > target:
+            break
+        with transaction(conn):
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            if version <= current_version(conn):
+                continue
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                         (version, description))
+        applied.append(version)
+    return applied
+
+def show_status(conn):
+    """Print applied and pending migrations"""
+    version = current_version(conn)
+    applied_at = {}
+    if version:
+        applied_at = dict(conn.execute('SELECT version, applied_at FROM schema_version').fetchall())
+    print(f"Schema version: {version} (latest: {LATEST_VERSION})")
+    for number, description, _ in MIGRATIONS:
+        state = f"applied {applied_at[number]}" if number in applied_at else 'pending'
+        print(f"  {number:>3}  {description:<75} {state}")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Apply or inspect schema migrations.')
+    parser.add_argument('command', nargs='?', default='upgrade', choices=['upgrade', 'status'])
+    parser.add_argument('--database', default=DATABASE, help=f'database file (default: {DATABASE})')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    conn.execute('PRAGMA busy_timeout = 5000')
+    try:
+        if args.command == 'status':
+            show_status(conn)
+            return
+        applied = migrate(conn)
+        if applied:
+            print(f"Applied migrations: {', '.join(map(str, applied))}")
+        print(f"Schema version: {current_version(conn)}")
+    except sqlite3.Error as e:
+        print(f"Migration failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+-- Superseded by import_data.py (python import_data.py --help); kept for reference.
 -- Description: Wipe existing data and reload from all CSV files
 
 PRAGMA foreign_keys = ON;
@@ -2,36 +2,111 @@
 """
 Setup script for Automotive Service Scheduling System
 This script initializes the database and starts the Flask application
+
+Rows are loaded into the bare tables first; the migrations then build the
+indexes, triggers and summary tables over the loaded data in one pass.
+
+Usage:
+    python setup.py [--scale N] [--no-sample-data] [--fast] [--seed N] [--database PATH]
 """
 
+import argparse
 import sqlite3
 import os
 import hashlib
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
+from generate_data import (
+    APPOINTMENTS_PER_SCALE, CUSTOMERS_PER_SCALE, VEHICLES_PER_SCALE, bulk_load_pragmas, generate,
+)
+from import_data import DATABASE
+from migrations import current_version, migrate
+
 def hash_password(password):
     """Hash password using SHA256"""
     return hashlib.sha256(password.encode()).hexdigest()
 
-def setup_database():
-    """Initialize the database with tables and sample data"""
+@contextmanager
+def phase(name, timings):
+    """Print a setup phase and record how long it took"""
+    print(f"{name}...")
+    started = time.perf_counter()
+    yield
+    timings.append((name, time.perf_counter() - started))
+
+def setup_database(db_path=DATABASE, scale=0, sample_data=True, fast=False, seed=42):
+    """Initialize the database with tables and sample data; returns the row counts
+
+    scale adds generate_data.py's synthetic data set on top. fast turns
+    journaling and syncing off for the whole setup; an interrupted run then
+    leaves an unusable file, so just run it again.
+    """
     print("Setting up database...")
-    
-    # Database file path
-    db_path = 'automotive_service.db'
+    timings = []
+    started = time.perf_counter()
     
     # Remove existing database if it exists
     if os.path.exists(db_path):
         os.remove(db_path)
         print("Removed existing database")
+    for path in (f'{db_path}-wal', f'{db_path}-shm', f'{db_path}-journal'):
+        if os.path.exists(path):
+            os.remove(path)
     
     # Create connection
     conn = sqlite3.connect(db_path)
+    if fast:
+        journal_mode = bulk_load_pragmas(conn)
     cursor = conn.cursor()
     
-    # Create tables
-    print("Creating tables...")
+    with phase("Creating tables", timings):
+        create_tables(cursor)
+        conn.commit()
+    
+    with phase("Inserting sample services", timings):
+        insert_sample_services(cursor)
+        conn.commit()
+    
+    if sample_data:
+        with phase("Inserting sample customers, vehicles and appointments", timings):
+            insert_sample_data(cursor)
+            conn.commit()
     
+    if scale:
+        # Appended after the sample rows; the tables have no indexes or triggers yet
+        with phase(f"Generating synthetic data (scale {scale:g})", timings):
+            for stats in generate(conn, round(scale * CUSTOMERS_PER_SCALE), round(scale * VEHICLES_PER_SCALE),
+                                  round(scale * APPOINTMENTS_PER_SCALE), seed=seed):
+                stats.report()
+    
+    # Indexes, triggers and summary tables come from the migrations, which
+    # also backfill the rollup, event log and search indexes from the rows
+    with phase("Applying schema migrations", timings):
+        migrate(conn)
+    print(f"Schema version: {current_version(conn)}")
+    
+    with phase("Analyzing", timings):
+        conn.execute('ANALYZE')
+        conn.commit()
+    
+    counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ('customers', 'vehicles', 'services', 'appointments')}
+    if fast:
+        conn.execute(f'PRAGMA journal_mode = {journal_mode}')
+    conn.close()
+    
+    print("\nPhase timings:")
+    for name, seconds in timings:
+        print(f"  {name:<55} {seconds:8.2f}s")
+    print(f"  {'Total':<55} {time.perf_counter() - started:8.2f}s")
+    print("Database setup completed successfully!")
+    print(f"Database created: {os.path.abspath(db_path)}")
+    return counts
+
+def create_tables(cursor):
+    """Create the core tables; their indexes come from the migrations"""
     # Customers table
     cursor.execute('''
         CREATE TABLE customers (
@@ -59,7 +134,7 @@ def setup_database():
             color TEXT,
             mileage INTEGER,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (customer_id) REFERENCES customers (id)
+            FOREIGN KEY (customer_id) REFERENCES customers (id) ON DELETE CASCADE
         )
     ''')
     
@@ -87,14 +162,14 @@ def setup_database():
             status TEXT DEFAULT 'scheduled',
             notes TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (customer_id) REFERENCES customers (id),
-            FOREIGN KEY (vehicle_id) REFERENCES vehicles (id),
+            FOREIGN KEY (customer_id) REFERENCES customers (id) ON DELETE CASCADE,
+            FOREIGN KEY (vehicle_id) REFERENCES vehicles (id) ON DELETE CASCADE,
             FOREIGN KEY (service_id) REFERENCES services (id)
         )
     ''')
-    
-    # Insert sample services
-    print("Inserting sample services...")
+
+def insert_sample_services(cursor):
+    """Insert the sample service catalog"""
     services = [
         ('Oil Change', 'Regular oil and filter change', 30, 49.99),
         ('Brake Inspection', 'Complete brake system inspection', 45, 75.00),
@@ -110,9 +185,9 @@ def setup_database():
         INSERT INTO services (name, description, estimated_duration, price)
         VALUES (?, ?, ?, ?)
     ''', services)
-    
-    # Insert sample customers
-    print("Inserting sample customers...")
+
+def insert_sample_data(cursor):
+    """Insert the sample customers, vehicles and appointments"""
     customers = [
         ('John', 'Doe', 'john.doe@email.com', hash_password('password123'), '555-0123', '123 Main St, Anytown, ST 12345'),
         ('Jane', 'Smith', 'jane.smith@email.com', hash_password('password123'), '555-0124', '456 Oak Ave, Somewhere, ST 12346'),
@@ -124,8 +199,6 @@ def setup_database():
         VALUES (?, ?, ?, ?, ?, ?)
     ''', customers)
     
-    # Insert sample vehicles
-    print("Inserting sample vehicles...")
     vehicles = [
         (1, 'Toyota', 'Camry', 2020, 'JT2BF22K5X0123456', 'ABC-123', 'Silver', 25000),
         (1, 'Honda', 'Civic', 2018, 'JHMFC2F59JX987654', 'XYZ-789', 'Blue', 45000),
@@ -138,8 +211,6 @@ def setup_database():
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
     ''', vehicles)
     
-    # Insert sample appointments
-    print("Inserting sample appointments...")
     appointments = [
         (1, 1, 1, '2025-01-15', '09:00', 'scheduled', 'Regular maintenance'),
         (2, 3, 2, '2025-01-16', '10:30', 'scheduled', 'Customer reported squeaking'),
@@ -150,29 +221,22 @@ def setup_database():
         INSERT INTO appointments (customer_id, vehicle_id, service_id, appointment_date, appointment_time, status, notes)
         VALUES (?, ?, ?, ?, ?, ?, ?)
     ''', appointments)
-    
-    # Create indexes for performance
-    print("Creating indexes...")
-    indexes = [
-        'CREATE INDEX idx_customers_email ON customers(email)',
-        'CREATE INDEX idx_customers_name ON customers(last_name, first_name)',
-        'CREATE INDEX idx_vehicles_customer ON vehicles(customer_id)',
-        'CREATE INDEX idx_appointments_customer ON appointments(customer_id)',
-        'CREATE INDEX idx_appointments_date ON appointments(appointment_date)'
-    ]
-    
-    for index in indexes:
-        cursor.execute(index)
-    
-    # Commit changes and close
-    conn.commit()
-    conn.close()
-    
-    print("Database setup completed successfully!")
-    print(f"Database created: {os.path.abspath(db_path)}")
 
 def main():
     """Main setup function"""
+    parser = argparse.ArgumentParser(description='Create the database with tables and sample data.')
+    parser.add_argument('--database', default=DATABASE,
+                        help=f'database file, replaced if it exists (default: {DATABASE})')
+    parser.add_argument('--scale', type=float, default=0,
+                        help=f'add synthetic data: {CUSTOMERS_PER_SCALE} customers, {VEHICLES_PER_SCALE} vehicles '
+                             f'and {APPOINTMENTS_PER_SCALE} appointments per unit (default: 0)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for --scale (default: 42)')
+    parser.add_argument('--no-sample-data', action='store_true',
+                        help='skip the sample customers, vehicles and appointments (services are kept)')
+    parser.add_argument('--fast', action='store_true',
+                        help='load with journaling and syncing off, for test and staging databases')
+    args = parser.parse_args()
+    
     print("=" * 50)
     print("Automotive Service Scheduling System Setup")
     print("=" * 50)
@@ -187,7 +251,7 @@ def main():
         return
     
     # Setup database
-    setup_database()
+    counts = setup_database(args.database, args.scale, not args.no_sample_data, args.fast, args.seed)
     
     print("\n" + "=" * 50)
     print("Setup completed successfully!")
@@ -195,11 +259,9 @@ def main():
     print("\nTo start the application:")
     print("1. Run: python app.py")
     print("2. Open your browser to: http://127.0.0.1:5000")
-    print("\nSample data has been loaded:")
-    print("- 3 customers")
-    print("- 4 vehicles")
-    print("- 8 services")
-    print("- 3 sample appointments")
+    print("\nData has been loaded:")
+    for table, count in counts.items():
+        print(f"- {count:,} {table}")
 
 if __name__ == '__main__':
     main()